@@ -5,23 +5,29 @@ import os.path
 import docker
 from airflow.decorators import dag, task
 from airflow.operators.python import get_current_context
-from airflow.hooks.base import BaseHook
-
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 from docker.errors import APIError
 
 from airflow.utils.dates import days_ago
 
 from station.trains.local.build import build_train
+from station.trains.local.warm_pool import WarmPool, can_use_warm_container, execute_in_container, exec_exit_code, \
+    train_command
+from station.app.crud.crud_local_train import local_train
 from station.clients.minio import MinioClient
-from station.clients.station import StationAPIClient
+from station.trains.docker.logs import TrainLogWriter, capture_logs
+from station.trains.docker.resources import CpusetAllocator, ResourceProfile, gpu_device_requests, \
+    train_container_options
+from station.trains.context import create_train_state, load_train_state, update_train_state
+from station.trains.services import station_api_client, station_session
+from station.trains.callbacks import task_started, task_succeeded, task_failed, task_retry, run_succeeded, \
+    run_failed
 
 
 def failure_callback(context):
     print(f"FAILURE CALLBACK -- Task {context['task'].task_id} failed")
-    client = StationAPIClient.from_env()
+    task_failed(context)
+    client = station_api_client()
 
     response = client.local_trains.post_failure_notification(context['dag_run'].conf['train_id'],
                                                              f"Train failed at task {context['task'].task_id}")
@@ -45,8 +51,10 @@ default_args = {
     # 'sla': timedelta(hours=2),
     # 'execution_timeout': timedelta(seconds=300),
     'on_failure_callback': failure_callback,
-    # 'on_success_callback': some_other_function,
-    # 'on_retry_callback': another_function,
+    # push task progress to the station api
+    'on_execute_callback': task_started,
+    'on_success_callback': task_succeeded,
+    'on_retry_callback': task_retry,
     # 'sla_miss_callback': yet_another_function,
     # 'trigger_rule': 'all_success'
 }
@@ -57,6 +65,8 @@ default_args = {
     schedule_interval=None,
     start_date=days_ago(2),
     tags=['pht', 'local train'],
+    on_success_callback=run_succeeded,
+    on_failure_callback=run_failed,
 )
 def run_local_train():
     @task(on_failure_callback=failure_callback)
@@ -88,71 +98,117 @@ def run_local_train():
             "env": env,
             "volumes": volumes,
             "master_image": master_image,
-            "custom_image": custom_image
+            "custom_image": custom_image,
+            "resources": context['dag_run'].conf.get("resources", None)
         }
 
-        return train_config
-
-    @task(on_failure_callback=failure_callback)
-    def build_train_image(train_config):
-
-        print("Building train image")
-        print("config", train_config)
-
-        connection = BaseHook.get_connection("pg_station")
+        # only the id of the persisted config is passed between the tasks
+        return create_train_state(context["dag_run"], train_config, train_id=str(train_id))
 
-        db_url = f"postgresql://{connection.login}:{connection.password}@{connection.host}:{connection.port}/" \
-                 f"{connection.schema}"
-
-        # create a session to the station database
-        engine = create_engine(db_url)
+    def build_image(train_config):
+        train_id = train_config['train_id']
+        client = station_api_client()
+
+        # the archive is streamed from the station api and spooled to disk if it is large
+        with client.local_trains.download_train_archive(train_id) as train_files_archive, \
+                station_session() as db:
+            return build_train(
+                db=db,
+                train_id=train_id,
+                custom_image=train_config.get('custom_image'),
+                master_image_id=train_config.get('master_image'),
+                files=train_files_archive,
+            )
+
+    def run_in_warm_container(client, container, train_config, environment, limits, log_writer):
         train_id = train_config['train_id']
-        session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        db = session_local()
+        with station_session() as db:
+            train = local_train.get(db, train_id)
+            command = train_command(train.entrypoint, train.command, train.command_args)
 
-        client = StationAPIClient.from_env()
+        with station_api_client().local_trains.download_train_archive(train_id) as train_files_archive:
+            output, exec_id = execute_in_container(client, container, train_files_archive, command,
+                                                   environment=environment, limits=limits)
+        capture_logs(output, log_writer)
+        return exec_exit_code(client, exec_id)
 
-        train_files_archive = client.local_trains.download_train_archive(train_id)
+    @task(on_failure_callback=failure_callback)
+    def build_train_image(context_id):
+        train_config = load_train_state(context_id)
 
-        image = build_train(
-            db=db,
-            train_id=train_id,
-            custom_image=train_config.get('custom_image'),
-            master_image_id=train_config.get('master_image'),
-            files=train_files_archive,
-        )
+        print("Building train image")
+        print("config", train_config)
 
-        train_config['image'] = image
+        # trains of pooled master images are run in a warm container without building an image
+        pin_cpus = ResourceProfile.from_env().pin_cpus
+        if can_use_warm_container(train_config, pin_cpus=pin_cpus) and \
+                WarmPool(docker.from_env()).available(train_config['master_image']):
+            print("Using a warm container of", train_config['master_image'])
+            update_train_state(context_id, warm_pool=True)
+            return context_id
 
-        db.close()
-        return train_config
+        image = build_image(train_config)
+        update_train_state(context_id, image=image)
+        return context_id
 
     @task(on_failure_callback=failure_callback)
-    def run_train(train_config):
+    def run_train(context_id):
+        train_config = load_train_state(context_id)
         client = docker.from_env()
         environment = train_config.get("env", {})
         volumes = train_config.get("volumes", {})
         print("Volumes: ", volumes)
-        container = client.containers.run(
-            train_config['image'],
-            environment=environment,
-            volumes=volumes,
-            detach=True,
-            stderr=True,
-            stdout=True,
-        )
-
-        output = container.wait()
+        resources = train_config.get("resources") or {}
+        run_id = get_current_context()["dag_run"].run_id
+        # limit the cpu, memory and io of the train and pin it to cpus if configured
+        cpuset_dir = os.path.join(os.getenv("AIRFLOW_DATA_DIR", "/opt/station_data"), "cpusets")
+        limits = train_container_options(client, run_id, resources, cpuset_dir, profile=ResourceProfile.from_env())
+        print("Resource limits: ", limits)
+        warm_container = None
+        if train_config.get("warm_pool"):
+            warm_container = WarmPool(client).claim(train_config['master_image'])
+            if not warm_container:
+                print("No warm container available, building the train image")
+                train_config['image'] = build_image(train_config)
+        # stream the container output to minio and keep the last lines for the task log
+        log_writer = TrainLogWriter(MinioClient(), run_id)
+        try:
+            if warm_container:
+                exit_code = run_in_warm_container(client, warm_container, train_config, environment, limits,
+                                                  log_writer)
+            else:
+                container = client.containers.run(
+                    train_config['image'],
+                    environment=environment,
+                    volumes=volumes,
+                    detach=True,
+                    stderr=True,
+                    stdout=True,
+                    # labels used by the station to track the resource usage of train containers
+                    labels={"pht.train": "true", "pht.train.id": str(train_config["train_id"]),
+                            "pht.train.run": run_id},
+                    device_requests=gpu_device_requests(resources.get("gpus")),
+                    **limits
+                )
+
+                capture_logs(container.logs(stream=True, follow=True), log_writer)
+                exit_code = container.wait()['StatusCode']
+        finally:
+            if "cpuset_cpus" in limits:
+                CpusetAllocator(cpuset_dir).release(run_id)
+            if warm_container:
+                WarmPool.remove(warm_container)
 
         # print("Train Container ID: ", container.id)
-        print("Train Container Logs: ", container.logs().decode("utf-8"))
-        print("Train Container Exit Code: ", output['StatusCode'])
+        print("Train Container Logs: ", log_writer.tail_text())
+        print("Train Container Exit Code: ", exit_code)
 
-        return train_config
+        return context_id
 
     @task(on_failure_callback=failure_callback)
-    def update_train_status(train_config):
-        client = StationAPIClient.from_env()
+    def update_train_status(context_id):
+        train_config = load_train_state(context_id)
+        client = station_api_client()
         context = get_current_context()
         print(dict(context))
         print(client.base_url)
@@ -160,10 +216,10 @@ def run_local_train():
         response = client.local_trains.update_train_status(train_config['train_id'], "completed")
         print(response)
 
-    train_config = get_local_train_config()
-    train_config = build_train_image(train_config)
-    train_config = run_train(train_config)
-    update_train_status(train_config)
+    context_id = get_local_train_config()
+    context_id = build_train_image(context_id)
+    context_id = run_train(context_id)
+    update_train_status(context_id)
 
 
 local_train_dag = run_local_train()
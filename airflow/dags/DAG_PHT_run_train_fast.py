@@ -0,0 +1,53 @@
+from airflow.decorators import dag, task
+from airflow.operators.python import get_current_context
+
+from airflow.utils.dates import days_ago
+
+from station.trains.docker.pipeline import TrainPipeline, make_train_state
+from station.trains.context import create_train_state, update_train_state
+from station.trains.callbacks import task_started, task_succeeded, task_failed, task_retry, run_succeeded, \
+    run_failed
+
+default_args = {
+    'owner': 'airflow',
+    'depends_on_past': False,
+    'email': ['airflow@example.com'],
+    'email_on_failure': False,
+    'email_on_retry': False,
+    # push task progress to the station api
+    'on_execute_callback': task_started,
+    'on_failure_callback': task_failed,
+    'on_success_callback': task_succeeded,
+    'on_retry_callback': task_retry,
+}
+
+
+@dag(default_args=default_args, schedule_interval=None, start_date=days_ago(2), tags=['pht', 'train'],
+     on_success_callback=run_succeeded, on_failure_callback=run_failed)
+def run_pht_train_fast():
+    """
+    Executes all steps of a docker train in a single task. The docker client, the registry login and the train state
+    are shared between the steps instead of being recreated and persisted by every task of the run_pht_train dag,
+    which removes the scheduling overhead between the tasks for small trains.
+    """
+
+    @task()
+    def execute_train():
+        context = get_current_context()
+        dag_run = context["dag_run"]
+        train_state = make_train_state(dag_run.conf)
+        # the state is persisted once at the start and once at the end of the run for inspection
+        context_id = create_train_state(dag_run, train_state, train_id=train_state["train_id"])
+
+        pipeline = TrainPipeline(train_state, dag_run.run_id)
+        try:
+            timings = pipeline.run()
+        finally:
+            update_train_state(context_id, **{**pipeline.state, "timings": pipeline.timings})
+        for step, duration in timings.items():
+            print(f"{step}: {duration:.2f}s")
+
+    execute_train()
+
+
+run_train_fast_dag = run_pht_train_fast()
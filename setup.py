@@ -36,6 +36,7 @@ setup(
         "docker",
         "fhir-kindling",
         "pandas",
+        "numpy",
         "SQLAlchemy",
         "psycopg2-binary",
         "redis",
@@ -49,6 +50,8 @@ setup(
         "psutil",
         "plotly",
         "s3fs",
+        "prometheus-client",
+        "pyarrow",
     ],
     entry_points={
         'console_scripts': [
@@ -7,14 +7,24 @@ from station.app.schemas.users import User
 # from station.clients.airflow.client import airflow_client
 from station.app.config import clients
 from station.clients.airflow import docker_trains as airflow_docker_train
-from station.app.schemas.airflow import AirflowInformation, AirflowTaskLog, AirflowRun, AirflowRunMsg
+from station.app.schemas.airflow import AirflowInformation, AirflowTaskLog, AirflowRun, AirflowRunMsg, \
+    AirflowTaskLogChunk, TrainLogPage
 from station.app.schemas.docker_trains import DockerTrainExecution
 from station.app.crud.crud_local_train import local_train
 from station.app.crud.crud_docker_trains import docker_trains
+from station.app.run_cache import FinishedRunCache
+from station.app.crud.crud_train_events import train_task_events
+from station.app.schemas.train_events import TaskEvent, TaskEventCreate, TaskEventType, RunProgress
+from station.app.trains.reconciler import execution_reconciler
+from station.app.trains.logs import get_train_log_page
 
 router = APIRouter()
 
 
+def _run_cache() -> FinishedRunCache:
+    return FinishedRunCache(airflow=clients.airflow, redis=clients.redis, minio=clients.minio)
+
+
 @router.post("/{dag_id}/run", response_model=AirflowRun)
 def run(
         run_msg: AirflowRunMsg,
@@ -63,13 +73,13 @@ def get_airflow_run_information(
         run_id: str,
         user: User = Depends(dependencies.authorized_user)):
     """
-    Get information about one airflow DAG execution.
+    Get information about one airflow DAG execution. Finished runs are served from the cache.
     @param dag_id: ID of the DAG e.G. "run_local" , "run_pht_train" etc.
     @param run_id: Airflow run ID
     @return:
     """
 
-    run_info = clients.airflow.get_run_information(dag_id, run_id)
+    run_info = _run_cache().get_run_information(dag_id, run_id)
 
     for instance in run_info["tasklist"]["task_instances"][:]:
         try:
@@ -96,14 +106,76 @@ def get_airflow_task_log(
         task_try_number: int,
         user: User = Depends(dependencies.authorized_user)):
     """
-    Get log of a task in a DAG execution.
+    Get log of a task in a DAG execution. Logs of finished tasks are served from the cache.
     @param dag_id: ID of the DAG e.G. "run_local" , "run_pht_train" etc.
     @param task_id: id of teh task
     @param run_id: Airflow run ID
     @param task_try_number: specific try number for log request
     @return:
     """
-    run_info_data = clients.airflow.get_task_log(dag_id, run_id, task_id, task_try_number)
+    run_info_data = _run_cache().get_task_log(dag_id, run_id, task_id, task_try_number)
     if not run_info_data:
         raise HTTPException(status_code=404, detail=f"{task_id} not found.")
     return {"run_info": run_info_data}
+
+
+@router.get("/logs/{dag_id}/{run_id}/{task_id}/{task_try_number}/tail", response_model=AirflowTaskLogChunk)
+def tail_airflow_task_log(
+        dag_id: str,
+        run_id: str,
+        task_id: str,
+        task_try_number: int,
+        continuation_token: str = None,
+        user: User = Depends(dependencies.authorized_user)):
+    """
+    Get the part of the log of a task written since the previous request. Pass the continuation token of the previous
+    response to only receive new log content.
+    @param dag_id: ID of the DAG e.G. "run_local" , "run_pht_train" etc.
+    @param task_id: id of the task
+    @param run_id: Airflow run ID
+    @param task_try_number: specific try number for log request
+    @param continuation_token: token returned by the previous request
+    @return:
+    """
+    log = clients.airflow.tail_task_log(dag_id, run_id, task_id, task_try_number,
+                                        continuation_token=continuation_token)
+    if not log:
+        raise HTTPException(status_code=404, detail=f"{task_id} not found.")
+    return log
+
+
+@router.post("/events", response_model=TaskEvent, status_code=201)
+def add_task_event(event: TaskEventCreate, db: Session = Depends(dependencies.get_db)):
+    """
+    Record a task or run event pushed by the callbacks of the train DAGs. Events of finished runs also update the
+    corresponding train execution.
+    """
+    db_event = train_task_events.create(db, obj_in=event)
+    if event.event in (TaskEventType.run_success, TaskEventType.run_failed):
+        execution_reconciler.finish_run(db, {
+            "dag_id": event.dag_id,
+            "dag_run_id": event.run_id,
+            "state": "success" if event.event == TaskEventType.run_success else "failed",
+            "start_date": event.start.isoformat() if event.start else None,
+            "end_date": event.end.isoformat() if event.end else None,
+        })
+    return db_event
+
+
+@router.get("/runs/{run_id}/progress", response_model=RunProgress)
+def get_run_progress(run_id: str, db: Session = Depends(dependencies.get_db)):
+    """
+    Get the progress of a DAG run from the events pushed by the DAG, without requests to airflow.
+    """
+    progress = train_task_events.get_run_progress(db, run_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail=f"No events for run {run_id} found.")
+    return progress
+
+
+@router.get("/runs/{run_id}/train-logs", response_model=TrainLogPage)
+def get_run_train_logs(run_id: str, page: int = 0):
+    """
+    Page through the container output of a train run, stored in parts of about one megabyte.
+    """
+    return get_train_log_page(run_id, page)
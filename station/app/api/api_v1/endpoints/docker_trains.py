@@ -5,11 +5,17 @@ from fastapi import APIRouter, Depends, HTTPException
 
 from station.app.api import dependencies
 from station.app.trains.docker import airflow
+from station.app.trains.docker.inspect import inspect_train
 from station.app.schemas.docker_trains import DockerTrain, DockerTrainCreate, DockerTrainConfig, \
-    DockerTrainConfigCreate, DockerTrainConfigUpdate, DockerTrainExecution, DockerTrainState, DockerTrainSavedExecution
+    DockerTrainConfigCreate, DockerTrainConfigUpdate, DockerTrainExecution, DockerTrainState, \
+    DockerTrainSavedExecution, DockerTrainBulkRun, DockerTrainRunResult, DockerTrainExecutionLatency, \
+    DockerTrainInspection
 from station.app.crud.crud_docker_trains import docker_trains
 from station.app.crud.crud_train_configs import docker_train_config
 from station.clients.harbor_client import harbor_client
+from station.app.trains.logs import get_train_log_page
+from station.app.schemas.airflow import TrainLogPage
+from station.app.trains.scheduler import execution_scheduler, queued_response
 
 router = APIRouter()
 
@@ -19,6 +25,20 @@ def synchronize_database(db: Session = Depends(dependencies.get_db)):
     return docker_trains.synchronize_central(db)
 
 
+@router.post("/run", response_model=List[DockerTrainRunResult])
+def run_docker_trains(bulk_run: DockerTrainBulkRun, db: Session = Depends(dependencies.get_db)):
+    """
+    Run multiple trains at once, returns the result of each run in the order of the request. When train runs are
+    queued by the station, each result contains the run request and only the runs that were started right away
+    contain an execution.
+    """
+    if not bulk_run.trains:
+        raise HTTPException(status_code=400, detail="No trains to run given.")
+    if execution_scheduler.enabled:
+        return execution_scheduler.submit_docker_trains(db, bulk_run.trains)
+    return airflow.run_trains(db, bulk_run.trains)
+
+
 @router.get("", response_model=List[DockerTrain])
 def get_available_trains(limit: int = 0, db: Session = Depends(dependencies.get_db)):
     if limit != 0:
@@ -55,11 +75,32 @@ def get_train_by_train_id(train_id: str, db: Session = Depends(dependencies.get_
 @router.post("/{train_id}/run", response_model=DockerTrainSavedExecution)
 def run_docker_train(train_id: str, run_config: DockerTrainExecution = None,
                      db: Session = Depends(dependencies.get_db)):
+    """
+    Run a train. When train runs are queued by the station and the resources of the run are not available, the run
+    request is returned with status code 202 instead of the execution.
+    """
+    if execution_scheduler.enabled:
+        db_train = docker_trains.get_by_train_id(db, train_id)
+        if not db_train:
+            raise HTTPException(status_code=404, detail=f"Train with id '{train_id}' not found.")
+        # runs without a config use the config assigned to the train, the same as unscheduled runs
+        run_config = run_config or DockerTrainExecution(config_id=db_train.config_id or "default")
+        request, execution = execution_scheduler.submit(db, "docker", train_id, config_id=run_config.config_id,
+                                                        dataset_id=run_config.dataset_id,
+                                                        priority=run_config.priority)
+        return execution if execution else queued_response(request)
 
     execution = airflow.run_train(db, train_id, run_config)
     return execution
 
 
+@router.get("/{train_id}/inspect", response_model=DockerTrainInspection)
+def inspect_docker_train(train_id: str, tag: str = None, db: Session = Depends(dependencies.get_db)):
+    if not docker_trains.get_by_train_id(db, train_id):
+        raise HTTPException(status_code=404, detail=f"Train with id '{train_id}' not found.")
+    return inspect_train(train_id, tag)
+
+
 @router.get("/{train_id}/config", response_model=DockerTrainConfig)
 def get_config_for_train(train_id: str, db: Session = Depends(dependencies.get_db)):
     train = docker_trains.get_by_train_id(db, train_id)
@@ -135,7 +176,22 @@ def get_all_docker_train_executions(skip: int = 0, limit: int = 100, db: Session
     return db_executions
 
 
+@router.get("/executions/latency", response_model=List[DockerTrainExecutionLatency])
+def get_docker_train_execution_latency(limit: int = 1000, db: Session = Depends(dependencies.get_db)):
+    return docker_trains.get_execution_latency(db, limit=limit)
+
+
 @router.get("/{train_id}/executions", response_model=List[DockerTrainSavedExecution])
 def get_docker_train_executions(train_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(dependencies.get_db)):
     executions = docker_trains.get_train_executions(db, train_id,)
     return executions
+
+
+@router.get("/{train_id}/executions/{execution_id}/logs", response_model=TrainLogPage)
+def get_docker_train_execution_logs(train_id: str, execution_id: int, page: int = 0,
+                                    db: Session = Depends(dependencies.get_db)):
+    executions = docker_trains.get_train_executions(db, train_id)
+    execution = next((e for e in executions if e.id == execution_id), None)
+    if not execution or not execution.airflow_dag_run:
+        raise HTTPException(status_code=404, detail=f"Execution {execution_id} of train {train_id} not found.")
+    return get_train_log_page(execution.airflow_dag_run, page)
@@ -17,6 +17,7 @@ from station.app.schemas.datasets import MinioFile
 from station.clients.minio import MinioClient
 from station.ctl.constants import DataDirectories
 from station.trains.local.airflow import run_local_train
+from station.app.trains.scheduler import execution_scheduler, queued_response
 
 router = APIRouter()
 
@@ -77,6 +78,12 @@ async def trigger_train_execution(train_id: str, run_config: local_trains.LocalT
     if not train:
         raise HTTPException(status_code=404, detail=f"Train ({train_id}) not found")
 
+    if execution_scheduler.enabled:
+        request, execution = execution_scheduler.submit(db, "local", train_id, config_id=run_config.config_id,
+                                                        dataset_id=run_config.dataset_id,
+                                                        priority=run_config.priority)
+        return execution if execution else queued_response(request)
+
     execution = run_local_train(
         db=db,
         train_id=train_id,
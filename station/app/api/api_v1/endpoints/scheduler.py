@@ -0,0 +1,37 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from station.app.api import dependencies
+from station.app.schemas.train_queue import TrainQueueStatus, TrainRunRequest
+from station.app.trains.scheduler import execution_scheduler
+
+router = APIRouter()
+
+
+@router.get("", response_model=TrainQueueStatus)
+def get_queue_status(db: Session = Depends(dependencies.get_db)):
+    """
+    Depth of the train run queue, waiting times and the resources reserved by running trains.
+    """
+    return execution_scheduler.queue_status(db)
+
+
+@router.get("/requests", response_model=List[TrainRunRequest])
+def get_queued_requests(db: Session = Depends(dependencies.get_db)):
+    """
+    Queued and running train run requests in the order in which they are admitted.
+    """
+    return execution_scheduler.get_requests(db)
+
+
+@router.delete("/requests/{request_id}", response_model=TrainRunRequest)
+def cancel_request(request_id: int, db: Session = Depends(dependencies.get_db)):
+    request = execution_scheduler.cancel(db, request_id)
+    if not request:
+        raise HTTPException(status_code=404, detail=f"Run request {request_id} not found.")
+    if request.status != "cancelled":
+        raise HTTPException(status_code=400, detail=f"Run request {request_id} is {request.status} and can not be "
+                                                    f"cancelled.")
+    return request
@@ -1,8 +1,12 @@
+from typing import List, Optional
+
 from sqlalchemy.orm import Session
 from fastapi import APIRouter, Depends
 
 from station.app.api import dependencies
 from station.app.schemas.users import User
+from station.app.schemas.train_verification import TrainVerification, TrainVerificationInvalidation
+from station.trains.docker.verification import invalidate_verifications, list_verifications
 
 router = APIRouter()
 
@@ -22,3 +26,19 @@ def test_station_config(user: User = Depends(dependencies.authorized_user)):
 def update_station_config():
     # TODO allow for updates and storage of configuration values for a station
     pass
+
+
+@router.get("/verifications", response_model=List[TrainVerification])
+def get_train_verifications(skip: int = 0, limit: int = 100, db: Session = Depends(dependencies.get_db)):
+    return list_verifications(db, skip=skip, limit=limit)
+
+
+@router.delete("/verifications", response_model=TrainVerificationInvalidation)
+def delete_train_verifications(fingerprint: Optional[str] = None, train_id: Optional[str] = None,
+                               db: Session = Depends(dependencies.get_db)):
+    """
+    Invalidate the cached pre run protocol results, e.g. after the station key has been rotated. All results are
+    removed if neither a key fingerprint nor a train is given.
+    """
+    removed = invalidate_verifications(db, fingerprint=fingerprint, train_id=train_id)
+    return TrainVerificationInvalidation(removed=removed)
@@ -1,8 +1,13 @@
-from fastapi import APIRouter
+from typing import List
+
+from fastapi import APIRouter, HTTPException
 from station.app.schemas import station_status as status_schema
 from loguru import logger
 
-from station.app.config import clients
+from station.app.status.hardware import hardware_sampler
+from station.app.status.health import health_monitor
+from station.clients.docker.client import dockerClient
+from station.clients.instrumentation import upstream_metrics
 
 import psutil
 
@@ -12,25 +17,21 @@ The station status  endpoint returns the status of local and global components
 """
 
 
-def service_health_check():
+def service_health_check(refresh: bool = False):
     """
-    Get the health status of all connected services
+    Get the health status of all connected services, served from the results of the background health monitor
     """
-    service_status = []
-    services = {
-        "airflow": clients.airflow.health_check(),
-        "harbor": clients.harbor.health_check(),
-        "minio": clients.minio.health_check(),
-    }
-    for service, health in services.items():
-        service_status.append(status_schema.ServiceStatus(
-            name=service,
-            status=health
-        ))
-    return service_status
+    return health_monitor.get_statuses(refresh=refresh)
 
 
 def get_hardware_resources_status():
+    """
+    Get the latest hardware utilization sampled in the background, sample directly if the sampler is not running
+    """
+    latest = hardware_sampler.latest()
+    if latest:
+        return latest
+
     # get memory statistics
     memory_stats = psutil.virtual_memory()
     memory_usage = status_schema.MemoryUsage(
@@ -62,31 +63,51 @@ def get_hardware_resources_status():
 
 
 @router.get("", response_model=status_schema.StationStatus)
-async def get_station_status():
+def get_station_status(refresh: bool = False):
     hardware = get_hardware_resources_status()
-    services = service_health_check()
+    services = service_health_check(refresh=refresh)
 
     return status_schema.StationStatus(
         hardware=hardware,
         services=services
     )
 
-# @router.get("/container_resource_util")
-# def status_docker_container_resource_use():
-#     """
-#     get information for all docker containers
-#     """
-#     return dockerClient.get_stats_all()
-#
-#
-# @router.get("/container/{container_id}")
-# def status_docker_container_resource_use(container_id: Any):
-#     """
-#     get information for container id
-#     """
-#     return dockerClient.get_stats_container(container_id)
-#
-#
-# @router.get("/container_info")
-# def container_info():
-#     return dockerClient.get_information_all()
+
+@router.get("/hardware/history", response_model=status_schema.HardwareHistory)
+def get_hardware_history(window: float = 3600, points: int = 120):
+    """
+    Hardware utilization of the given time window in seconds, downsampled to at most the given number of points.
+    """
+    return hardware_sampler.history(window=window, points=points)
+
+
+@router.get("/upstream", response_model=List[status_schema.UpstreamOperationStats])
+def get_upstream_call_statistics(upstream: str = None):
+    """
+    Latency, error and payload statistics of the calls made to upstream services, per service and operation.
+    """
+    return upstream_metrics.snapshot(upstream)
+
+
+@router.get("/container_resource_util", response_model=List[status_schema.ContainerResourceUsage])
+def status_docker_container_resource_use():
+    """
+    get the resource utilization of all running train containers
+    """
+    return dockerClient.get_stats_all()
+
+
+@router.get("/container/{container_id}", response_model=status_schema.ContainerResourceUsage)
+def status_docker_container_resource_use_by_id(container_id: str):
+    """
+    get the resource utilization of the train container with the given id or name
+    """
+    stats = dockerClient.get_stats_container(container_id)
+    if not stats:
+        raise HTTPException(status_code=404, detail=f"Train container {container_id} not found.")
+    return stats
+
+
+@router.get("/container_info")
+def container_info():
+    return dockerClient.get_information_all_containers()
@@ -10,6 +10,10 @@ from enum import Enum
 from station.app.config import settings
 from station.app.schemas.users import User, UserPermission
 from station.app.cache import redis_cache
+from station.clients.instrumentation import InstrumentedSession, upstream_operation
+
+
+auth_session = InstrumentedSession("auth")
 
 
 class TokenCacheKeys(str, Enum):
@@ -17,6 +21,7 @@ class TokenCacheKeys(str, Enum):
     user_token_prefix = "user-token-"
 
 
+@upstream_operation("get_robot_token")
 def get_robot_token(robot_id: str = None, robot_secret: str = None, token_url: str = None) -> str:
     """
     Get robot token from auth server.
@@ -46,7 +51,7 @@ def get_robot_token(robot_id: str = None, robot_secret: str = None, token_url: s
             "grant_type": "robot_credentials"
         }
 
-        response = requests.post(token_url, data=data).json()
+        response = auth_session.post(token_url, data=data).json()
 
         # parse values from response and set cache
         token = response.get("access_token")
@@ -57,6 +62,7 @@ def get_robot_token(robot_id: str = None, robot_secret: str = None, token_url: s
         return token
 
 
+@upstream_operation("validate_user_token")
 def validate_user_token(token: str, user_url: str = None) -> User:
     """
     Validate a user token against the auth server and parse a user object from the response.
@@ -73,7 +79,7 @@ def validate_user_token(token: str, user_url: str = None) -> User:
     url = f"{user_url}/@me"
     logger.debug(f"Validating user token against {url}")
     headers = {"Authorization": f"Bearer {token}"}
-    r = requests.get(url, headers=headers)
+    r = auth_session.get(url, headers=headers)
     r.raise_for_status()
     user = User(**r.json())
     return user
@@ -120,6 +126,7 @@ def get_current_user(token: str,
                 raise HTTPException(status_code=401, detail="Invalid token")
 
 
+@upstream_operation("get_user_permissions")
 def get_user_permissions(user: User, token_url: str = None) -> List[UserPermission]:
     # todo token caching
     logger.debug(f"Getting user permissions for {user.name}")
@@ -127,7 +134,7 @@ def get_user_permissions(user: User, token_url: str = None) -> List[UserPermissi
         token_url = settings.config.auth.token_url
     url = f"{token_url}/introspect"
     headers = {"Authorization": f"Bearer {user.token}"}
-    r = requests.get(url, headers=headers)
+    r = auth_session.get(url, headers=headers)
     r.raise_for_status()
     permissions = [UserPermission(**p) for p in r.json().get("permissions")]
     return permissions
@@ -4,6 +4,7 @@ from pydantic import SecretStr
 
 import redis
 
+from station.app.metrics import record_cache_lookup
 
 
 class RedisJSONOps(str, Enum):
@@ -38,7 +39,9 @@ class Cache:
         Returns:
             value of the key or None if not found
         """
-        return self.redis.get(key)
+        value = self.redis.get(key)
+        record_cache_lookup(value is not None)
+        return value
 
     def json_set(self, key: str, value: str, ttl: int = 3600) -> None:
         """
@@ -73,6 +76,7 @@ class Cache:
             key,
             "."
         )
+        record_cache_lookup(json_string is not None)
         return json_string
 
 
@@ -1,6 +1,8 @@
 from loguru import logger
+from pydantic import SecretStr
 
 from station.app.settings import Settings
+from station.app.cache import Cache
 from station.clients.harbor_client import HarborClient
 from station.clients.airflow.client import AirflowClient
 from station.clients.minio.client import MinioClient
@@ -12,6 +14,7 @@ class StationClients:
     _harbor: HarborClient
     _minio: MinioClient
     _central: CentralApiClient
+    _redis: Cache
 
     def __init__(self, settings: Settings):
         self.settings = settings
@@ -47,6 +50,16 @@ class StationClients:
             robot_secret=self.settings.config.central_ui.robot_secret.get_secret_value(),
         )
 
+        redis_password = self.settings.config.redis.password
+        if isinstance(redis_password, SecretStr):
+            redis_password = redis_password.get_secret_value()
+        self._redis = Cache(
+            host=self.settings.config.redis.host,
+            port=self.settings.config.redis.port,
+            db=self.settings.config.redis.db,
+            password=redis_password,
+        )
+
         self.is_initialized = True
         logger.info("Clients initialized")
 
@@ -76,4 +89,11 @@ class StationClients:
         if not self.is_initialized:
             logger.warning("Station clients are not initialized. Please call clients.initialize() before using clients.")
             self.initialize()
-        return self._central
\ No newline at end of file
+        return self._central
+
+    @property
+    def redis(self) -> Cache:
+        if not self.is_initialized:
+            logger.warning("Station clients are not initialized. Please call clients.initialize() before using clients.")
+            self.initialize()
+        return self._redis
@@ -1,4 +1,5 @@
 from builtins import str
+import math
 
 from sqlalchemy.orm import Session
 from typing import List, Tuple, Union
@@ -12,6 +13,7 @@ from .base import CRUDBase, ModelType
 from station.app.models.docker_trains import DockerTrain, DockerTrainConfig, DockerTrainState, DockerTrainExecution
 from station.app.schemas.docker_trains import DockerTrainCreate, DockerTrainUpdate, DockerTrainConfigCreate
 from station.app.schemas.docker_trains import DockerTrainState as DockerTrainStateSchema
+from station.app.schemas.docker_trains import DockerTrainExecutionLatency
 from station.app.config import settings, clients
 
 # TODO improve handling of proposals
@@ -123,6 +125,16 @@ class CRUDDockerTrain(CRUDBase[DockerTrain, DockerTrainCreate, DockerTrainUpdate
     def get_executions(self, db: Session, skip: int = 0, limit: int = 100) -> List[DockerTrainExecution]:
         return db.query(DockerTrainExecution).order_by(DockerTrainExecution.start.desc()).offset(skip).limit(limit).all()
 
+    def get_execution_latency(self, db: Session, limit: int = 1000) -> List[DockerTrainExecutionLatency]:
+        """
+        End-to-end latency of the last finished executions for each execution mode.
+        """
+        executions = db.query(DockerTrainExecution).filter(
+            DockerTrainExecution.end.isnot(None),
+            DockerTrainExecution.status == "success",
+        ).order_by(DockerTrainExecution.end.desc()).limit(limit).all()
+        return execution_latency(executions)
+
     def synchronize_central(self, db: Session) -> List[DockerTrain]:
 
         central_trains = clients.central.get_trains(settings.config.station_id)
@@ -208,4 +220,34 @@ class CRUDDockerTrain(CRUDBase[DockerTrain, DockerTrainCreate, DockerTrainUpdate
         return proposal_link
 
 
+def execution_latency(executions: List[DockerTrainExecution]) -> List[DockerTrainExecutionLatency]:
+    """
+    Latency statistics of finished executions grouped by their execution mode.
+    """
+    by_mode = {}
+    for execution in executions:
+        by_mode.setdefault(execution.execution_mode or "default", []).append(execution)
+
+    latencies = []
+    for mode, mode_executions in sorted(by_mode.items()):
+        totals = sorted((e.end - e.start).total_seconds() for e in mode_executions if e.start)
+        durations = [e.duration for e in mode_executions if e.duration is not None]
+        latencies.append(DockerTrainExecutionLatency(
+            execution_mode=mode,
+            count=len(mode_executions),
+            mean=sum(totals) / len(totals) if totals else None,
+            p50=_percentile(totals, 0.5),
+            p95=_percentile(totals, 0.95),
+            run_duration_mean=sum(durations) / len(durations) if durations else None,
+        ))
+    return latencies
+
+
+def _percentile(values: List[float], q: float):
+    # nearest rank percentile of sorted values
+    if not values:
+        return None
+    return values[max(math.ceil(q * len(values)) - 1, 0)]
+
+
 docker_trains = CRUDDockerTrain(DockerTrain)
@@ -40,6 +40,7 @@ class CRUDLocalTrain(CRUDBase[LocalTrain, LocalTrainCreate, LocalTrainUpdate]):
             airflow_dag_run=dag_run,
             config_id=config_id,
             dataset_id=dataset_id,
+            status="running",
         )
         db.add(run)
         db.commit()
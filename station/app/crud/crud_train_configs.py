@@ -17,7 +17,8 @@ class CRUDDockerTrainConfig(CRUDBase[DockerTrainConfig, DockerTrainConfigCreate,
             airflow_config=obj_in.airflow_config.dict() if obj_in.airflow_config else None,
             gpu_requirements=obj_in.gpu_requirements,
             cpu_requirements=obj_in.cpu_requirements,
-            auto_execute=obj_in.auto_execute
+            auto_execute=obj_in.auto_execute,
+            execution_mode=obj_in.execution_mode or "default",
         )
         db.add(db_config)
         db.commit()
@@ -0,0 +1,84 @@
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from .base import CRUDBase
+from station.app.models.train_events import TrainTaskEvent
+from station.app.schemas.train_events import TaskEventCreate, TaskEventType, TaskProgress, RunProgress
+
+# state of a task after each of its events
+TASK_STATES = {
+    TaskEventType.started: "running",
+    TaskEventType.success: "success",
+    TaskEventType.failed: "failed",
+    TaskEventType.retry: "up_for_retry",
+}
+
+
+def _local_datetime(value):
+    # timestamps are stored as naive local times like the other station tables
+    if value is not None and value.tzinfo:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+class CRUDTrainTaskEvents(CRUDBase[TrainTaskEvent, TaskEventCreate, TaskEventCreate]):
+
+    def create(self, db: Session, *, obj_in: TaskEventCreate) -> TrainTaskEvent:
+        db_obj = TrainTaskEvent(
+            dag_id=obj_in.dag_id,
+            run_id=obj_in.run_id,
+            train_id=obj_in.train_id,
+            task_id=obj_in.task_id,
+            try_number=obj_in.try_number,
+            event=obj_in.event.value,
+            start=_local_datetime(obj_in.start),
+            end=_local_datetime(obj_in.end),
+            duration=obj_in.duration,
+            message=obj_in.message,
+        )
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def get_for_run(self, db: Session, run_id: str) -> List[TrainTaskEvent]:
+        return db.query(TrainTaskEvent).filter(TrainTaskEvent.run_id == run_id).order_by(TrainTaskEvent.id).all()
+
+    def get_run_progress(self, db: Session, run_id: str) -> Optional[RunProgress]:
+        """
+        Aggregate the events of a run into the current state of the run and each of its tasks.
+        """
+        events = self.get_for_run(db, run_id)
+        if not events:
+            return None
+
+        run_state = "running"
+        run_start, run_end = None, None
+        tasks = {}
+        for event in events:
+            if not event.task_id:
+                run_state = "success" if event.event == TaskEventType.run_success.value else "failed"
+                run_start, run_end = event.start, event.end
+                continue
+            task = tasks.setdefault(event.task_id, TaskProgress(task_id=event.task_id, state="running"))
+            task.state = TASK_STATES.get(TaskEventType(event.event), task.state)
+            task.try_number = event.try_number or task.try_number
+            task.start = event.start or task.start
+            task.end = event.end if event.event != TaskEventType.started.value else None
+            task.duration = event.duration if event.event != TaskEventType.started.value else None
+            if run_start is None or (task.start and task.start < run_start):
+                run_start = task.start
+
+        return RunProgress(
+            dag_id=events[0].dag_id,
+            run_id=run_id,
+            train_id=next((e.train_id for e in events if e.train_id), None),
+            state=run_state,
+            start=run_start,
+            end=run_end,
+            tasks=list(tasks.values()),
+        )
+
+
+train_task_events = CRUDTrainTaskEvents(TrainTaskEvent)
@@ -11,3 +11,7 @@ from station.app.models.fhir_server import FHIRServer
 from station.app.models.notification import Notification
 from station.app.models.local_trains import LocalTrain, LocalTrainExecution, LocalTrainState, \
     LocalTrainMasterImage
+from station.app.models.train_events import TrainTaskEvent
+from station.app.models.train_context import TrainRunContext
+from station.app.models.train_queue import TrainRunRequest
+from station.app.models.train_verification import TrainVerification
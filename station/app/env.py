@@ -11,6 +11,22 @@ class StationEnvironmentVariables(Enum):
     FERNET_KEY = "FERNET_KEY"
     STATION_DATA_DIR = "STATION_DATA_DIR"
     CONFIG_PATH = "STATION_CONFIG_PATH"
+    LOG_UPSTREAM_CALLS = "STATION_LOG_UPSTREAM_CALLS"
+
+    # status monitoring variables
+    STATUS_REFRESH_INTERVAL = "STATUS_REFRESH_INTERVAL"
+    STATUS_CHECK_TIMEOUT = "STATUS_CHECK_TIMEOUT"
+    STATUS_SAMPLE_INTERVAL = "STATUS_SAMPLE_INTERVAL"
+    # train run scheduling variables
+    SCHEDULER_ENABLED = "SCHEDULER_ENABLED"
+    SCHEDULER_MAX_CONCURRENT = "SCHEDULER_MAX_CONCURRENT"
+    SCHEDULER_GPUS = "SCHEDULER_GPUS"
+    # warm container pool for local trains
+    WARM_POOL_ENABLED = "WARM_POOL_ENABLED"
+    WARM_POOL_IMAGES = "WARM_POOL_IMAGES"
+    WARM_POOL_SIZE = "WARM_POOL_SIZE"
+    # directory shared by the api worker processes to aggregate metrics
+    PROMETHEUS_MULTIPROC_DIR = "PROMETHEUS_MULTIPROC_DIR"
 
     # central api configuration variables
     CENTRAL_API_URL = "CENTRAL_API_URL"
@@ -1,9 +1,22 @@
-from fastapi import FastAPI, Depends
+import os
+import time
+
+from fastapi import FastAPI, Depends, Request, Response
 from dotenv import load_dotenv, find_dotenv
 from fastapi.middleware.cors import CORSMiddleware
+from loguru import logger
 
 from station.app.api.api_v1.api import api_router
 from station.app.auth import authorized_user
+from station.app.env import StationEnvironmentVariables
+from station.app.metrics import REQUEST_COUNT, REQUEST_LATENCY, REQUESTS_IN_PROGRESS, render_metrics
+from station.app.status.hardware import hardware_sampler
+from station.clients.docker.stats import container_stats
+from station.app.status.health import health_monitor
+from station.app.trains.reconciler import execution_reconciler
+from station.app.trains.scheduler import execution_scheduler
+from station.app.trains.local.warm_pool import warm_pool_manager
+from station.clients.instrumentation import track_upstream_calls, summarize_calls
 
 
 load_dotenv(find_dotenv())
@@ -33,6 +46,81 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.on_event("startup")
+def start_background_tasks():
+    health_monitor.start()
+    hardware_sampler.start()
+    container_stats.start()
+    execution_reconciler.start()
+    execution_scheduler.start()
+    warm_pool_manager.start()
+
+
+@app.on_event("shutdown")
+def stop_background_tasks():
+    health_monitor.stop()
+    hardware_sampler.stop()
+    container_stats.stop()
+    execution_reconciler.stop()
+    execution_scheduler.stop()
+    warm_pool_manager.stop()
+
+
+@app.middleware("http")
+async def log_upstream_calls(request: Request, call_next):
+    """
+    Log the time spent waiting on upstream services for every api request, enabled with the
+    STATION_LOG_UPSTREAM_CALLS environment variable.
+    """
+    if os.getenv(StationEnvironmentVariables.LOG_UPSTREAM_CALLS.value, "false").lower() not in ("1", "true"):
+        return await call_next(request)
+
+    start = time.perf_counter()
+    with track_upstream_calls() as calls:
+        response = await call_next(request)
+    duration = time.perf_counter() - start
+    if calls:
+        upstreams = ", ".join(
+            f"{upstream}: {stats['duration']:.3f}s ({stats['calls']} calls, {stats['errors']} errors)"
+            for upstream, stats in summarize_calls(calls).items()
+        )
+        logger.info(f"{request.method} {request.url.path} - {response.status_code} in {duration:.3f}s, "
+                    f"upstream {upstreams}")
+    return response
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Record the number, latency and status codes of the api requests per route.
+    """
+    in_progress = REQUESTS_IN_PROGRESS.labels(request.method)
+    in_progress.inc()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        in_progress.dec()
+        # use the route template instead of the path to keep the number of label values bounded
+        route = request.scope.get("route")
+        route_path = route.path if route else "unmatched"
+        REQUEST_COUNT.labels(request.method, route_path, status_code).inc()
+        REQUEST_LATENCY.labels(request.method, route_path, status_code).observe(time.perf_counter() - start)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Metrics of the station api in the prometheus text format.
+    """
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
 app.include_router(
     api_router,
     prefix="/api",
@@ -0,0 +1,131 @@
+"""
+Prometheus metrics of the station api, exported at /metrics.
+
+When running uvicorn/gunicorn with several worker processes, set the PROMETHEUS_MULTIPROC_DIR environment variable to
+an empty, writable directory before starting the workers. The metrics of all workers are then aggregated from the
+files in this directory when the endpoint is scraped.
+"""
+import os
+from typing import Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, \
+    generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+from station.app.env import StationEnvironmentVariables
+from station.clients.instrumentation import DEFAULT_LATENCY_BUCKETS, UpstreamCall, upstream_metrics
+
+REQUEST_COUNT = Counter(
+    "station_http_requests_total",
+    "Number of api requests handled by the station",
+    ["method", "route", "status_code"],
+)
+REQUEST_LATENCY = Histogram(
+    "station_http_request_duration_seconds",
+    "Latency of the api requests handled by the station",
+    ["method", "route", "status_code"],
+    buckets=DEFAULT_LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "station_http_requests_in_progress",
+    "Number of api requests currently processed by the station",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+UPSTREAM_LATENCY = Histogram(
+    "station_upstream_request_duration_seconds",
+    "Latency of the calls made to upstream services",
+    ["upstream", "operation"],
+    buckets=DEFAULT_LATENCY_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "station_upstream_errors_total",
+    "Number of failed calls to upstream services",
+    ["upstream", "operation"],
+)
+UPSTREAM_RESPONSE_BYTES = Counter(
+    "station_upstream_response_bytes_total",
+    "Size of the responses received from upstream services",
+    ["upstream", "operation"],
+)
+CACHE_REQUESTS = Counter(
+    "station_cache_requests_total",
+    "Number of cache lookups by result",
+    ["result"],
+)
+TRAIN_EXECUTIONS = Counter(
+    "station_train_executions_total",
+    "Number of train executions started by the station",
+    ["train_type", "status"],
+)
+
+
+class DatabasePoolCollector:
+    """
+    Collects the connection pool statistics of the station database engine when scraped. In multiprocess mode the
+    statistics of the worker serving the request are reported.
+    """
+
+    def collect(self):
+        from station.app.db.session import engine
+
+        pool = engine.pool
+        metrics = {
+            "size": ("station_db_pool_size", "Configured size of the database connection pool"),
+            "checkedout": ("station_db_pool_checked_out", "Database connections currently in use"),
+            "checkedin": ("station_db_pool_checked_in", "Idle database connections in the pool"),
+            "overflow": ("station_db_pool_overflow", "Database connections opened beyond the pool size"),
+        }
+        for attr, (name, documentation) in metrics.items():
+            # not all pool implementations (e.g. for sqlite) track these statistics
+            statistic = getattr(pool, attr, None)
+            if callable(statistic):
+                yield GaugeMetricFamily(name, documentation, value=statistic())
+
+
+def record_upstream_call(call: UpstreamCall):
+    UPSTREAM_LATENCY.labels(call.upstream, call.operation).observe(call.duration)
+    if call.error:
+        UPSTREAM_ERRORS.labels(call.upstream, call.operation).inc()
+    if call.response_size:
+        UPSTREAM_RESPONSE_BYTES.labels(call.upstream, call.operation).inc(call.response_size)
+
+
+def record_cache_lookup(hit: bool):
+    CACHE_REQUESTS.labels("hit" if hit else "miss").inc()
+
+
+def record_train_execution(train_type: str, status: str):
+    """
+    Count a train execution.
+    Args:
+        train_type: type of the train, e.g. docker or local
+        status: outcome of starting the execution, e.g. triggered or failed
+    """
+    TRAIN_EXECUTIONS.labels(train_type, status).inc()
+
+
+def is_multiprocess() -> bool:
+    return bool(os.getenv(StationEnvironmentVariables.PROMETHEUS_MULTIPROC_DIR.value))
+
+
+_db_pool_collector = DatabasePoolCollector()
+if not is_multiprocess():
+    REGISTRY.register(_db_pool_collector)
+upstream_metrics.add_listener(record_upstream_call)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render the metrics in the prometheus text format.
+
+    Returns:
+        tuple of the rendered metrics and their content type
+    """
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_db_pool_collector)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
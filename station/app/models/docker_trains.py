@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, JSON
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, JSON, Float
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
@@ -24,9 +24,12 @@ class DockerTrainExecution(Base):
     #train_state_id = Column(Integer, ForeignKey('docker_train_states.id'), nullable=True)
     start = Column(DateTime, default=datetime.now())
     end = Column(DateTime, nullable=True)
+    status = Column(String, nullable=True)
+    duration = Column(Float, nullable=True)
     airflow_dag_run = Column(String, nullable=True)
     config = Column(Integer, ForeignKey('docker_train_configs.id'), nullable=True)
     dataset = Column(UUID, ForeignKey('datasets.id'), nullable=True)
+    execution_mode = Column(String, default="default")
 
 
 class DockerTrainConfig(Base):
@@ -40,6 +43,7 @@ class DockerTrainConfig(Base):
     cpu_requirements = Column(JSON, nullable=True)
     gpu_requirements = Column(JSON, nullable=True)
     auto_execute = Column(Boolean, default=False)
+    execution_mode = Column(String, default="default")
     dataset_id = Column(UUID(as_uuid=True), ForeignKey('datasets.id'), nullable=True)
 
 
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, JSON
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, JSON, Float
 from datetime import datetime
 
 from sqlalchemy.dialects.postgresql import UUID
@@ -28,6 +28,8 @@ class LocalTrainExecution(Base):
     dataset_id = Column(UUID(as_uuid=True), ForeignKey('datasets.id'), nullable=True)
     start = Column(DateTime, default=datetime.now())
     finish = Column(DateTime, nullable=True)
+    status = Column(String, nullable=True)
+    duration = Column(Float, nullable=True)
 
 
 class LocalTrainMasterImage(Base):
@@ -57,6 +59,9 @@ class LocalTrain(Base):
     state = relationship("LocalTrainState", cascade="all,delete", uselist=False)
     dataset_id = Column(UUID(as_uuid=True), ForeignKey('datasets.id'), nullable=True)
     config_id = Column(UUID(as_uuid=True), ForeignKey('local_train_configs.id'), nullable=True)
+    # hash of the inputs of the last image build and the id of the built image
+    build_hash = Column(String, nullable=True)
+    image_digest = Column(String, nullable=True)
 
 
 class LocalTrainConfig(Base):
@@ -0,0 +1,18 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, String, DateTime, JSON
+
+from station.app.db.base_class import Base
+
+
+class TrainRunContext(Base):
+    __tablename__ = "train_run_contexts"
+    id = Column(String, primary_key=True, index=True, default=lambda: uuid.uuid4().hex)
+    dag_id = Column(String)
+    run_id = Column(String, index=True)
+    train_id = Column(String, nullable=True, index=True)
+    # state shared between the tasks of a dag run, e.g. the train config, query and container settings
+    state = Column(JSON, default={})
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, nullable=True, onupdate=datetime.now)
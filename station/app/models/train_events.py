@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float
+from datetime import datetime
+
+from station.app.db.base_class import Base
+
+
+class TrainTaskEvent(Base):
+    __tablename__ = "train_task_events"
+    id = Column(Integer, primary_key=True, index=True)
+    dag_id = Column(String)
+    run_id = Column(String, index=True)
+    train_id = Column(String, nullable=True, index=True)
+    # task id is empty for events of the whole dag run
+    task_id = Column(String, nullable=True)
+    try_number = Column(Integer, nullable=True)
+    event = Column(String)
+    start = Column(DateTime, nullable=True)
+    end = Column(DateTime, nullable=True)
+    duration = Column(Float, nullable=True)
+    message = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float
+from datetime import datetime
+
+from station.app.db.base_class import Base
+
+
+class TrainRunRequest(Base):
+    __tablename__ = "train_run_requests"
+    id = Column(Integer, primary_key=True, index=True)
+    # docker or local
+    train_type = Column(String)
+    train_id = Column(String, index=True)
+    config_id = Column(String, nullable=True)
+    dataset_id = Column(String, nullable=True)
+    priority = Column(Integer, default=0)
+    # requested resources, memory in GB
+    cpus = Column(Float, default=1.0)
+    memory = Column(Float, default=0.0)
+    gpus = Column(Integer, default=0)
+    # queued, running, finished, failed or cancelled
+    status = Column(String, default="queued", index=True)
+    airflow_dag_run = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
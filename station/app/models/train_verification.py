@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, Float, UniqueConstraint
+
+from station.app.db.base_class import Base
+
+
+class TrainVerification(Base):
+    __tablename__ = "train_verifications"
+    __table_args__ = (UniqueConstraint("image_digest", "key_fingerprint"),)
+    id = Column(Integer, primary_key=True, index=True)
+    # id of the train image before the pre run protocol
+    image_digest = Column(String, index=True)
+    # fingerprint of the public key of the station key pair used to decrypt the train
+    key_fingerprint = Column(String, index=True)
+    train_id = Column(String, nullable=True, index=True)
+    # id of the verified and decrypted image created by the pre run protocol
+    verified_image = Column(String)
+    duration = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    last_used = Column(DateTime, nullable=True)
+    hits = Column(Integer, default=0)
@@ -0,0 +1,122 @@
+import gzip
+import json
+from typing import Optional
+
+from loguru import logger
+from minio.error import S3Error
+
+from station.app.cache import Cache
+from station.clients.airflow.client import AirflowClient, TERMINAL_TASK_STATES
+from station.clients.minio.client import MinioClient
+from station.ctl.constants import DataDirectories
+
+# dag run states after which the run information and task logs no longer change
+TERMINAL_RUN_STATES = {"success", "failed"}
+
+
+class FinishedRunCache:
+    """
+    Serves the information and task logs of airflow dag runs. Once a run or task has finished, its information is
+    stored in redis and its logs gzip compressed in minio on the first read, so that finished runs are served without
+    requests to airflow. Running runs are always served live.
+    """
+
+    def __init__(self, airflow: AirflowClient, redis: Cache, minio: MinioClient, ttl: int = 7 * 24 * 3600):
+        self.airflow = airflow
+        self.redis = redis
+        self.minio = minio
+        self.ttl = ttl
+
+    def get_run_information(self, dag_id: str, run_id: str) -> dict:
+        """
+        Get the information about a dag run including its task instances.
+        Args:
+            dag_id: id of the dag
+            run_id: airflow id of the run
+
+        Returns:
+            information about the run
+        """
+        cached = self._get_cached_run(dag_id, run_id)
+        if cached:
+            return cached
+
+        run_info = self.airflow.get_run_information(dag_id, run_id)
+        if run_info.get("state") in TERMINAL_RUN_STATES:
+            try:
+                self.redis.set(self._run_key(dag_id, run_id), json.dumps(run_info), ttl=self.ttl)
+            except Exception as e:
+                logger.warning(f"Unable to cache information of run {run_id}: {e}")
+        return run_info
+
+    def get_task_log(self, dag_id: str, run_id: str, task_id: str, task_try_number: int = None) -> str:
+        """
+        Get the log of a task. Logs of finished task tries are read from minio when available.
+        Args:
+            dag_id: id of the dag
+            run_id: airflow id of the run
+            task_id: id of the task
+            task_try_number: try number of the task, defaults to the last try
+
+        Returns:
+            the log of the task or an empty string if the task does not exist
+        """
+        try_number, finished = self._resolve_try(dag_id, run_id, task_id, task_try_number)
+        if not try_number:
+            return ""
+        if not finished:
+            return self.airflow.get_task_log(dag_id, run_id, task_id, try_number)
+
+        object_name = self._log_object_name(dag_id, run_id, task_id, try_number)
+        try:
+            return gzip.decompress(self.minio.get_file(DataDirectories.LOGS.value, object_name)).decode("utf-8")
+        except S3Error as e:
+            if e.code != "NoSuchKey":
+                logger.warning(f"Unable to read cached log {object_name}: {e}")
+
+        log = self.airflow.get_task_log(dag_id, run_id, task_id, try_number)
+        try:
+            self.minio.put_file(DataDirectories.LOGS.value, object_name, gzip.compress(log.encode("utf-8")),
+                                content_type="application/gzip")
+        except Exception as e:
+            logger.warning(f"Unable to cache log {object_name}: {e}")
+        return log
+
+    def _resolve_try(self, dag_id: str, run_id: str, task_id: str, task_try_number: int = None):
+        """
+        Resolve the try number of a task and whether the log of this try is final, using the cached run information
+        if the run has finished.
+        """
+        run_info = self._get_cached_run(dag_id, run_id)
+        if run_info:
+            try_numbers = [task["try_number"] for task in run_info["tasklist"]["task_instances"]
+                           if task["task_id"] == task_id]
+            if not try_numbers:
+                return None, False
+            last_try_number = max(max(try_numbers), 1)
+            if task_try_number and task_try_number <= last_try_number:
+                return task_try_number, True
+            return last_try_number, True
+
+        try_number, task_instance = self.airflow.resolve_try_number(dag_id, run_id, task_id, task_try_number)
+        if not try_number:
+            return None, False
+        # previous tries are final as well as the last one once the task has finished
+        finished = try_number < task_instance["try_number"] or task_instance.get("state") in TERMINAL_TASK_STATES
+        return try_number, finished
+
+    def _get_cached_run(self, dag_id: str, run_id: str) -> Optional[dict]:
+        try:
+            cached = self.redis.get(self._run_key(dag_id, run_id))
+        except Exception as e:
+            logger.warning(f"Unable to read cached information of run {run_id}: {e}")
+            return None
+        return json.loads(cached) if cached else None
+
+    @staticmethod
+    def _run_key(dag_id: str, run_id: str) -> str:
+        return f"airflow:run:{dag_id}:{run_id}"
+
+    @staticmethod
+    def _log_object_name(dag_id: str, run_id: str, task_id: str, try_number: int) -> str:
+        return f"airflow/{dag_id}/{run_id}/{task_id}/{try_number}.log.gz"
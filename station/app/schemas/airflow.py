@@ -45,6 +45,22 @@ class AirflowTaskLog(BaseModel):
     run_info: str
 
 
+class AirflowTaskLogChunk(BaseModel):
+    content: str
+    continuation_token: Optional[str]
+    try_number: int
+    state: Optional[str]
+
+
+class TrainLogPage(BaseModel):
+    run_id: str
+    page: int
+    pages: int
+    size: int
+    dropped: int
+    content: str
+
+
 class AirflowRunMsg(BaseModel):
     train_id: str
 
@@ -2,6 +2,8 @@ from pydantic import BaseModel, validator
 from datetime import datetime
 from typing import List, Optional, Union, Any, Dict
 
+from station.app.schemas.train_queue import TrainRunRequest
+
 
 class DBSchema(BaseModel):
     class Config:
@@ -42,6 +44,14 @@ class DockerTrainConfigBase(DBSchema):
     cpu_requirements: Optional[Dict[str, Any]] = None
     gpu_requirements: Optional[Dict[str, Any]] = None
     auto_execute: Optional[bool] = None
+    # "fast" runs all steps of the train in a single airflow task
+    execution_mode: Optional[str] = "default"
+
+    @validator('execution_mode')
+    def validate_execution_mode(cls, v):
+        if v not in (None, "default", "fast"):
+            raise ValueError(f"Invalid execution mode '{v}', must be 'default' or 'fast'")
+        return v
 
 
 class DockerTrainMinimal(DBSchema):
@@ -69,15 +79,61 @@ class DockerTrainConfig(DockerTrainConfigBase):
 class DockerTrainExecution(DBSchema):
     config_id: Optional[Union[int, str]] = "default"
     dataset_id: Optional[Union[int, str]] = None
+    # priority of the run when train runs are queued by the station
+    priority: Optional[int] = 0
 
 
 class DockerTrainSavedExecution(DBSchema):
+    id: Optional[int] = None
     start: datetime
     end: Optional[datetime] = None
+    status: Optional[str] = None
+    duration: Optional[float] = None
     airflow_dag_run: Optional[str] = None
     config: Optional[int] = None
     dataset: Optional[str] = None
     train_id: Optional[str] = None
+    execution_mode: Optional[str] = None
+
+
+class DockerTrainExecutionLatency(BaseModel):
+    execution_mode: str
+    count: int
+    # end-to-end latency in seconds from triggering the run until it finished
+    mean: Optional[float] = None
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    # duration of the airflow dag run in seconds
+    run_duration_mean: Optional[float] = None
+
+
+class DockerTrainInspection(BaseModel):
+    train_id: str
+    image: str
+    config: Dict[str, Any]
+    query: Optional[Dict[str, Any]] = None
+    # metadata files found in the image
+    files: List[str] = []
+
+
+class DockerTrainBulkRunItem(BaseModel):
+    train_id: str
+    # the config assigned to the train or the default config is used if not given
+    config_id: Optional[Union[int, str]] = None
+    dataset_id: Optional[Union[int, str]] = None
+
+
+class DockerTrainBulkRun(BaseModel):
+    trains: List[DockerTrainBulkRunItem]
+
+
+class DockerTrainRunResult(BaseModel):
+    train_id: str
+    success: bool
+    execution: Optional[DockerTrainSavedExecution] = None
+    # run request of the train when runs are queued by the station
+    request: Optional[TrainRunRequest] = None
+    error: Optional[str] = None
 
 
 class DockerTrain(DBSchema):
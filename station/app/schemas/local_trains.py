@@ -87,6 +87,8 @@ class LocalTrainExecution(BaseModel):
     dataset_id: Optional[uuid.UUID] = None
     start: datetime
     finish: Optional[datetime] = None
+    status: Optional[str] = None
+    duration: Optional[float] = None
 
     class Config:
         orm_mode = True
@@ -117,9 +119,13 @@ class LocalTrain(LocalTrainBase, DBSchema):
     updated_at: Optional[datetime] = None
     status: Optional[str] = None
     state: Optional[LocalTrainState] = None
+    build_hash: Optional[str] = None
+    image_digest: Optional[str] = None
 
 
 class LocalTrainRunConfig(BaseModel):
     dataset_id: Optional[str] = None
     config_id: Optional[int] = None
     config: Optional[Dict] = None
+    # priority of the run when train runs are queued by the station
+    priority: Optional[int] = 0
@@ -1,5 +1,6 @@
-from typing import List, Optional
+from typing import List, Optional, Dict
 from enum import Enum
+from datetime import datetime
 
 from pydantic import BaseModel
 
@@ -17,6 +18,9 @@ class StatusDocker(BaseModel):
 class ServiceStatus(BaseModel):
     name: str
     status: HealthStatus
+    latency: Optional[float] = None
+    checked_at: Optional[datetime] = None
+    detail: Optional[str] = None
 
 
 class DiskUsage(BaseModel):
@@ -34,14 +38,75 @@ class MemoryUsage(BaseModel):
     percent: float
 
 
+class IOUsage(BaseModel):
+    # bytes per second
+    disk_read_rate: float
+    disk_write_rate: float
+    net_sent_rate: float
+    net_recv_rate: float
+
+
 class HardwareResources(BaseModel):
     cpu: List[float]
     memory: MemoryUsage
     disk: DiskUsage
+    io: Optional[IOUsage] = None
     gpu: Optional[float] = None
+    timestamp: Optional[datetime] = None
+
+
+class HardwareHistory(BaseModel):
+    interval: float
+    timestamps: List[datetime]
+    cpu: List[float]
+    cpu_per_core: List[List[float]]
+    memory_total: int
+    memory_used: List[float]
+    memory_available: List[float]
+    memory_free: List[float]
+    memory_percent: List[float]
+    disk_total: int
+    disk_used: List[float]
+    disk_free: List[float]
+    disk_percent: List[float]
+    disk_read_rate: List[float]
+    disk_write_rate: List[float]
+    net_sent_rate: List[float]
+    net_recv_rate: List[float]
+
+
+class ContainerResourceUsage(BaseModel):
+    id: str
+    name: Optional[str] = None
+    train_id: Optional[str] = None
+    cpu_percent: float
+    memory_usage: int
+    memory_limit: int
+    memory_percent: float
+    # bytes per second
+    block_read_rate: float
+    block_write_rate: float
+    net_rx_rate: float
+    net_tx_rate: float
+    updated_at: Optional[datetime] = None
 
 
 class StationStatus(BaseModel):
     services: List[ServiceStatus]
     hardware: HardwareResources
     docker: Optional[dict] = None
+
+
+class UpstreamOperationStats(BaseModel):
+    upstream: str
+    operation: str
+    count: int
+    errors: int
+    latency_mean: Optional[float] = None
+    latency_p50: Optional[float] = None
+    latency_p95: Optional[float] = None
+    latency_max: Optional[float] = None
+    latency_buckets: Dict[str, int]
+    request_bytes: int
+    response_bytes: int
+    last_status_code: Optional[int] = None
@@ -0,0 +1,56 @@
+from typing import Optional, List
+from enum import Enum
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class TaskEventType(str, Enum):
+    started = "started"
+    success = "success"
+    failed = "failed"
+    retry = "retry"
+    run_success = "run_success"
+    run_failed = "run_failed"
+
+
+class DBSchema(BaseModel):
+    class Config:
+        orm_mode = True
+
+
+class TaskEventCreate(BaseModel):
+    dag_id: str
+    run_id: str
+    train_id: Optional[str] = None
+    task_id: Optional[str] = None
+    try_number: Optional[int] = None
+    event: TaskEventType
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    duration: Optional[float] = None
+    message: Optional[str] = None
+
+
+class TaskEvent(TaskEventCreate, DBSchema):
+    id: int
+    created_at: datetime
+
+
+class TaskProgress(BaseModel):
+    task_id: str
+    state: str
+    try_number: Optional[int] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    duration: Optional[float] = None
+
+
+class RunProgress(BaseModel):
+    dag_id: str
+    run_id: str
+    train_id: Optional[str] = None
+    state: str
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    tasks: List[TaskProgress]
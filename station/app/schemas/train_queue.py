@@ -0,0 +1,58 @@
+from typing import Optional, Dict
+from enum import Enum
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class TrainRunRequestStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    finished = "finished"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
+class DBSchema(BaseModel):
+    class Config:
+        orm_mode = True
+
+
+class Resources(BaseModel):
+    cpus: float = 0.0
+    # memory in GB
+    memory: float = 0.0
+    gpus: int = 0
+
+
+class TrainRunRequest(DBSchema):
+    id: int
+    train_type: str
+    train_id: str
+    config_id: Optional[str] = None
+    dataset_id: Optional[str] = None
+    priority: int = 0
+    cpus: float
+    memory: float
+    gpus: int
+    status: TrainRunRequestStatus
+    airflow_dag_run: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class TrainQueueStatus(BaseModel):
+    enabled: bool
+    queued: int
+    running: int
+    # number of queued requests by priority
+    queued_by_priority: Dict[int, int] = {}
+    # time in seconds the oldest queued request has been waiting
+    oldest_wait: Optional[float] = None
+    # average time in seconds requests started in the last hour waited in the queue
+    average_wait: Optional[float] = None
+    capacity: Resources
+    reserved: Resources
+    available: Resources
@@ -0,0 +1,23 @@
+from typing import Optional
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class TrainVerification(BaseModel):
+    id: int
+    image_digest: str
+    key_fingerprint: str
+    train_id: Optional[str] = None
+    verified_image: Optional[str] = None
+    duration: Optional[float] = None
+    created_at: Optional[datetime] = None
+    last_used: Optional[datetime] = None
+    hits: Optional[int] = 0
+
+    class Config:
+        orm_mode = True
+
+
+class TrainVerificationInvalidation(BaseModel):
+    removed: int
@@ -1,7 +1,7 @@
 import json
 import os
 import functools
-from typing import Union, Optional, Tuple
+from typing import List, Union, Optional, Tuple
 from enum import Enum
 
 import requests
@@ -98,6 +98,45 @@ class RedisSettings(BaseModel):
     db: Optional[int] = 0
 
 
+class StatusSettings(BaseModel):
+    # interval in seconds in which the health of the station services is checked in the background
+    refresh_interval: Optional[int] = 30
+    # maximum time in seconds a single service health check may take before it is reported as failed
+    check_timeout: Optional[float] = 5.0
+    # interval in seconds in which the hardware utilization of the station is sampled
+    sample_interval: Optional[float] = 5.0
+    # number of hardware samples kept in memory, one hour with the default interval
+    history_size: Optional[int] = 720
+    # interval in seconds in which the state of running train executions is synchronized with airflow
+    reconcile_interval: Optional[int] = 15
+
+
+class SchedulerSettings(BaseModel):
+    # queue train runs and only trigger them when the required resources are available
+    enabled: Optional[bool] = False
+    # interval in seconds in which queued train runs are admitted
+    interval: Optional[int] = 5
+    # maximum number of concurrently running trains, unlimited if not set
+    max_concurrent: Optional[int] = None
+    # number of gpus available to trains
+    gpus: Optional[int] = 0
+    # fraction of the host memory that is not handed out to trains
+    memory_reserve: Optional[float] = 0.1
+
+
+class WarmPoolSettings(BaseModel):
+    # keep paused containers of master images ready for local trains
+    enabled: Optional[bool] = False
+    # master images for which containers are kept ready
+    images: Optional[List[str]] = []
+    # number of paused containers kept per image
+    size: Optional[int] = 1
+    # interval in seconds in which the pool is refilled
+    interval: Optional[int] = 30
+    # claimed containers running longer than this many seconds are removed, e.g. after the worker running it crashed
+    max_run_time: Optional[int] = 24 * 60 * 60
+
+
 class AuthConfig(BaseModel):
     robot_id: str
     robot_secret: SecretStr
@@ -168,6 +207,9 @@ class StationConfig(BaseModel):
     minio: Optional[MinioSettings] = None
     central_ui: Optional[CentralUISettings] = CentralUISettings()
     redis: Optional[RedisSettings] = RedisSettings()
+    status: Optional[StatusSettings] = StatusSettings()
+    scheduler: Optional[SchedulerSettings] = SchedulerSettings()
+    warm_pool: Optional[WarmPoolSettings] = WarmPoolSettings()
 
     @classmethod
     def from_file(cls, path: str) -> "StationConfig":
@@ -253,7 +295,10 @@ class StationConfig(BaseModel):
             airflow=airflow_settings,
             minio=minio_settings,
             central_ui=central_settings,
-            redis=RedisSettings()
+            redis=RedisSettings(),
+            status=StatusSettings(**(config_dict.get("status") or {})),
+            scheduler=SchedulerSettings(**(config_dict.get("scheduler") or {})),
+            warm_pool=WarmPoolSettings(**(config_dict.get("warm_pool") or {})),
         )
 
     def to_file(self, path: str) -> None:
@@ -424,6 +469,9 @@ class Settings:
         self._setup_fernet()
         self._setup_station_auth()
         self._setup_redis()
+        self._setup_status()
+        self._setup_scheduler()
+        self._setup_warm_pool()
         self._setup_registry_connection()
         self._setup_minio_connection()
 
@@ -570,6 +618,70 @@ class Settings:
             logger.info(f"\t{Emojis.INFO}No redis connection specified in config or env vars. Using default."
                         f" Host: {self.config.redis.host}, Port: {self.config.redis.port}")
 
+    def _setup_status(self):
+        """
+        Configure the interval and timeouts of the background service health checks and the hardware sampling
+        interval from environment variables or config file.
+        Returns:
+
+        """
+        if not self.config.status:
+            self.config.status = StatusSettings()
+        refresh_interval = os.getenv(StationEnvironmentVariables.STATUS_REFRESH_INTERVAL.value)
+        if refresh_interval:
+            logger.debug(f"\t{Emojis.INFO}Overriding status refresh interval with env var specification.")
+            self.config.status.refresh_interval = int(refresh_interval)
+        check_timeout = os.getenv(StationEnvironmentVariables.STATUS_CHECK_TIMEOUT.value)
+        if check_timeout:
+            logger.debug(f"\t{Emojis.INFO}Overriding status check timeout with env var specification.")
+            self.config.status.check_timeout = float(check_timeout)
+        sample_interval = os.getenv(StationEnvironmentVariables.STATUS_SAMPLE_INTERVAL.value)
+        if sample_interval:
+            logger.debug(f"\t{Emojis.INFO}Overriding hardware sample interval with env var specification.")
+            self.config.status.sample_interval = float(sample_interval)
+
+    def _setup_scheduler(self):
+        """
+        Configure the admission control of train runs from environment variables or config file.
+        Returns:
+
+        """
+        if not self.config.scheduler:
+            self.config.scheduler = SchedulerSettings()
+        enabled = os.getenv(StationEnvironmentVariables.SCHEDULER_ENABLED.value)
+        if enabled:
+            logger.debug(f"\t{Emojis.INFO}Overriding scheduler activation with env var specification.")
+            self.config.scheduler.enabled = enabled.lower() in ("1", "true")
+        max_concurrent = os.getenv(StationEnvironmentVariables.SCHEDULER_MAX_CONCURRENT.value)
+        if max_concurrent:
+            logger.debug(f"\t{Emojis.INFO}Overriding maximum concurrent train runs with env var specification.")
+            self.config.scheduler.max_concurrent = int(max_concurrent)
+        gpus = os.getenv(StationEnvironmentVariables.SCHEDULER_GPUS.value)
+        if gpus:
+            logger.debug(f"\t{Emojis.INFO}Overriding number of available gpus with env var specification.")
+            self.config.scheduler.gpus = int(gpus)
+
+    def _setup_warm_pool(self):
+        """
+        Configure the pool of warm containers for local trains from environment variables or config file.
+        Returns:
+
+        """
+        if not self.config.warm_pool:
+            self.config.warm_pool = WarmPoolSettings()
+        enabled = os.getenv(StationEnvironmentVariables.WARM_POOL_ENABLED.value)
+        if enabled:
+            logger.debug(f"\t{Emojis.INFO}Overriding warm pool activation with env var specification.")
+            self.config.warm_pool.enabled = enabled.lower() in ("1", "true")
+        images = os.getenv(StationEnvironmentVariables.WARM_POOL_IMAGES.value)
+        if images:
+            logger.debug(f"\t{Emojis.INFO}Overriding warm pool images with env var specification.")
+            self.config.warm_pool.images = [image.strip() for image in images.split(",") if image.strip()]
+        size = os.getenv(StationEnvironmentVariables.WARM_POOL_SIZE.value)
+        if size:
+            logger.debug(f"\t{Emojis.INFO}Overriding warm pool size with env var specification.")
+            self.config.warm_pool.size = int(size)
+
     def _setup_station_auth(self):
         """
         Configure the connection to the station auth from environment variables or config file.
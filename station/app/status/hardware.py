@@ -0,0 +1,239 @@
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+import psutil
+from loguru import logger
+
+from station.app.config import settings
+from station.app.schemas import station_status as status_schema
+from station.app.settings import StatusSettings
+
+
+class RingBuffer:
+    """
+    Fixed size buffer of time stamped samples backed by a preallocated numpy array. Once full, the oldest samples
+    are overwritten.
+    """
+
+    def __init__(self, capacity: int, width: int):
+        self.capacity = capacity
+        self.width = width
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros((capacity, width), dtype=np.float64)
+        self._index = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, values: np.ndarray):
+        with self._lock:
+            self._timestamps[self._index] = timestamp
+            self._values[self._index] = values
+            self._index = (self._index + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def latest(self) -> Optional[Tuple[float, np.ndarray]]:
+        with self._lock:
+            if not self._size:
+                return None
+            index = (self._index - 1) % self.capacity
+            return self._timestamps[index], self._values[index].copy()
+
+    def window(self, seconds: float = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the samples of the last seconds in chronological order.
+        Args:
+            seconds: length of the window, all samples are returned if not given
+
+        Returns:
+            tuple of timestamps and the corresponding sample values
+        """
+        with self._lock:
+            if self._size < self.capacity:
+                timestamps = self._timestamps[:self._size].copy()
+                values = self._values[:self._size].copy()
+            else:
+                timestamps = np.roll(self._timestamps, -self._index)
+                values = np.roll(self._values, -self._index, axis=0)
+        if seconds is not None and len(timestamps):
+            mask = timestamps >= timestamps[-1] - seconds
+            timestamps, values = timestamps[mask], values[mask]
+        return timestamps, values
+
+
+def downsample(timestamps: np.ndarray, values: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce the samples to at most the given number of points by averaging consecutive samples.
+    """
+    if points <= 0 or len(timestamps) <= points:
+        return timestamps, values
+    bins = np.array_split(np.arange(len(timestamps)), points)
+    ds_timestamps = np.array([timestamps[b].mean() for b in bins])
+    ds_values = np.stack([values[b].mean(axis=0) for b in bins])
+    return ds_timestamps, ds_values
+
+
+class HardwareSampler:
+    """
+    Samples the hardware utilization of the station (cpu per core, memory, disk and disk/network io) in a fixed
+    interval in a background thread and stores the samples in a ring buffer. Status requests are served from the
+    latest sample.
+    """
+    # layout of the columns following the per core cpu values in a sample
+    COLUMNS = ["memory_used", "memory_available", "memory_free", "memory_percent", "disk_used", "disk_free",
+               "disk_percent", "disk_read_rate", "disk_write_rate", "net_sent_rate", "net_recv_rate"]
+
+    def __init__(self, interval: float = None, capacity: int = None, disk_path: str = "./"):
+        self._interval = interval
+        self._capacity = capacity
+        self.disk_path = disk_path
+        self.n_cores = psutil.cpu_count() or 1
+        self.memory_total = psutil.virtual_memory().total
+        self.disk_total = psutil.disk_usage(self.disk_path).total
+        self.buffer: Optional[RingBuffer] = None
+        self._last_counters = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def status_settings(self) -> StatusSettings:
+        if settings.is_initialized and settings.config.status:
+            return settings.config.status
+        return StatusSettings()
+
+    @property
+    def interval(self) -> float:
+        return self._interval or self.status_settings.sample_interval
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity or self.status_settings.history_size
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        if self.buffer is None:
+            self.buffer = RingBuffer(self.capacity, self.n_cores + len(self.COLUMNS))
+        # the first call of cpu_percent only sets the reference point for the following measurements
+        psutil.cpu_percent(interval=None, percpu=True)
+        self._last_counters = self._io_counters()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="hardware-sampler", daemon=True)
+        self._thread.start()
+        logger.info(f"Started hardware sampler, interval: {self.interval}s, history size: {self.capacity}")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def sample(self):
+        """
+        Take a sample of the current hardware utilization and add it to the buffer.
+        """
+        now = time.time()
+        cpu = psutil.cpu_percent(interval=None, percpu=True)
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+
+        counters = self._io_counters()
+        last_time, last_counters = self._last_counters
+        elapsed = max(counters[0] - last_time, 1e-6)
+        rates = [max(current - last, 0) / elapsed for current, last in zip(counters[1], last_counters)]
+        self._last_counters = counters
+
+        values = np.array(cpu + [memory.used, memory.available, memory.free, memory.percent,
+                                 disk.used, disk.free, disk.percent] + rates, dtype=np.float64)
+        self.buffer.append(now, values)
+
+    def latest(self) -> Optional[status_schema.HardwareResources]:
+        """
+        Get the most recent sample, None if no samples have been taken yet.
+        """
+        if self.buffer is None:
+            return None
+        latest = self.buffer.latest()
+        if latest is None:
+            return None
+        timestamp, values = latest
+        return self._to_resources(timestamp, values)
+
+    def history(self, window: float = 3600, points: int = 120) -> status_schema.HardwareHistory:
+        """
+        Get the samples of the given time window downsampled to at most the given number of points.
+        Args:
+            window: length of the window in seconds
+            points: maximum number of points to return
+
+        Returns:
+            the hardware utilization history
+        """
+        if self.buffer is None:
+            timestamps, values = np.zeros(0), np.zeros((0, self.n_cores + len(self.COLUMNS)))
+        else:
+            timestamps, values = downsample(*self.buffer.window(window), points=points)
+        cpu = values[:, :self.n_cores]
+        columns = {name: values[:, self.n_cores + i].tolist() for i, name in enumerate(self.COLUMNS)}
+        return status_schema.HardwareHistory(
+            interval=self.interval,
+            timestamps=[datetime.fromtimestamp(t) for t in timestamps],
+            cpu=cpu.mean(axis=1).tolist() if len(cpu) else [],
+            cpu_per_core=cpu.tolist(),
+            memory_total=self.memory_total,
+            disk_total=self.disk_total,
+            **columns,
+        )
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling hardware resources: {e}")
+
+    @staticmethod
+    def _io_counters() -> Tuple[float, List[float]]:
+        disk_io = psutil.disk_io_counters()
+        net_io = psutil.net_io_counters()
+        counters = [
+            disk_io.read_bytes if disk_io else 0,
+            disk_io.write_bytes if disk_io else 0,
+            net_io.bytes_sent if net_io else 0,
+            net_io.bytes_recv if net_io else 0,
+        ]
+        return time.time(), counters
+
+    def _to_resources(self, timestamp: float, values: np.ndarray) -> status_schema.HardwareResources:
+        column = {name: values[self.n_cores + i] for i, name in enumerate(self.COLUMNS)}
+        return status_schema.HardwareResources(
+            timestamp=datetime.fromtimestamp(timestamp),
+            cpu=values[:self.n_cores].tolist(),
+            memory=status_schema.MemoryUsage(
+                total=self.memory_total,
+                available=int(column["memory_available"]),
+                free=int(column["memory_free"]),
+                used=int(column["memory_used"]),
+                percent=column["memory_percent"],
+            ),
+            disk=status_schema.DiskUsage(
+                total=self.disk_total,
+                used=int(column["disk_used"]),
+                free=int(column["disk_free"]),
+                percent=column["disk_percent"],
+            ),
+            io=status_schema.IOUsage(
+                disk_read_rate=column["disk_read_rate"],
+                disk_write_rate=column["disk_write_rate"],
+                net_sent_rate=column["net_sent_rate"],
+                net_recv_rate=column["net_recv_rate"],
+            ),
+        )
+
+
+hardware_sampler = HardwareSampler()
@@ -0,0 +1,244 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from station.app.config import clients, settings
+from station.app.schemas.station_status import HealthStatus, ServiceStatus
+from station.app.settings import StatusSettings
+from station.clients.instrumentation import instrumented
+
+HealthCheck = Callable[[], Tuple[HealthStatus, Optional[str]]]
+
+
+class ServiceHealthMonitor:
+    """
+    Checks the health of the services the station depends on concurrently, each with its own deadline, and caches
+    the results. A background thread refreshes the cached results in a fixed interval so that status requests are
+    answered without waiting on the services. Every check uses a client level timeout and a check is not started
+    again while its previous execution is still running, so hanging services can not exhaust the worker pool.
+    """
+
+    def __init__(self, refresh_interval: int = None, check_timeout: float = None, max_workers: int = 8):
+        self._refresh_interval = refresh_interval
+        self._check_timeout = check_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="health-check")
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._statuses: List[ServiceStatus] = []
+        self._running: Dict[str, Future] = {}
+        self._postgres_engine: Optional[Engine] = None
+        self._postgres_timeout: Optional[float] = None
+        self._updated_at: Optional[float] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def status_settings(self) -> StatusSettings:
+        if settings.is_initialized and settings.config.status:
+            return settings.config.status
+        return StatusSettings()
+
+    @property
+    def refresh_interval(self) -> int:
+        return self._refresh_interval or self.status_settings.refresh_interval
+
+    @property
+    def check_timeout(self) -> float:
+        return self._check_timeout or self.status_settings.check_timeout
+
+    def start(self):
+        """
+        Start refreshing the health status of the services in the background.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="health-monitor", daemon=True)
+        self._thread.start()
+        logger.info(f"Started service health monitor, refresh interval: {self.refresh_interval}s")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.check_timeout)
+            self._thread = None
+
+    def get_statuses(self, refresh: bool = False) -> List[ServiceStatus]:
+        """
+        Get the cached health status of all services. The checks are executed when forced or no fresh results are
+        available.
+        Args:
+            refresh: run the health checks even if cached results exist
+
+        Returns:
+            list of service statuses
+        """
+        with self._lock:
+            is_stale = self._updated_at is None or time.monotonic() - self._updated_at > 2 * self.refresh_interval
+            statuses = self._statuses
+        if refresh or is_stale:
+            statuses = self.refresh()
+        return statuses
+
+    def refresh(self) -> List[ServiceStatus]:
+        """
+        Run all health checks concurrently and update the cached results. Checks exceeding the deadline are reported
+        as failed.
+        """
+        timeout = self.check_timeout
+        checks = self._checks()
+        futures = {}
+        with self._submit_lock:
+            for name, check in checks.items():
+                previous = self._running.get(name)
+                # a check still running from a previous refresh is awaited instead of starting another one
+                futures[name] = previous if previous and not previous.done() else \
+                    self._executor.submit(self._run_check, name, check)
+            self._running = futures
+        wait(futures.values(), timeout=timeout)
+
+        statuses = []
+        for name, future in futures.items():
+            if future.done():
+                statuses.append(future.result())
+            else:
+                logger.warning(f"Health check for {name} did not finish within {timeout}s")
+                statuses.append(ServiceStatus(
+                    name=name,
+                    status=HealthStatus.error,
+                    latency=timeout,
+                    checked_at=datetime.now(),
+                    detail=f"Health check timed out after {timeout}s",
+                ))
+
+        with self._lock:
+            self._statuses = statuses
+            self._updated_at = time.monotonic()
+        return statuses
+
+    def _refresh_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing service health status: {e}")
+            self._stop_event.wait(self.refresh_interval)
+
+    @staticmethod
+    def _run_check(name: str, check: HealthCheck) -> ServiceStatus:
+        start = time.perf_counter()
+        try:
+            status, detail = check()
+        except Exception as e:
+            status, detail = HealthStatus.error, str(e)
+        return ServiceStatus(
+            name=name,
+            status=status,
+            latency=time.perf_counter() - start,
+            checked_at=datetime.now(),
+            detail=detail,
+        )
+
+    def _checks(self) -> Dict[str, HealthCheck]:
+        timeout = self.check_timeout
+        checks = {
+            "airflow": lambda: (clients.airflow.health_check(timeout=timeout), None),
+            "harbor": lambda: (clients.harbor.health_check(timeout=timeout), None),
+            "minio": lambda: (clients.minio.health_check(timeout=timeout), None),
+            "redis": lambda: self._check_redis(timeout),
+            "postgres": lambda: self._check_postgres(timeout),
+        }
+        checks.update(self._fhir_server_checks())
+        return checks
+
+    @staticmethod
+    @instrumented("redis", "health_check")
+    def _check_redis(timeout: float) -> Tuple[HealthStatus, Optional[str]]:
+        import redis
+
+        connection_kwargs = dict(clients.redis.redis.connection_pool.connection_kwargs)
+        connection_kwargs.update(socket_timeout=timeout, socket_connect_timeout=timeout)
+        client = redis.Redis(**connection_kwargs)
+        try:
+            if client.ping():
+                return HealthStatus.healthy, None
+        finally:
+            client.close()
+        return HealthStatus.error, "Redis did not respond to ping"
+
+    @instrumented("postgres", "health_check")
+    def _check_postgres(self, timeout: float) -> Tuple[HealthStatus, Optional[str]]:
+        with self._health_check_engine(timeout).connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return HealthStatus.healthy, None
+
+    def _health_check_engine(self, timeout: float) -> Engine:
+        """
+        Engine without a pool whose connections time out while connecting and executing statements.
+        """
+        from station.app.db.session import engine
+
+        if engine.dialect.name != "postgresql":
+            return engine
+        if self._postgres_engine is None or self._postgres_timeout != timeout:
+            self._postgres_engine = create_engine(
+                engine.url,
+                poolclass=NullPool,
+                connect_args={
+                    "connect_timeout": max(int(timeout), 1),
+                    "options": f"-c statement_timeout={int(timeout * 1000)}",
+                },
+            )
+            self._postgres_timeout = timeout
+        return self._postgres_engine
+
+    def _fhir_server_checks(self) -> Dict[str, HealthCheck]:
+        """
+        Create a health check for each active FHIR server registered in the station database.
+        """
+        from station.app.db.session import SessionLocal
+        from station.app.crud.crud_fhir_servers import fhir_servers
+        from station.app.fhir.server import fhir_server_from_db
+
+        checks = {}
+        db = SessionLocal()
+        try:
+            for db_server in fhir_servers.get_multi(db):
+                if not db_server.active:
+                    continue
+                server = fhir_server_from_db(db, db_server.id, server=db_server)
+                if server is None:
+                    continue
+                checks[f"fhir:{db_server.name or db_server.id}"] = self._make_fhir_check(server)
+        except Exception as e:
+            logger.error(f"Unable to load FHIR servers for health checks: {e}")
+        finally:
+            db.close()
+        return checks
+
+    def _make_fhir_check(self, server) -> HealthCheck:
+        timeout = self.check_timeout
+
+        @instrumented("fhir", "health_check")
+        def check() -> Tuple[HealthStatus, Optional[str]]:
+            deadline = time.monotonic() + timeout
+            # only the headers are read, the capability statement in the body can be large
+            r = server.session.get(f"{server.api_address}/metadata", timeout=(timeout, timeout), stream=True)
+            r.close()
+            if time.monotonic() > deadline:
+                return HealthStatus.error, f"Server did not respond within {timeout}s"
+            if r.status_code == 200:
+                return HealthStatus.healthy, None
+            return HealthStatus.error, f"Server responded with status code {r.status_code}"
+
+        return check
+
+
+health_monitor = ServiceHealthMonitor()
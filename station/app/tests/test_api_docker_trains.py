@@ -336,6 +336,28 @@ def test_run_docker_train(train_id, docker_train_config, config_id):
         assert execution_response.json()[-1]["airflow_dag_run"] == response.json()["airflow_dag_run"]
 
 
+def test_run_docker_trains_bulk(train_id, config_id):
+    if os.getenv("ENVIRONMENT") == "testing":
+        old_state = client.get(f"/api/trains/docker/{train_id}/state")
+
+        response = client.post("/api/trains/docker/run", json={"trains": [
+            {"train_id": train_id},
+            {"train_id": train_id, "config_id": "default"},
+            {"train_id": "not-a-train"},
+            {"train_id": train_id, "config_id": "not-a-config"},
+        ]})
+        assert response.status_code == 200, response.text
+        results = response.json()
+        assert [result["success"] for result in results] == [True, True, False, False]
+        assert results[0]["execution"]["config"] == config_id
+        assert results[1]["execution"]["config"] is None
+        assert results[2]["error"]
+        assert "not-a-config" in results[3]["error"]
+
+        state_response = client.get(f"/api/trains/docker/{train_id}/state")
+        assert old_state.json()["num_executions"] + 2 == state_response.json()["num_executions"]
+
+
 def test_run_docker_train_fails(train_id, docker_train_config, config_id):
     old_state = client.get(f"/api/trains/docker/{train_id}/state")
     old_executions = client.get(f"/api/trains/docker/{train_id}/executions")
@@ -0,0 +1,54 @@
+from station.trains.docker.resources import CpusetAllocator, ResourceProfile, container_limits, \
+    gpu_device_requests, parse_cpu_list, train_resources
+
+
+def test_container_limits_with_default_profile():
+    profile = ResourceProfile(cpus=2, memory=4, blkio_weight=300)
+    assert container_limits({"cpus": 1.5}, profile) == {
+        "nano_cpus": 1500000000,
+        "mem_limit": "4096m",
+        "memswap_limit": "4096m",
+        "blkio_weight": 300,
+    }
+    assert container_limits(None) == {}
+
+
+def test_train_resources_from_requirements():
+    resources = train_resources({"cpus": 2, "memory": 8, "unknown": 1}, {"count": 1})
+    assert resources == {"cpus": 2, "memory": 8, "gpus": 1}
+    assert gpu_device_requests(resources["gpus"])[0]["Count"] == 1
+    assert gpu_device_requests([0, 1])[0]["DeviceIDs"] == ["0,1"]
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+
+
+def test_cpuset_allocation_prefers_single_numa_node(tmp_path):
+    allocator = CpusetAllocator(str(tmp_path), nodes={0: [0, 1, 2, 3], 1: [4, 5, 6, 7]}, grace_period=-1)
+
+    first = allocator.allocate("run-1", 3)
+    second = allocator.allocate("run-2", 2)
+    assert first == "0,1,2"
+    # the second run fits into the node with more free cpus
+    assert second == "4,5"
+    # no single node has three free cpus left
+    assert allocator.allocate("run-3", 3) == "3,6,7"
+    assert allocator.allocate("run-4", 1) is None
+
+    # allocations of runs that are no longer running are released
+    assert allocator.allocate("run-4", 2, active_runs=["run-1", "run-4"]) == "4,5"
+    allocator.release("run-1")
+    assert set(allocator.allocations()) == {"run-4"}
+
+
+def test_cpuset_allocation_keeps_runs_within_grace_period(tmp_path):
+    allocator = CpusetAllocator(str(tmp_path), nodes={0: [0, 1, 2, 3]})
+    assert allocator.allocate("run-1", 2) == "0,1"
+
+    # the container of the first run has not been started yet
+    assert allocator.allocate("run-2", 2, active_runs=["run-2"]) == "2,3"
+    assert set(allocator.allocations()) == {"run-1", "run-2"}
+
+    expired = CpusetAllocator(str(tmp_path), nodes={0: [0, 1, 2, 3]}, grace_period=-1)
+    assert expired.allocate("run-3", 2, active_runs=["run-2", "run-3"]) == "0,1"
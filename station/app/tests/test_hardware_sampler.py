@@ -0,0 +1,55 @@
+import numpy as np
+
+from station.app.status.hardware import HardwareSampler, RingBuffer, downsample
+
+
+def test_ring_buffer_wraps_around():
+    buffer = RingBuffer(capacity=3, width=1)
+    assert buffer.latest() is None
+
+    for i in range(5):
+        buffer.append(float(i), np.array([i * 10]))
+
+    assert len(buffer) == 3
+    timestamp, values = buffer.latest()
+    assert timestamp == 4.0
+    assert values.tolist() == [40.0]
+
+    timestamps, values = buffer.window()
+    assert timestamps.tolist() == [2.0, 3.0, 4.0]
+    assert values[:, 0].tolist() == [20.0, 30.0, 40.0]
+
+    timestamps, _ = buffer.window(seconds=1)
+    assert timestamps.tolist() == [3.0, 4.0]
+
+
+def test_downsample():
+    timestamps = np.arange(10, dtype=np.float64)
+    values = np.arange(10, dtype=np.float64).reshape(-1, 1)
+
+    ds_timestamps, ds_values = downsample(timestamps, values, points=5)
+    assert ds_timestamps.tolist() == [0.5, 2.5, 4.5, 6.5, 8.5]
+    assert ds_values[:, 0].tolist() == [0.5, 2.5, 4.5, 6.5, 8.5]
+
+    assert len(downsample(timestamps, values, points=20)[0]) == 10
+
+
+def test_hardware_sampler():
+    sampler = HardwareSampler(interval=60, capacity=10)
+    assert sampler.latest() is None
+
+    sampler.start()
+    try:
+        sampler.sample()
+        sampler.sample()
+    finally:
+        sampler.stop()
+
+    latest = sampler.latest()
+    assert len(latest.cpu) == sampler.n_cores
+    assert latest.memory.total == sampler.memory_total
+    assert latest.io.disk_read_rate >= 0
+
+    history = sampler.history(points=1)
+    assert len(history.timestamps) == 1
+    assert len(history.cpu_per_core[0]) == sampler.n_cores
@@ -0,0 +1,73 @@
+import time
+
+from station.app.schemas.station_status import HealthStatus
+from station.app.status.health import ServiceHealthMonitor
+
+
+def _slow_check():
+    time.sleep(2)
+    return HealthStatus.healthy, None
+
+
+def _failing_check():
+    raise ConnectionError("service unavailable")
+
+
+def test_health_checks_run_concurrently_with_deadline(monkeypatch):
+    monitor = ServiceHealthMonitor(refresh_interval=60, check_timeout=0.5)
+    monkeypatch.setattr(monitor, "_checks", lambda: {
+        "healthy": lambda: (HealthStatus.healthy, None),
+        "slow": _slow_check,
+        "failing": _failing_check,
+    })
+
+    start = time.perf_counter()
+    statuses = {status.name: status for status in monitor.get_statuses()}
+    assert time.perf_counter() - start < 1.5
+
+    assert statuses["healthy"].status == HealthStatus.healthy
+    assert statuses["healthy"].latency is not None
+    assert statuses["slow"].status == HealthStatus.error
+    assert "timed out" in statuses["slow"].detail
+    assert statuses["failing"].status == HealthStatus.error
+    assert statuses["failing"].detail == "service unavailable"
+
+
+def test_health_check_results_are_cached(monkeypatch):
+    monitor = ServiceHealthMonitor(refresh_interval=60, check_timeout=0.5)
+    calls = []
+
+    def check():
+        calls.append(1)
+        return HealthStatus.healthy, None
+
+    monkeypatch.setattr(monitor, "_checks", lambda: {"service": check})
+
+    monitor.get_statuses()
+    monitor.get_statuses()
+    assert len(calls) == 1
+
+    monitor.get_statuses(refresh=True)
+    assert len(calls) == 2
+
+
+def test_hanging_check_is_not_started_again(monkeypatch):
+    monitor = ServiceHealthMonitor(refresh_interval=60, check_timeout=0.2)
+    calls = []
+
+    def hanging_check():
+        calls.append(1)
+        time.sleep(1)
+        return HealthStatus.healthy, None
+
+    monkeypatch.setattr(monitor, "_checks", lambda: {"hanging": hanging_check})
+
+    monitor.refresh()
+    statuses = monitor.refresh()
+    assert len(calls) == 1
+    assert statuses[0].status == HealthStatus.error
+
+    # the check is started again once the previous execution has finished
+    time.sleep(1)
+    monitor.refresh()
+    assert len(calls) == 2
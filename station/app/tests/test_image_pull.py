@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+from docker.errors import ImageNotFound
+
+from station.trains.docker.images import ensure_image, split_repository
+
+REPOSITORY = "harbor.example.org/station_1/train-id"
+
+
+class FakeImages:
+    def __init__(self, digests: dict):
+        self.digests = digests
+
+    def get(self, name):
+        if name not in self.digests:
+            raise ImageNotFound(name)
+        return SimpleNamespace(attrs={"RepoDigests": [f"{REPOSITORY}@{self.digests[name]}"]})
+
+
+class FakeApi:
+    def __init__(self, images: FakeImages):
+        self.images = images
+        self.pulled = []
+
+    def pull(self, repository, tag, stream=True, decode=True):
+        self.pulled.append(f"{repository}:{tag}")
+        self.images.digests[f"{repository}:{tag}"] = "sha256:new"
+        yield {"status": "Downloading", "id": "layer", "progressDetail": {"current": 10, "total": 100}}
+        yield {"status": "Download complete", "id": "layer"}
+
+
+class FakeHarbor:
+    def get_artifact_digest(self, project, repository, reference):
+        assert (project, repository) == ("station_1", "train-id")
+        return "sha256:new"
+
+
+def _client(digests: dict):
+    images = FakeImages(digests)
+    return SimpleNamespace(images=images, api=FakeApi(images))
+
+
+def test_split_repository():
+    assert split_repository(REPOSITORY) == ("harbor.example.org", "station_1", "train-id")
+
+
+def test_pull_is_skipped_for_unchanged_images():
+    client = _client({f"{REPOSITORY}:latest": "sha256:new"})
+    logins = []
+
+    result = ensure_image(client, FakeHarbor(), REPOSITORY, "latest", login=lambda: logins.append(1))
+
+    assert not result.pulled
+    assert client.api.pulled == []
+    assert logins == []
+
+
+def test_changed_images_are_pulled():
+    client = _client({f"{REPOSITORY}:latest": "sha256:old"})
+
+    result = ensure_image(client, FakeHarbor(), REPOSITORY, "latest")
+
+    assert result.pulled
+    assert result.digest == "sha256:new"
+    assert result.bytes_downloaded == 100
+    assert client.api.pulled == [f"{REPOSITORY}:latest"]
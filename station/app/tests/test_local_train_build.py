@@ -0,0 +1,121 @@
+import tarfile
+from io import BytesIO
+from types import SimpleNamespace
+
+from docker.errors import ImageNotFound
+
+from station.trains.local import build
+from station.trains.local.build import build_train, train_build_hash
+
+
+class FakeImages:
+    def __init__(self, ids: dict):
+        self.ids = ids
+
+    def get(self, name):
+        if name not in self.ids:
+            raise ImageNotFound(name)
+        return SimpleNamespace(id=self.ids[name])
+
+
+class FakeClient:
+    def __init__(self, ids: dict):
+        self.images = FakeImages(ids)
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+
+def make_archive(files: dict, mtime: int = 0) -> BytesIO:
+    archive = BytesIO()
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = mtime
+            tar.addfile(info, BytesIO(data))
+    archive.seek(0)
+    return archive
+
+
+def make_train(**kwargs):
+    fields = dict(entrypoint="entrypoint.py", command="python", command_args=None, build_hash=None,
+                  image_digest=None)
+    fields.update(kwargs)
+    return SimpleNamespace(**fields)
+
+
+def test_train_build_hash():
+    client = FakeClient({"python:3.9": "sha256:python"})
+    kwargs = dict(master_image="python:3.9", entrypoint_file="entrypoint.py", command="python")
+    build_hash = train_build_hash(client, files=make_archive({"train/entrypoint.py": b"files"}), **kwargs)
+
+    assert build_hash == train_build_hash(client, files=make_archive({"train/entrypoint.py": b"files"}), **kwargs)
+    assert build_hash != train_build_hash(client, files=make_archive({"train/entrypoint.py": b"changed"}), **kwargs)
+    assert build_hash != train_build_hash(FakeClient({"python:3.9": "sha256:updated"}),
+                                          files=make_archive({"train/entrypoint.py": b"files"}), **kwargs)
+    # builds on base images that are not available locally are not cached
+    assert train_build_hash(FakeClient({}), files=make_archive({"train/entrypoint.py": b"files"}), **kwargs) is None
+
+
+def test_build_train_reuses_cached_image(monkeypatch):
+    client = FakeClient({"python:3.9": "sha256:python", "pht-local/train:latest": "sha256:train"})
+    files = make_archive({"train/entrypoint.py": b"files"})
+    build_hash = train_build_hash(client, master_image="python:3.9", entrypoint_file="entrypoint.py",
+                                  command="python", files=files)
+    train = make_train(build_hash=build_hash, image_digest="sha256:train")
+    monkeypatch.setattr(build.CRUDLocalTrain, "get", lambda self, db, train_id: train)
+
+    def fail_build(**kwargs):
+        raise AssertionError("the image must not be rebuilt")
+
+    monkeypatch.setattr(build, "_make_train_image", fail_build)
+    assert build_train(FakeSession(), "train", master_image_id="python:3.9", files=files,
+                       docker_client=client) == "pht-local/train:latest"
+
+
+def test_build_train_stores_build_hash(monkeypatch):
+    client = FakeClient({"python:3.9": "sha256:python"})
+    train = make_train()
+    db = FakeSession()
+    monkeypatch.setattr(build.CRUDLocalTrain, "get", lambda self, db, train_id: train)
+
+    def make_image(**kwargs):
+        client.images.ids["pht-local/train:latest"] = "sha256:built"
+        return SimpleNamespace(tags=["pht-local/train:latest"])
+
+    monkeypatch.setattr(build, "_make_train_image", make_image)
+    monkeypatch.setattr(build, "_add_train_files", lambda files, image, docker_client: image.tags[0])
+
+    assert build_train(db, "train", master_image_id="python:3.9", files=make_archive({"train/entrypoint.py": b"files"}),
+                       docker_client=client) == "pht-local/train:latest"
+    assert train.build_hash
+    assert train.image_digest == "sha256:built"
+    assert db.commits == 1
+
+
+def test_build_hash_ignores_archive_mtimes(monkeypatch):
+    from station.clients.minio import client as minio_client
+    from station.clients.minio.client import MinioClient
+    from station.app.schemas.datasets import MinioFile
+    from station.clients.tests.test_minio_archive import FakeMinio
+
+    objects = {"train/entrypoint.py": b"print('hello')\n", "train/data.csv": b"a,b\n1,2\n"}
+    minio = MinioClient("minio:9000", "minio_admin", "minio_password")
+    minio.client = FakeMinio(objects)
+    items = [MinioFile(file_name=name.split("/")[-1], full_path=name, size=len(data))
+             for name, data in objects.items()]
+    client = FakeClient({"python:3.9": "sha256:python"})
+
+    hashes = []
+    for now in (1000, 2000):
+        monkeypatch.setattr(minio_client.time, "time", lambda: now)
+        archive = BytesIO(b"".join(minio.iter_download_archive("local-trains", items)))
+        hashes.append(train_build_hash(client, master_image="python:3.9", entrypoint_file="entrypoint.py",
+                                       command="python", files=archive))
+    assert hashes[0] == hashes[1]
@@ -0,0 +1,32 @@
+from station.app.metrics import record_cache_lookup, record_train_execution, render_metrics
+from station.clients.instrumentation import UpstreamCall, upstream_metrics
+
+
+def test_render_metrics():
+    upstream_metrics.record(UpstreamCall("harbor", "health_check", 0.1, status_code=503, error=True,
+                                         response_size=12))
+    record_cache_lookup(hit=False)
+    record_train_execution("docker", "triggered")
+
+    content, content_type = render_metrics()
+    content = content.decode()
+    assert content_type.startswith("text/plain")
+    assert 'station_upstream_request_duration_seconds_count{operation="health_check",upstream="harbor"}' in content
+    assert 'station_upstream_errors_total{operation="health_check",upstream="harbor"}' in content
+    assert 'station_cache_requests_total{result="miss"}' in content
+    assert 'station_train_executions_total{status="triggered",train_type="docker"}' in content
+
+
+def test_database_pool_collector_skips_pools_without_statistics(monkeypatch):
+    from types import SimpleNamespace
+
+    from sqlalchemy.pool import SingletonThreadPool
+
+    from station.app.db import session
+    from station.app.metrics import DatabasePoolCollector
+
+    pool = SingletonThreadPool(lambda: None, pool_size=5)
+    monkeypatch.setattr(session, "engine", SimpleNamespace(pool=pool))
+
+    names = [metric.name for metric in DatabasePoolCollector().collect()]
+    assert "station_db_pool_size" not in names
@@ -0,0 +1,103 @@
+import os
+
+from types import SimpleNamespace
+
+from station.trains.docker.query_cache import QueryResultCache, fhir_auth_identity, fhir_data_version, \
+    query_cache_key, query_resources
+
+QUERY = {
+    "query": {
+        "resource": "Patient",
+        "parameters": [{"variable": "gender", "condition": "male"}, {"variable": "birthdate", "condition": "sa1980"}],
+        "has": [{"resource": "Condition", "property": "code", "params": ["D70.0"]}],
+    },
+    "data": {"output_format": "json", "filename": "patients.json"},
+}
+
+
+def _result(tmp_path, name: str, size: int) -> str:
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_query_cache_key_is_normalized():
+    reordered = {
+        "query": {**QUERY["query"], "parameters": list(reversed(QUERY["query"]["parameters"]))},
+        "data": {"output_format": "json", "filename": "other.json"},
+    }
+    assert query_cache_key("http://fhir/", QUERY, "v1") == query_cache_key("http://fhir", reordered, "v1")
+    assert query_cache_key("http://fhir", QUERY, "v1") != query_cache_key("http://fhir", QUERY, "v2")
+    assert query_resources(QUERY) == ["Condition", "Patient"]
+
+
+def test_cache_put_and_get(tmp_path):
+    cache = QueryResultCache(str(tmp_path / "cache"), max_size=100)
+    assert cache.get("key") is None
+
+    source = _result(tmp_path, "result.json", 10)
+    entry = cache.put("key", source)
+
+    assert not os.path.exists(source)
+    assert cache.get("key").path == entry.path
+    assert os.path.getsize(entry.path) == 10
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = QueryResultCache(str(tmp_path / "cache"), max_size=25, protect_seconds=0)
+    cache.put("a", _result(tmp_path, "a", 10))
+    cache.put("b", _result(tmp_path, "b", 10))
+    cache.get("a")
+
+    cache.put("c", _result(tmp_path, "c", 10))
+
+    assert {entry.key for entry in cache.entries()} == {"a", "c"}
+    assert cache.size() == 20
+
+
+def test_query_cache_key_keeps_variable_order():
+    ordered = {**QUERY, "data": {"output_format": "parquet", "filename": "data.parquet", "variables": ["id", "gender"]}}
+    reordered = {**QUERY, "data": {**ordered["data"], "variables": ["gender", "id"]}}
+    assert query_cache_key("http://fhir", ordered, "v1") != query_cache_key("http://fhir", reordered, "v1")
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    def __init__(self, self_url: str):
+        self.self_url = self_url
+        self.headers = []
+
+    def get(self, url, params=None, headers=None, auth=None):
+        self.headers.append(headers)
+        return FakeResponse({
+            "total": 3,
+            "link": [{"relation": "self", "url": self.self_url}],
+            "entry": [{"resource": {"meta": {"lastUpdated": "2022-01-01T10:00:00Z"}}}],
+        })
+
+
+def test_fhir_data_version_requires_sorting():
+    session = FakeSession("http://fhir/Patient?_sort=-_lastUpdated&_count=1")
+    assert fhir_data_version(session, "http://fhir", ["Patient"]) == "Patient:2022-01-01T10:00:00Z:3"
+    assert session.headers[0] == {"Prefer": "handling=strict"}
+
+    # lenient servers drop unsupported parameters from the self link
+    assert fhir_data_version(FakeSession("http://fhir/Patient?_count=1"), "http://fhir", ["Patient"]) is None
+
+
+def test_query_cache_key_depends_on_identity():
+    alice = fhir_auth_identity(SimpleNamespace(username="alice", client_id=None, token=None))
+    bob = fhir_auth_identity(SimpleNamespace(username="bob", client_id=None, token=None))
+    assert alice != bob
+    assert query_cache_key("http://fhir", QUERY, "v1", identity=alice) != \
+        query_cache_key("http://fhir", QUERY, "v1", identity=bob)
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from station.trains.docker.query import flatten_resource, is_streaming_query, stream_query_results
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    def __init__(self, pages: int, page_size: int = 3):
+        self.pages = pages
+        self.page_size = page_size
+        self.requested = []
+        self.timeouts = []
+
+    def get(self, url, auth=None, timeout=None):
+        self.requested.append(url)
+        self.timeouts.append(timeout)
+        page = int(url.split("page=")[-1])
+        entries = [{"resource": {"resourceType": "Patient", "id": f"{page}-{i}", "meta": {"versionId": "1"}}}
+                   for i in range(self.page_size)]
+        bundle = {"resourceType": "Bundle", "entry": entries, "link": [{"relation": "self", "url": url}]}
+        if page + 1 < self.pages:
+            bundle["link"].append({"relation": "next", "url": f"http://fhir/Patient?page={page + 1}"})
+        return FakeResponse(bundle)
+
+
+class FakeFhirClient:
+    k_anon = 5
+    disable_k_anon = False
+    output_format = None
+
+    def _generate_url(self, query):
+        return "http://fhir/Patient?page=0"
+
+    def _generate_auth(self):
+        return None
+
+
+def _query(output_format: str, **data):
+    return {"query": {"resource": "Patient"}, "data": {"output_format": output_format, "filename": "data.out", **data}}
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+def test_stream_ndjson(tmp_path, prefetch):
+    session = FakeSession(pages=3)
+    result = stream_query_results(FakeFhirClient(), _query("ndjson"), str(tmp_path), prefetch=prefetch,
+                                  session=session)
+
+    lines = (tmp_path / "data.out").read_text().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [f"{p}-{i}" for p in range(3) for i in range(3)]
+    assert result.pages == 3
+    assert result.resources == 9
+    assert len(session.requested) == 3
+    # every page request is bounded by a timeout
+    assert all(session.timeouts)
+
+
+def test_stream_json_bundle(tmp_path):
+    query = _query("json", stream=True)
+    assert is_streaming_query(query)
+    assert not is_streaming_query(_query("json"))
+
+    stream_query_results(FakeFhirClient(), query, str(tmp_path), session=FakeSession(pages=2))
+
+    bundle = json.loads((tmp_path / "data.out").read_text())
+    assert bundle["resourceType"] == "Bundle"
+    assert len(bundle["entry"]) == 6
+
+
+@pytest.mark.parametrize("output_format", ["ndjson", "json", "parquet"])
+def test_k_anonymity_removes_results(tmp_path, output_format):
+    if output_format == "parquet":
+        pytest.importorskip("pyarrow.parquet")
+    with pytest.raises(ValueError, match="k-anonymity"):
+        stream_query_results(FakeFhirClient(), _query(output_format, stream=True), str(tmp_path),
+                             session=FakeSession(pages=1))
+    assert not (tmp_path / "data.out").exists()
+
+
+def test_flatten_resource():
+    resource = {"id": "1", "meta": {"versionId": "1"}, "name": [{"family": "Doe"}]}
+    assert flatten_resource(resource) == {"id": "1", "meta.versionId": "1", "name": '[{"family": "Doe"}]'}
+
+
+def test_stream_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    stream_query_results(FakeFhirClient(), _query("parquet", variables=["id", "meta.versionId", "gender"]),
+                         str(tmp_path), session=FakeSession(pages=2))
+
+    table = pq.read_table(tmp_path / "data.out")
+    assert table.column_names == ["id", "meta.versionId", "gender"]
+    assert table.num_rows == 6
+    assert table.column("gender").null_count == 6
@@ -0,0 +1,65 @@
+import types
+
+from station.trains.docker.rebase import rebase_image, stream_archive
+
+
+class FakeContainer:
+    def __init__(self, image: str, files: dict = None):
+        self.image = image
+        self.files = files or {}
+        self.received = {}
+        self.commits = []
+        self.removed = False
+
+    def get_archive(self, path, chunk_size=None):
+        data = self.files[path]
+        return (data[i:i + 4] for i in range(0, len(data), 4)), {"name": path}
+
+    def put_archive(self, path, data):
+        # the archive has to be passed on as a stream instead of being read into memory
+        assert isinstance(data, types.GeneratorType)
+        self.received[path] = self.received.get(path, b"") + b"".join(data)
+        return True
+
+    def commit(self, repository, tag):
+        self.commits.append(f"{repository}:{tag}")
+
+    def remove(self, v=False, force=False):
+        self.removed = True
+
+
+class FakeContainers:
+    def __init__(self, files: dict):
+        self.files = files
+        self.created = []
+
+    def create(self, image):
+        container = FakeContainer(image, self.files.get(image))
+        self.created.append(container)
+        return container
+
+
+def test_stream_archive():
+    source = FakeContainer("train", {"/opt/pht_results": b"0123456789"})
+    target = FakeContainer("base")
+
+    transfer = stream_archive(source, target, "/opt/pht_results")
+
+    assert target.received == {"/opt": b"0123456789"}
+    assert transfer.size == 10
+
+
+def test_rebase_image_commits_once():
+    files = {"repo:latest": {"/opt/pht_results": b"results", "/opt/train_config.json": b"{}"}}
+    client = types.SimpleNamespace(containers=FakeContainers(files))
+
+    result = rebase_image(client, "repo:latest", "repo:base", "repo", "latest")
+
+    source, base = client.containers.created
+    assert [c.image for c in client.containers.created] == ["repo:latest", "repo:base"]
+    assert base.received == {"/opt": b"results{}"}
+    assert base.commits == ["repo:latest"]
+    assert source.commits == []
+    assert source.removed and base.removed
+    assert result.size == 9
+    assert [t["path"] for t in result.to_dict()["transfers"]] == ["/opt/pht_results", "/opt/train_config.json"]
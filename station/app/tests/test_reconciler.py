@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from station.app.trains.reconciler import DOCKER_TRAIN_DAG, MISSING_RUN_STATE, ExecutionReconciler
+
+
+def test_finish_executions():
+    running = SimpleNamespace(airflow_dag_run="manual__1", end=None, status="running", duration=None)
+    finished = SimpleNamespace(airflow_dag_run="manual__2", end=None, status="running", duration=None)
+    dag_runs = {
+        (DOCKER_TRAIN_DAG, "manual__1"): {"state": "running", "start_date": "2022-01-01T10:00:00+00:00"},
+        (DOCKER_TRAIN_DAG, "manual__2"): {"state": "failed", "start_date": "2022-01-01T10:00:00+00:00",
+                                          "end_date": "2022-01-01T10:01:30.500000+00:00"},
+    }
+
+    result = ExecutionReconciler._finish_executions([running, finished], DOCKER_TRAIN_DAG, dag_runs, end_attr="end")
+
+    assert result == [finished]
+    assert finished.status == "failed"
+    assert finished.duration == 90.5
+    assert finished.end is not None
+    assert running.end is None
+
+
+def test_finish_missing_executions():
+    missing = SimpleNamespace(airflow_dag_run="manual__3", end=None, status="running", duration=None)
+
+    assert ExecutionReconciler._finish_executions([missing], DOCKER_TRAIN_DAG, {}, end_attr="end") == []
+    assert missing.end is None
+
+    result = ExecutionReconciler._finish_executions([missing], DOCKER_TRAIN_DAG, {}, end_attr="end",
+                                                    finish_missing=True)
+    assert result == [missing]
+    assert missing.status == MISSING_RUN_STATE
+    assert missing.end is not None
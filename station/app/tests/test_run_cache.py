@@ -0,0 +1,69 @@
+from minio.error import S3Error
+
+from station.app.run_cache import FinishedRunCache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ttl=3600):
+        self.values[key] = value
+
+
+class FakeMinio:
+    def __init__(self):
+        self.objects = {}
+
+    def get_file(self, bucket, name):
+        if (bucket, name) not in self.objects:
+            raise S3Error(code="NoSuchKey", message="not found", resource=name, request_id=None, host_id=None,
+                          response=None)
+        return self.objects[(bucket, name)]
+
+    def put_file(self, bucket, name, data, content_type=None):
+        self.objects[(bucket, name)] = data
+
+
+class FakeAirflow:
+    def __init__(self, state):
+        self.state = state
+        self.calls = []
+
+    def get_run_information(self, dag_id, run_id):
+        self.calls.append("run")
+        return {"state": self.state, "tasklist": {"task_instances": [{"task_id": "execute", "try_number": 1}]}}
+
+    def resolve_try_number(self, dag_id, run_id, task_id, task_try_number=None):
+        self.calls.append("task_instance")
+        return 1, {"try_number": 1, "state": "success" if self.state == "success" else "running"}
+
+    def get_task_log(self, dag_id, run_id, task_id, task_try_number=None):
+        self.calls.append("log")
+        return "train log"
+
+
+def test_finished_runs_are_served_from_cache():
+    airflow = FakeAirflow("success")
+    cache = FinishedRunCache(airflow, FakeRedis(), FakeMinio())
+
+    for _ in range(2):
+        assert cache.get_run_information("run_pht_train", "manual__1")["state"] == "success"
+        assert cache.get_task_log("run_pht_train", "manual__1", "execute") == "train log"
+    assert airflow.calls == ["run", "log"]
+
+
+def test_running_runs_are_served_live():
+    airflow = FakeAirflow("running")
+    minio = FakeMinio()
+    cache = FinishedRunCache(airflow, FakeRedis(), minio)
+
+    for _ in range(2):
+        cache.get_run_information("run_pht_train", "manual__1")
+        cache.get_task_log("run_pht_train", "manual__1", "execute")
+    assert airflow.calls.count("run") == 2
+    assert airflow.calls.count("log") == 2
+    assert not minio.objects
@@ -0,0 +1,130 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from station.app.models.docker_trains import DockerTrain
+from station.app.models.train_queue import TrainRunRequest
+from station.app.schemas.docker_trains import DockerTrainBulkRunItem
+from station.app.schemas.train_queue import Resources
+from station.app.trains.scheduler import ExecutionScheduler, requested_resources
+
+
+class FixedCapacityScheduler(ExecutionScheduler):
+    """
+    Scheduler with a fixed host capacity that records started runs instead of triggering airflow.
+    """
+
+    def __init__(self, capacity: Resources):
+        super().__init__()
+        self.capacity = capacity
+        self.started = []
+
+    def _capacity(self) -> Resources:
+        return self.capacity
+
+    def _available(self, running) -> Resources:
+        reserved = self._reserved(running)
+        return Resources(cpus=self.capacity.cpus - reserved.cpus, memory=self.capacity.memory - reserved.memory,
+                         gpus=self.capacity.gpus - reserved.gpus)
+
+    def _start(self, db, request):
+        # admitted requests are committed as running before their DAG is triggered
+        assert request.status == "running" and request not in db.dirty
+        self.started.append(request.train_id)
+        request.airflow_dag_run = f"manual__{request.train_id}"
+        return SimpleNamespace(airflow_dag_run=request.airflow_dag_run, start=request.started_at)
+
+    @staticmethod
+    def _release_finished(db):
+        pass
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    for model in (TrainRunRequest, DockerTrain):
+        model.__table__.create(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _queue(db, train_id: str, cpus: float, priority: int = 0):
+    db.add(TrainRunRequest(train_type="docker", train_id=train_id, cpus=cpus, memory=0, gpus=0, priority=priority,
+                           status="queued"))
+    db.commit()
+
+
+def test_requested_resources():
+    config = SimpleNamespace(cpu_requirements={"cpus": 2, "memory": 4}, gpu_requirements={"count": 1})
+    assert requested_resources(config) == Resources(cpus=2, memory=4, gpus=1)
+    assert requested_resources(None) == Resources(cpus=1, memory=0, gpus=0)
+
+
+def test_schedule_by_priority_and_resources(db):
+    scheduler = FixedCapacityScheduler(Resources(cpus=4, memory=16, gpus=0))
+    _queue(db, "low", cpus=1)
+    _queue(db, "high", cpus=2, priority=10)
+    _queue(db, "large", cpus=3)
+
+    started = scheduler.schedule(db)
+
+    # the large run does not fit and blocks the run queued after it
+    assert scheduler.started == ["high", "low"]
+    assert len(started) == 2
+
+    status = scheduler.queue_status(db)
+    assert status.queued == 1
+    assert status.running == 2
+    assert status.reserved.cpus == 3
+    assert status.queued_by_priority == {0: 1}
+
+
+def test_submit_returns_execution_when_admitted(db):
+    scheduler = FixedCapacityScheduler(Resources(cpus=1, memory=16, gpus=0))
+
+    request, execution = scheduler.submit(db, "local", "first")
+    assert request.status == "running"
+    assert execution.airflow_dag_run == "manual__first"
+
+    request, execution = scheduler.submit(db, "local", "second")
+    assert request.status == "queued"
+    assert execution is None
+
+    assert scheduler.cancel(db, request.id).status == "cancelled"
+    assert scheduler.queue_status(db).queued == 0
+
+
+def test_submit_rejects_invalid_config_id(db):
+    from fastapi import HTTPException
+
+    scheduler = FixedCapacityScheduler(Resources(cpus=1, memory=16, gpus=0))
+
+    with pytest.raises(HTTPException) as e:
+        scheduler.submit(db, "docker", "first", config_id="not-a-config")
+    assert e.value.status_code == 400
+    assert scheduler.queue_status(db).queued == 0
+
+
+def test_submit_docker_trains(db):
+    scheduler = FixedCapacityScheduler(Resources(cpus=1, memory=16, gpus=0))
+    db.add_all([DockerTrain(train_id="first"), DockerTrain(train_id="second")])
+    db.commit()
+
+    results = scheduler.submit_docker_trains(db, [
+        DockerTrainBulkRunItem(train_id="first"),
+        DockerTrainBulkRunItem(train_id="second"),
+        DockerTrainBulkRunItem(train_id="not-a-train"),
+    ])
+
+    assert [result.success for result in results] == [True, True, False]
+    assert results[0].request.status == "running"
+    assert results[0].execution.airflow_dag_run == "manual__first"
+    # the second run does not fit and waits in the queue
+    assert results[1].request.status == "queued"
+    assert results[1].execution is None
+    assert results[2].request is None
+    assert scheduler.started == ["first"]
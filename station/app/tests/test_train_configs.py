@@ -0,0 +1,26 @@
+from station.app.crud.crud_train_configs import docker_train_config
+from station.app.schemas.docker_trains import DockerTrainConfigCreate
+
+
+class FakeSession:
+    def __init__(self):
+        self.added = []
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    def commit(self):
+        pass
+
+    def refresh(self, obj):
+        pass
+
+
+def test_create_config_with_execution_mode():
+    db = FakeSession()
+
+    config = docker_train_config.create(db, obj_in=DockerTrainConfigCreate(name="fast", execution_mode="fast"))
+    assert config.execution_mode == "fast"
+
+    config = docker_train_config.create(db, obj_in=DockerTrainConfigCreate(name="unset", execution_mode=None))
+    assert config.execution_mode == "default"
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from station.app.models.train_context import TrainRunContext
+from station.trains.context import create_context, delete_run_contexts, delete_stale_contexts, load_context, \
+    update_context
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    TrainRunContext.__table__.create(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def test_train_run_context(db):
+    state = {"train_id": "train", "env": {"FHIR_ADDRESS": "http://fhir"}, "volumes": None}
+    context_id = create_context(db, "run_pht_train", "manual__1", state, train_id="train")
+
+    assert isinstance(context_id, str)
+    assert load_context(db, context_id) == state
+
+    updated = update_context(db, context_id, volumes={"/data": {"bind": "/opt/data", "mode": "ro"}})
+    assert updated["env"] == state["env"]
+
+    # the update is persisted for other sessions
+    db.expire_all()
+    assert load_context(db, context_id)["volumes"] == {"/data": {"bind": "/opt/data", "mode": "ro"}}
+
+
+def test_missing_context(db):
+    with pytest.raises(ValueError):
+        load_context(db, "missing")
+
+
+def test_delete_contexts(db):
+    from datetime import datetime, timedelta
+
+    create_context(db, "run_pht_train", "manual__1", {})
+    failed = create_context(db, "run_pht_train", "manual__2", {})
+    old = create_context(db, "run_pht_train", "manual__3", {})
+    db.query(TrainRunContext).filter(TrainRunContext.id == old).update(
+        {TrainRunContext.created_at: datetime.now() - timedelta(days=30)})
+    db.commit()
+
+    assert delete_run_contexts(db, "run_pht_train", "manual__1") == 1
+    assert delete_stale_contexts(db, retention_days=7) == 1
+    assert [c.id for c in db.query(TrainRunContext).all()] == [failed]
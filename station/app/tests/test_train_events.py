@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from station.app.crud.crud_train_events import train_task_events
+from station.app.models.train_events import TrainTaskEvent
+from station.app.schemas.train_events import TaskEventCreate
+
+
+def test_run_progress_from_events():
+    engine = create_engine("sqlite://")
+    TrainTaskEvent.__table__.create(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    start = datetime(2022, 1, 1, 10, 0, 0)
+    end = datetime(2022, 1, 1, 10, 0, 30)
+    events = [
+        TaskEventCreate(dag_id="run_pht_train", run_id="manual__1", train_id="train", task_id="pull_docker_image",
+                        try_number=1, event="started", start=start),
+        TaskEventCreate(dag_id="run_pht_train", run_id="manual__1", train_id="train", task_id="pull_docker_image",
+                        try_number=1, event="success", start=start, end=end, duration=30.0),
+        TaskEventCreate(dag_id="run_pht_train", run_id="manual__1", train_id="train", task_id="execute_container",
+                        try_number=1, event="started", start=end),
+    ]
+    for event in events:
+        train_task_events.create(db, obj_in=event)
+
+    progress = train_task_events.get_run_progress(db, "manual__1")
+    assert progress.state == "running"
+    assert progress.train_id == "train"
+    assert progress.start == start
+    tasks = {task.task_id: task for task in progress.tasks}
+    assert tasks["pull_docker_image"].state == "success"
+    assert tasks["pull_docker_image"].duration == 30.0
+    assert tasks["execute_container"].state == "running"
+
+    train_task_events.create(db, obj_in=TaskEventCreate(dag_id="run_pht_train", run_id="manual__1",
+                                                        event="run_failed", start=start, end=end))
+    assert train_task_events.get_run_progress(db, "manual__1").state == "failed"
+    assert train_task_events.get_run_progress(db, "manual__2") is None
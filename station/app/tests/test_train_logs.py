@@ -0,0 +1,33 @@
+from station.trains.docker.logs import TrainLogWriter, capture_logs, get_log_index, read_log_page
+from station.app.tests.test_run_cache import FakeMinio
+
+
+def test_train_logs_are_stored_in_compressed_parts():
+    minio = FakeMinio()
+    writer = TrainLogWriter(minio, "manual__1", part_size=10, max_size=25, tail_lines=2)
+
+    index = capture_logs([b"line 1\nline 2\n", b"line 3\nline 4\n"], writer)
+
+    assert index == {"parts": 3, "size": 25, "dropped": 3, "part_size": 10}
+    assert get_log_index(minio, "manual__1") == index
+    assert read_log_page(minio, "manual__1", 0) == "line 1\nlin"
+    assert read_log_page(minio, "manual__1", 2) == "\nline"
+    assert read_log_page(minio, "manual__1", 3) is None
+    assert get_log_index(minio, "manual__2") is None
+    # the tail contains the last lines even if they exceed the stored size
+    assert writer.tail_text() == "line 3\nline 4"
+
+
+class FailingMinio(FakeMinio):
+    def put_file(self, *args, **kwargs):
+        raise ConnectionError("minio unavailable")
+
+
+def test_train_logs_storage_errors_keep_the_tail():
+    writer = TrainLogWriter(FailingMinio(), "manual__1", part_size=10, tail_lines=2)
+
+    index = capture_logs([b"line 1\nline 2\n", b"line 3\nline 4\n"], writer)
+
+    assert index["parts"] == 0
+    assert index["error"] == "minio unavailable"
+    assert writer.tail_text() == "line 3\nline 4"
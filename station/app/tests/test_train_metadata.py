@@ -0,0 +1,111 @@
+import io
+import json
+import posixpath
+import tarfile
+
+from docker.errors import NotFound
+
+from station.trains.docker.metadata import QUERY_FILE, TRAIN_CONFIG_FILE, extract_files, extract_train_metadata
+
+
+def make_archive(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def chunked(data: bytes, size: int = 100):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+class FakeContainer:
+    def __init__(self, files: dict):
+        self.files = files
+        self.requests = []
+        self.streams = []
+        self.removed = False
+
+    def get_archive(self, path):
+        self.requests.append(path)
+        if path not in self.files:
+            raise NotFound(f"Could not find the file {path} in container")
+        stream = FakeStream(chunked(make_archive({posixpath.basename(path): self.files[path]})))
+        self.streams.append(stream)
+        return stream, {"name": path}
+
+    def remove(self, force=False):
+        self.removed = True
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeContainers:
+    def __init__(self, files: dict):
+        self.files = files
+        self.created = []
+
+    def create(self, image):
+        container = FakeContainer(self.files)
+        self.created.append(container)
+        return container
+
+
+class FakeClient:
+    def __init__(self, files: dict):
+        self.containers = FakeContainers(files)
+
+
+def test_extract_files():
+    archive = make_archive({
+        "opt/train_config.json": b'{"id": "train"}',
+        "opt/pht_train/entrypoint.py": b"print('train')" * 1000,
+        "opt/pht_train/query.json": b'{"query": "Patient?"}',
+    })
+    files = extract_files(chunked(archive), "/opt", {
+        "/opt/train_config.json": TRAIN_CONFIG_FILE,
+        "/opt/pht_train/query.json": QUERY_FILE,
+        "/opt/manifest.json": "manifest.json",
+    })
+    assert files == {TRAIN_CONFIG_FILE: b'{"id": "train"}', QUERY_FILE: b'{"query": "Patient?"}'}
+
+
+def test_extract_train_metadata_single_container():
+    query = {"query": "Patient?", "data": {"output_format": "json", "filename": "patients.json"}}
+    client = FakeClient({
+        "/opt/train_config.json": b"{}",
+        "/opt/pht_train/query.json": json.dumps(query).encode(),
+    })
+
+    metadata = extract_train_metadata(client, "train:latest")
+
+    assert metadata.query == query
+    assert set(metadata.files) == {TRAIN_CONFIG_FILE, QUERY_FILE}
+    # one container and one archive request of each file, not of their common parent directory
+    assert len(client.containers.created) == 1
+    container = client.containers.created[0]
+    assert sorted(container.requests) == ["/opt/pht_train/query.json", "/opt/train_config.json"]
+    assert all(stream.closed for stream in container.streams)
+    assert container.removed
+
+
+def test_extract_train_metadata_without_query():
+    client = FakeClient({"/opt/train_config.json": b"{}"})
+    metadata = extract_train_metadata(client, "train:latest")
+    assert metadata.query is None
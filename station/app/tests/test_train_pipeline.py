@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from station.app.crud.crud_docker_trains import execution_latency
+from station.app.models.docker_trains import DockerTrainExecution
+from station.app.trains.docker.airflow import train_dag_id
+from station.app.trains.reconciler import ExecutionReconciler
+from station.trains.docker.pipeline import TrainPipeline, make_train_state
+
+
+def test_make_train_state():
+    state = make_train_state({
+        "repository": "harbor.example.com/station_1/train-1",
+        "volumes": {"/data": "/opt/data", "/other": {"bind": "/opt/other", "mode": "rw"}},
+        "resources": {"cpus": 2},
+    })
+    assert state["train_id"] == "train-1"
+    assert state["img"] == "harbor.example.com/station_1/train-1:latest"
+    assert state["volumes"]["/data"] == {"bind": "/opt/data", "mode": "ro"}
+    assert state["volumes"]["/other"]["mode"] == "rw"
+    assert state["resources"] == {"cpus": 2}
+
+    with pytest.raises(ValueError):
+        make_train_state({"repository": "train-2", "volumes": {"/data": {"bind": "/opt/data"}}})
+
+
+def test_pipeline_runs_steps_in_order():
+    pipeline = TrainPipeline({"train_id": "train-1"}, "manual__1", client=object(), harbor=object())
+    executed = []
+
+    def step(name):
+        def run():
+            executed.append(name)
+            return pipeline._update(**{name: True})
+
+        return run
+
+    timings = pipeline.run({name: step(name) for name in ["pull", "query", "push"]})
+    assert executed == ["pull", "query", "push"]
+    assert pipeline.state == {"train_id": "train-1", "pull": True, "query": True, "push": True}
+    assert set(timings) == {"pull", "query", "push", "total"}
+    assert timings["total"] >= sum(timings[name] for name in executed)
+
+
+def test_train_dag_id():
+    assert train_dag_id() == "run_pht_train"
+    assert train_dag_id("default") == "run_pht_train"
+    assert train_dag_id("fast") == "run_pht_train_fast"
+    with pytest.raises(ValueError):
+        train_dag_id("turbo")
+
+
+def test_reconcile_fast_executions():
+    fast = DockerTrainExecution(airflow_dag_run="manual__1", execution_mode="fast")
+    dag_runs = {
+        ("run_pht_train_fast", "manual__1"): {"state": "success", "start_date": "2022-01-01T10:00:00+00:00",
+                                              "end_date": "2022-01-01T10:00:30+00:00"},
+    }
+    finished = ExecutionReconciler._finish_executions([fast], "run_pht_train_fast", dag_runs, end_attr="end")
+    assert finished == [fast]
+    assert fast.duration == 30
+
+
+def test_execution_latency():
+    start = datetime(2022, 1, 1, 10)
+    executions = [
+        DockerTrainExecution(start=start, end=start + timedelta(seconds=10 * (i + 1)), duration=5.0,
+                             status="success", execution_mode=mode)
+        for i, mode in enumerate(["default", "default", "fast", None])
+    ]
+
+    latency = {item.execution_mode: item for item in execution_latency(executions)}
+    assert latency["default"].count == 3
+    assert latency["default"].mean == 70 / 3
+    assert latency["default"].p50 == 20
+    assert latency["default"].p95 == 40
+    assert latency["fast"].count == 1
+    assert latency["fast"].p95 == 30
+    assert latency["fast"].run_duration_mean == 5.0
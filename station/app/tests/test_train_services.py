@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from station.trains import services
+
+
+def test_station_api_client_is_cached(monkeypatch):
+    created = []
+
+    def from_env():
+        created.append(SimpleNamespace(base_url="http://station-api"))
+        return created[-1]
+
+    monkeypatch.setattr(services.StationAPIClient, "from_env", from_env)
+    services.station_api_client.cache_clear()
+    try:
+        assert services.station_api_client() is services.station_api_client()
+        assert len(created) == 1
+    finally:
+        services.station_api_client.cache_clear()
+
+
+def test_pool_tracking(tmp_path, monkeypatch):
+    stats = services.PoolStats()
+    monkeypatch.setattr(services, "pool_stats", stats)
+    engine = create_engine(f"sqlite:///{tmp_path / 'station.db'}", poolclass=QueuePool, pool_size=1)
+    services._track_pool(engine)
+
+    for _ in range(3):
+        with engine.connect() as connection:
+            connection.execute(text("select 1"))
+            assert stats.checked_out == 1
+    # the pooled connection is reused
+    assert stats.opened == 1
+    assert stats.checked_out == 0
+
+    # connections opened by another process are replaced
+    monkeypatch.setattr(services.os, "getpid", lambda: -1)
+    with engine.connect() as connection:
+        connection.execute(text("select 1"))
+    assert stats.opened == 2
+    engine.dispose()
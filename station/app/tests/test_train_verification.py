@@ -0,0 +1,97 @@
+from contextlib import contextmanager
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from docker.errors import ImageNotFound
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from station.app.models.train_verification import TrainVerification
+from station.trains.docker.pipeline import TrainPipeline
+from station.trains.docker.verification import get_verification, invalidate_verifications, key_fingerprint, \
+    store_verification
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    TrainVerification.__table__.create(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def private_key_path(tmp_path):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    path = tmp_path / "key.pem"
+    path.write_bytes(key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.BestAvailableEncryption(b"secret"),
+    ))
+    return str(path)
+
+
+class FakeImage:
+    def __init__(self, image_id: str, images: "FakeImages"):
+        self.id = image_id
+        self.images = images
+
+    def tag(self, repository, tag):
+        self.images.tags[f"{repository}:{tag}"] = self.id
+
+
+class FakeImages:
+    def __init__(self, tags: dict):
+        self.tags = tags
+
+    def get(self, name):
+        image_id = self.tags.get(name, name if name in self.tags.values() else None)
+        if not image_id:
+            raise ImageNotFound(name)
+        return FakeImage(image_id, self)
+
+
+class FakeClient:
+    def __init__(self, tags: dict):
+        self.images = FakeImages(tags)
+
+
+def test_key_fingerprint(private_key_path):
+    fingerprint = key_fingerprint(private_key_path, "secret")
+    assert len(fingerprint) == 64
+    assert key_fingerprint(private_key_path, "secret") == fingerprint
+
+
+def test_store_and_invalidate_verifications(db):
+    store_verification(db, "sha256:train", "key-1", "sha256:verified", train_id="train-1")
+    assert get_verification(db, "sha256:train", "key-1").verified_image == "sha256:verified"
+    assert get_verification(db, "sha256:train", "key-2") is None
+
+    # a verification with a new key removes the results of the rotated key
+    store_verification(db, "sha256:other", "key-2", "sha256:verified-2", train_id="train-2")
+    assert get_verification(db, "sha256:train", "key-1") is None
+
+    assert invalidate_verifications(db, train_id="train-1") == 0
+    assert invalidate_verifications(db) == 1
+
+
+def test_pre_run_protocol_uses_cached_verification(db, private_key_path, monkeypatch):
+    monkeypatch.setenv("PRIVATE_KEY_PATH", private_key_path)
+    monkeypatch.setenv("PRIVATE_KEY_PASSWORD", "secret")
+    img = "harbor.example.com/station_1/train-1:latest"
+    client = FakeClient({img: "sha256:train", "repo:verified": "sha256:verified"})
+    store_verification(db, "sha256:train", key_fingerprint(private_key_path, "secret"), "sha256:verified")
+
+    @contextmanager
+    def session():
+        yield db
+
+    pipeline = TrainPipeline({"train_id": "train-1", "img": img}, "manual__1", client=client, db_session=session)
+    changes = pipeline.pre_run_protocol()
+
+    assert changes["verification"]["cached"]
+    assert client.images.tags[img] == "sha256:verified"
+    assert get_verification(db, "sha256:train", key_fingerprint(private_key_path, "secret")).hits == 1
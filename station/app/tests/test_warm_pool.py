@@ -0,0 +1,200 @@
+import io
+import itertools
+import time
+
+from docker.errors import APIError, ImageNotFound
+
+from station.app.settings import WarmPoolSettings
+from station.app.trains.local.warm_pool import WarmPoolManager
+from station.trains.local.warm_pool import CLAIMED_NAME_PREFIX, WARM_POOL_IMAGE_LABEL, WarmPool, \
+    can_use_warm_container, execute_in_container, train_command
+
+_ids = itertools.count()
+
+
+class FakeContainer:
+    def __init__(self, client, image, image_id, labels):
+        self.client = client
+        self.id = f"container-{next(_ids)}"
+        self.short_id = self.id
+        self.name = self.id
+        self.labels = labels
+        self.attrs = {"Image": image_id}
+        self.status = "running"
+        self.archives = []
+        self.updates = []
+
+    def pause(self):
+        if self.client.fail_pause:
+            raise APIError("Cannot pause container")
+        self.status = "paused"
+
+    def unpause(self):
+        if self.status != "paused":
+            raise APIError("Container is not paused")
+        self.status = "running"
+
+    def rename(self, name):
+        self.name = name
+
+    def put_archive(self, path, data):
+        self.archives.append((path, b"".join(data)))
+
+    def update(self, **kwargs):
+        self.updates.append(kwargs)
+
+    def remove(self, force=False):
+        self.client.containers.items.remove(self)
+
+
+class FakeImage:
+    def __init__(self, image_id):
+        self.id = image_id
+
+
+class FakeImages:
+    def __init__(self, images):
+        self.images = images
+
+    def get(self, name):
+        if name not in self.images:
+            raise ImageNotFound(name)
+        return FakeImage(self.images[name])
+
+
+class FakeContainers:
+    def __init__(self, client):
+        self.client = client
+        self.items = []
+
+    def run(self, image, labels=None, network_disabled=False, **kwargs):
+        assert network_disabled
+        container = FakeContainer(self.client, image, self.client.images.images[image], labels)
+        self.items.append(container)
+        return container
+
+    def list(self, all=False, filters=None):
+        filters = filters or {}
+        containers = []
+        for container in self.items:
+            if filters.get("status") and container.status != filters["status"]:
+                continue
+            matches = True
+            for label in filters.get("label", []):
+                key, _, value = label.partition("=")
+                if key not in container.labels or (value and container.labels[key] != value):
+                    matches = False
+            if matches:
+                containers.append(container)
+        return containers
+
+
+class FakeAPI:
+    def __init__(self):
+        self.execs = []
+
+    def exec_create(self, container, cmd, **kwargs):
+        self.execs.append((container, cmd, kwargs))
+        return {"Id": "exec"}
+
+    def exec_start(self, exec_id, stream=False):
+        return iter([b"output"])
+
+
+class FakeDockerClient:
+    def __init__(self, images):
+        self.images = FakeImages(images)
+        self.containers = FakeContainers(self)
+        self.api = FakeAPI()
+        self.fail_pause = False
+
+
+def test_fill_and_claim():
+    client = FakeDockerClient({"python:3.9": "sha256:1"})
+    pool = WarmPool(client)
+
+    assert pool.fill("python:3.9", 2) == 2
+    assert pool.fill("python:3.9", 2) == 0
+    assert pool.available("python:3.9") == 2
+
+    first = pool.claim("python:3.9")
+    second = pool.claim("python:3.9")
+    assert first is not second
+    assert first.status == "running"
+    assert pool.claim("python:3.9") is None
+    assert pool.fill("python:3.9", 2) == 2
+
+
+def test_fill_replaces_outdated_containers():
+    client = FakeDockerClient({"python:3.9": "sha256:1"})
+    pool = WarmPool(client)
+    pool.fill("python:3.9", 1)
+    client.images.images["python:3.9"] = "sha256:2"
+
+    assert pool.fill("python:3.9", 1) == 1
+    assert [c.attrs["Image"] for c in pool.containers("python:3.9")] == ["sha256:2"]
+
+
+def test_fill_missing_image():
+    pool = WarmPool(FakeDockerClient({}))
+    assert pool.fill("python:3.9", 1) == 0
+
+
+def test_fill_removes_containers_that_can_not_be_paused():
+    client = FakeDockerClient({"python:3.9": "sha256:1"})
+    client.fail_pause = True
+
+    assert WarmPool(client).fill("python:3.9", 2) == 0
+    assert client.containers.items == []
+
+
+def test_prune_removes_stale_containers():
+    client = FakeDockerClient({"python:3.9": "sha256:1"})
+    pool = WarmPool(client)
+    pool.fill("python:3.9", 4)
+    stale = pool.claim("python:3.9")
+    stale.rename(f"{CLAIMED_NAME_PREFIX}-{int(time.time()) - 7200}-{stale.short_id}")
+    running = pool.claim("python:3.9")
+    exited = pool.claim("python:3.9")
+    exited.status = "exited"
+
+    pool.prune(["python:3.9"], max_run_time=3600)
+
+    assert running.name.startswith(CLAIMED_NAME_PREFIX)
+    assert set(client.containers.items) == {running, *pool.containers("python:3.9")}
+    assert pool.available("python:3.9") == 1
+
+
+def test_manager_refill_prunes_images():
+    client = FakeDockerClient({"python:3.9": "sha256:1", "r-base": "sha256:2"})
+    WarmPool(client).fill("r-base", 1)
+    manager = WarmPoolManager(client=client, config=WarmPoolSettings(enabled=True, images=["python:3.9"], size=2))
+
+    assert manager.refill() == {"python:3.9": 2}
+    assert {c.labels[WARM_POOL_IMAGE_LABEL] for c in client.containers.items} == {"python:3.9"}
+
+
+def test_execute_in_container():
+    client = FakeDockerClient({"python:3.9": "sha256:1"})
+    pool = WarmPool(client)
+    pool.fill("python:3.9", 1)
+    container = pool.claim("python:3.9")
+    command = train_command("main.py", "python", "-u")
+
+    output, exec_id = execute_in_container(client, container, io.BytesIO(b"archive"), command,
+                                           environment={"KEY": "value"},
+                                           limits={"nano_cpus": int(2e9), "mem_limit": "512m"})
+
+    assert list(output) == [b"output"]
+    assert container.archives == [("/opt/train", b"archive")]
+    assert container.updates == [{"mem_limit": "512m", "cpu_period": 100000, "cpu_quota": 200000}]
+    assert client.api.execs[0][1] == ["python", "-u", "/opt/train/main.py"]
+    assert client.api.execs[0][2]["environment"] == {"KEY": "value"}
+
+
+def test_can_use_warm_container():
+    assert can_use_warm_container({"master_image": "python:3.9"})
+    assert not can_use_warm_container({"master_image": "python:3.9", "volumes": {"/data": {"bind": "/data"}}})
+    assert not can_use_warm_container({"master_image": "python:3.9", "resources": {"gpus": 1}})
+    assert not can_use_warm_container({"master_image": "python:3.9"}, pin_cpus=True)
+    assert not can_use_warm_container({"custom_image": "my-train"})
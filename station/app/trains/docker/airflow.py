@@ -1,6 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from typing import Any, Dict, Union, Tuple
+from sqlalchemy.orm import Session, joinedload
+from typing import Any, Dict, List, Union, Tuple
 import os
 from datetime import datetime
 
@@ -11,10 +12,21 @@ from station.app.crud.crud_datasets import datasets
 from station.clients.minio import MinioClient
 from station.app.schemas import docker_trains as dts
 from station.app.models import docker_trains as dtm
+from station.app.models.datasets import DataSet
 from loguru import logger
 
 from station.app.config import settings
 from station.app.config import clients
+from station.app.metrics import record_train_execution
+from station.trains.docker.resources import train_resources
+
+# dags executing docker trains by the execution mode of the train config
+DOCKER_TRAIN_DAGS = {
+    "default": "run_pht_train",
+    # all steps of the train in a single task, avoids the scheduling overhead between the tasks for small trains
+    "fast": "run_pht_train_fast",
+}
+EXECUTION_MODES = tuple(DOCKER_TRAIN_DAGS)
 
 
 def run_train(db: Session, train_id: Any, execution_params: dts.DockerTrainExecution) -> dts.DockerTrainSavedExecution:
@@ -47,15 +59,30 @@ def run_train(db: Session, train_id: Any, execution_params: dts.DockerTrainExecu
     # Execute the train using the airflow rest api
     try:
         print(clients.airflow.airflow_url)
-        run_id = clients.airflow.trigger_dag("run_pht_train", config=config_dict)
-        db_train = update_train_after_run(db, db_train, run_id, config_id, dataset_id=execution_params.dataset_id)
+        execution_mode = config_dict.get("execution_mode", "default")
+        run_id = clients.airflow.trigger_dag(train_dag_id(execution_mode), config=config_dict)
+        db_train = update_train_after_run(db, db_train, run_id, config_id, dataset_id=execution_params.dataset_id,
+                                          execution_mode=execution_mode)
         last_execution = db_train.executions[-1]
+        record_train_execution("docker", "triggered")
         return last_execution
     except Exception as e:
+        record_train_execution("docker", "failed")
         logger.error(f"Error while running train {train_id} with config {config_dict} \n {e}")
         raise HTTPException(status_code=503, detail="No connection to the airflow client could be established.")
 
 
+def train_dag_id(execution_mode: str = None) -> str:
+    """
+    Id of the dag executing a docker train in the given execution mode
+    :param execution_mode: execution mode of the train config, the default dag is used if not given
+    :return:
+    """
+    if execution_mode and execution_mode not in DOCKER_TRAIN_DAGS:
+        raise ValueError(f"Invalid execution mode '{execution_mode}', must be one of {EXECUTION_MODES}")
+    return DOCKER_TRAIN_DAGS[execution_mode or "default"]
+
+
 def validate_run_config(
         db: Session,
         train_id: str,
@@ -71,12 +98,7 @@ def validate_run_config(
 
     """
 
-    harbor_url = settings.config.registry.address
-    project = settings.config.registry.project
-    config = {
-        "repository": f"{harbor_url}/{project}/{train_id}",
-        "tag": "latest" if not tag else tag
-    }
+    config = make_base_config(train_id, tag)
 
     # Extract config by id if given
     if execution_params.config_id != "default":
@@ -90,6 +112,141 @@ def validate_run_config(
         return "default", config
 
 
+def make_base_config(train_id: str, tag: str = None) -> dict:
+    """
+    Create the minimal run configuration identifying the image of the train in the registry
+    :param train_id: train id of the train to run
+    :param tag: optional tag of the image
+    :return:
+    """
+    harbor_url = settings.config.registry.address
+    project = settings.config.registry.project
+    return {
+        "repository": f"{harbor_url}/{project}/{train_id}",
+        "tag": "latest" if not tag else tag
+    }
+
+
+def run_trains(db: Session, runs: List[dts.DockerTrainBulkRunItem],
+               max_workers: int = 8) -> List[dts.DockerTrainRunResult]:
+    """
+    Execute multiple PHT 1.0 docker trains. Trains, configs and datasets are loaded with one query each, the DAG
+    runs are triggered concurrently and all executions are stored in a single transaction.
+
+    :param db: database session
+    :param runs: trains to run with their optional config and dataset
+    :param max_workers: maximum number of concurrent requests to airflow
+    :return: result of each run in the order of the given runs
+    """
+    train_ids = {run.train_id for run in runs}
+    db_trains = {
+        t.train_id: t for t in db.query(dtm.DockerTrain).options(joinedload(dtm.DockerTrain.state))
+        .filter(dtm.DockerTrain.train_id.in_(train_ids)).all()
+    }
+
+    # resolve the config of each run, the one given in the request or the one assigned to the train
+    config_ids = {}
+    invalid_configs = {}
+    for i, run in enumerate(runs):
+        db_train = db_trains.get(run.train_id)
+        config_id = run.config_id if run.config_id is not None else (db_train.config_id if db_train else None)
+        if config_id in (None, "default"):
+            config_ids[i] = "default"
+            continue
+        try:
+            config_ids[i] = int(config_id)
+        except (TypeError, ValueError):
+            invalid_configs[i] = config_id
+    db_configs = {
+        c.id: c for c in db.query(dtm.DockerTrainConfig).filter(
+            dtm.DockerTrainConfig.id.in_({c for c in config_ids.values() if c != "default"})).all()
+    }
+    dataset_ids = {run.dataset_id for run in runs if run.dataset_id}
+    db_datasets = {
+        str(d.id): d for d in db.query(DataSet).filter(DataSet.id.in_(dataset_ids)).all()
+    } if dataset_ids else {}
+
+    results: Dict[int, dts.DockerTrainRunResult] = {}
+    run_configs: Dict[int, dict] = {}
+    for i, run in enumerate(runs):
+        if run.train_id not in db_trains:
+            results[i] = dts.DockerTrainRunResult(train_id=run.train_id, success=False,
+                                                  error=f"Train with id '{run.train_id}' not found.")
+            continue
+        if i in invalid_configs:
+            results[i] = dts.DockerTrainRunResult(train_id=run.train_id, success=False,
+                                                  error=f"Invalid config id '{invalid_configs[i]}'.")
+            continue
+        config = make_base_config(run.train_id)
+        if config_ids[i] != "default":
+            db_config = db_configs.get(config_ids[i])
+            if not db_config:
+                results[i] = dts.DockerTrainRunResult(train_id=run.train_id, success=False,
+                                                      error=f"Config with id '{config_ids[i]}' not found.")
+                continue
+            process_db_config(config, db_config)
+        if run.dataset_id:
+            dataset = db_datasets.get(str(run.dataset_id))
+            if not dataset:
+                results[i] = dts.DockerTrainRunResult(train_id=run.train_id, success=False,
+                                                      error=f"Dataset with id '{run.dataset_id}' not found.")
+                continue
+            process_dataset(config, dataset)
+        run_configs[i] = config
+
+    # trigger the dag runs concurrently, the airflow client reuses pooled connections
+    run_ids = {}
+    if run_configs:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(run_configs))) as executor:
+            futures = {i: executor.submit(clients.airflow.trigger_dag,
+                                          train_dag_id(config.get("execution_mode")), config=config)
+                       for i, config in run_configs.items()}
+        for i, future in futures.items():
+            try:
+                run_ids[i] = future.result()
+            except Exception as e:
+                logger.error(f"Error while running train {runs[i].train_id}: {e}")
+                record_train_execution("docker", "failed")
+                results[i] = dts.DockerTrainRunResult(train_id=runs[i].train_id, success=False,
+                                                      error="No connection to the airflow client could be "
+                                                            "established.")
+
+    # store all executions in one transaction
+    run_time = datetime.now()
+    executions = {}
+    for i, run_id in run_ids.items():
+        db_train = db_trains[runs[i].train_id]
+        db_train.is_active = True
+        db_train.updated_at = run_time
+        if db_train.state:
+            db_train.state.last_execution = run_time
+            db_train.state.num_executions += 1
+            db_train.state.status = "active"
+        config_id = config_ids[i]
+        execution = dtm.DockerTrainExecution(
+            train_id=db_train.id,
+            start=run_time,
+            airflow_dag_run=run_id,
+            config=config_id if config_id != "default" else None,
+            dataset=runs[i].dataset_id,
+            status="running",
+            execution_mode=run_configs[i].get("execution_mode", "default"),
+        )
+        db.add(execution)
+        executions[i] = execution
+    db.commit()
+
+    for i, execution in executions.items():
+        db.refresh(execution)
+        record_train_execution("docker", "triggered")
+        results[i] = dts.DockerTrainRunResult(
+            train_id=runs[i].train_id,
+            success=True,
+            execution=dts.DockerTrainSavedExecution.from_orm(execution),
+        )
+    return [results[i] for i in range(len(runs))]
+
+
 def update_state(db: Session, db_train: dtm.DockerTrain, run_time: datetime) -> dts.DockerTrainState:
     """
     Update the train state object of the train after starting an execution.
@@ -120,7 +277,8 @@ def update_train_after_run(db: Session,
                            db_train: dtm.DockerTrain,
                            run_id: str,
                            config_id: int,
-                           dataset_id: int = None) -> dts.DockerTrain:
+                           dataset_id: int = None,
+                           execution_mode: str = "default") -> dts.DockerTrain:
     """
     Update train in the database and create a new execution object that stores the run configuration.
 
@@ -130,6 +288,7 @@ def update_train_after_run(db: Session,
         run_id: run id of the airflow DAG run
         config_id: id of the config used for the run
         dataset_id: id of the dataset used for the run
+        execution_mode: dag used to execute the train, either default or fast
 
     Returns:
         updated train object
@@ -144,9 +303,12 @@ def update_train_after_run(db: Session,
     # Create an execution
     execution = dtm.DockerTrainExecution(
         train_id=db_train.id,
+        start=run_time,
         airflow_dag_run=run_id,
         config=config_id,
-        dataset=dataset_id
+        dataset=dataset_id,
+        status="running",
+        execution_mode=execution_mode,
     )
     db.add(execution)
     db.commit()
@@ -164,6 +326,11 @@ def process_db_config(config_dict: dict, db_config: dtm.DockerTrainConfig) -> di
     :param db_config: db_config object
     :return:
     """
+    resources = train_resources(db_config.cpu_requirements, db_config.gpu_requirements)
+    if resources:
+        config_dict["resources"] = resources
+    if db_config.execution_mode:
+        config_dict["execution_mode"] = db_config.execution_mode
 
     if db_config.airflow_config:
         db_config = dts.DockerTrainConfig.from_orm(db_config)
@@ -0,0 +1,44 @@
+import docker
+from docker.errors import DockerException, ImageNotFound
+from fastapi import HTTPException
+from loguru import logger
+
+from station.app.config import settings
+from station.app.schemas import docker_trains as dts
+from station.app.trains.docker.airflow import make_base_config
+from station.trains.docker.metadata import TRAIN_CONFIG_FILE, extract_train_metadata
+
+
+def inspect_train(train_id: str, tag: str = None) -> dts.DockerTrainInspection:
+    """
+    Read the train config and query of a docker train from its image, the image is pulled from the registry if it is
+    not available locally.
+    :param train_id: train id of the train to inspect
+    :param tag: optional tag of the image
+    :return:
+    """
+    image_config = make_base_config(train_id, tag)
+    img = f"{image_config['repository']}:{image_config['tag']}"
+    try:
+        client = docker.from_env()
+        try:
+            client.images.get(img)
+        except ImageNotFound:
+            registry = settings.config.registry
+            client.login(username=registry.user, password=registry.password.get_secret_value(),
+                         registry=str(registry.address).split("//")[-1])
+            client.images.pull(image_config["repository"], tag=image_config["tag"])
+        metadata = extract_train_metadata(client, img)
+    except DockerException as e:
+        logger.error(f"Unable to inspect image {img}: {e}")
+        raise HTTPException(status_code=503, detail=f"Unable to read the image of train '{train_id}'.")
+
+    if TRAIN_CONFIG_FILE not in metadata.files:
+        raise HTTPException(status_code=404, detail=f"No train config found in the image of train '{train_id}'.")
+    return dts.DockerTrainInspection(
+        train_id=train_id,
+        image=img,
+        config=metadata.config.dict(by_alias=True),
+        query=metadata.query,
+        files=sorted(metadata.files),
+    )
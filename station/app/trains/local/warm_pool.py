@@ -0,0 +1,84 @@
+import threading
+from typing import Dict, Optional
+
+import docker
+from loguru import logger
+
+from station.app.config import settings
+from station.app.settings import WarmPoolSettings
+from station.trains.local.warm_pool import WarmPool
+
+
+class WarmPoolManager:
+    """
+    Keeps the configured number of paused containers of the pooled master images available for local trains. Claimed
+    containers are replaced in the background and containers of images that are no longer pooled are removed.
+    """
+
+    def __init__(self, interval: int = None, client: docker.DockerClient = None, config: WarmPoolSettings = None):
+        self._interval = interval
+        self._config = config
+        self._client = client
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def config(self) -> WarmPoolSettings:
+        if self._config:
+            return self._config
+        if settings.is_initialized and settings.config.warm_pool:
+            return settings.config.warm_pool
+        return WarmPoolSettings()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config.enabled and self.config.images)
+
+    @property
+    def interval(self) -> int:
+        return self._interval or self.config.interval
+
+    @property
+    def pool(self) -> WarmPool:
+        if not self._client:
+            self._client = docker.from_env()
+        return WarmPool(self._client)
+
+    def start(self):
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refill_loop, name="warm-pool", daemon=True)
+        self._thread.start()
+        logger.info(f"Started warm container pool for {self.config.images}, interval: {self.interval}s")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def refill(self) -> Dict[str, int]:
+        """
+        Replace claimed containers and remove the containers of images that are no longer pooled as well as claimed
+        containers exceeding the maximum run time.
+
+        Returns:
+            number of created containers by image
+        """
+        pool = self.pool
+        pool.prune(self.config.images, max_run_time=self.config.max_run_time)
+        return {image: pool.fill(image, self.config.size) for image in self.config.images}
+
+    def _refill_loop(self):
+        # fill the pool right away, the first trains should not wait for the first interval
+        while True:
+            try:
+                self.refill()
+            except Exception as e:
+                logger.error(f"Error refilling the warm container pool: {e}")
+            if self._stop_event.wait(self.interval):
+                break
+
+
+warm_pool_manager = WarmPoolManager()
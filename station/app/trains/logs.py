@@ -0,0 +1,26 @@
+from fastapi import HTTPException
+
+from station.app.config import clients
+from station.app.schemas.airflow import TrainLogPage
+from station.trains.docker.logs import get_log_index, read_log_page
+
+
+def get_train_log_page(run_id: str, page: int = 0) -> TrainLogPage:
+    """
+    Read a page of the container log stored for a train run.
+    """
+    index = get_log_index(clients.minio, run_id)
+    if not index:
+        raise HTTPException(status_code=404, detail=f"No train logs stored for run {run_id}.")
+    content = read_log_page(clients.minio, run_id, page) if page < index["parts"] else None
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"Page {page} of the train logs of run {run_id} not found.")
+    return TrainLogPage(
+        run_id=run_id,
+        page=page,
+        pages=index["parts"],
+        size=index["size"],
+        dropped=index["dropped"],
+        content=content,
+    )
+
@@ -0,0 +1,230 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from station.app.config import clients, settings
+from station.app.models import docker_trains as dtm
+from station.app.models import local_trains as ltm
+from station.app.settings import StatusSettings
+from station.app.trains.docker.airflow import DOCKER_TRAIN_DAGS
+
+DOCKER_TRAIN_DAG = DOCKER_TRAIN_DAGS["default"]
+LOCAL_TRAIN_DAG = "run_local_train"
+# dag run states after which an execution is finished
+TERMINAL_RUN_STATES = {"success", "failed"}
+# state of executions whose dag run no longer exists in airflow
+MISSING_RUN_STATE = "unknown"
+# tolerated difference between the start of an execution and the execution date of its dag run
+EXECUTION_DATE_MARGIN = timedelta(minutes=5)
+
+
+def _parse_airflow_date(value: Optional[str]) -> Optional[datetime]:
+    """
+    Convert a timestamp returned by airflow to a naive local datetime as stored in the station database.
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _docker_dag_id(execution: dtm.DockerTrainExecution) -> str:
+    return DOCKER_TRAIN_DAGS.get(execution.execution_mode or "default", DOCKER_TRAIN_DAG)
+
+
+def _train_status(run_state: str) -> str:
+    return "completed" if run_state == "success" else "failed"
+
+
+class ExecutionReconciler:
+    """
+    Synchronizes the state of running docker and local train executions with airflow. The states of all pending runs
+    are fetched with a single batch request per poll and the executions and train states are updated in one
+    transaction.
+    """
+
+    def __init__(self, interval: int = None):
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def interval(self) -> int:
+        if self._interval:
+            return self._interval
+        if settings.is_initialized and settings.config.status:
+            return settings.config.status.reconcile_interval
+        return StatusSettings().reconcile_interval
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._reconcile_loop, name="execution-reconciler", daemon=True)
+        self._thread.start()
+        logger.info(f"Started train execution reconciler, interval: {self.interval}s")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def reconcile(self, db: Session) -> int:
+        """
+        Update all executions whose airflow run has finished.
+        Args:
+            db: database session
+
+        Returns:
+            number of updated executions
+        """
+        docker_executions = db.query(dtm.DockerTrainExecution).filter(
+            dtm.DockerTrainExecution.end.is_(None),
+            dtm.DockerTrainExecution.airflow_dag_run.isnot(None),
+        ).all()
+        local_executions = db.query(ltm.LocalTrainExecution).filter(
+            ltm.LocalTrainExecution.finish.is_(None),
+            ltm.LocalTrainExecution.airflow_dag_run.isnot(None),
+        ).all()
+        if not docker_executions and not local_executions:
+            return 0
+
+        # docker trains are executed by the dag of their execution mode
+        docker_by_dag = {}
+        for execution in docker_executions:
+            docker_by_dag.setdefault(_docker_dag_id(execution), []).append(execution)
+        dag_ids = list(docker_by_dag)
+        if local_executions:
+            dag_ids.append(LOCAL_TRAIN_DAG)
+        run_ids = [e.airflow_dag_run for e in docker_executions + local_executions]
+        # only the runs triggered since the oldest pending execution started are listed
+        starts = [e.start for e in docker_executions + local_executions if e.start]
+        execution_date_gte = min(starts) - EXECUTION_DATE_MARGIN if starts else None
+        dag_runs = {
+            (run["dag_id"], run["dag_run_id"]): run
+            for run in clients.airflow.list_dag_runs(dag_ids=dag_ids, run_ids=run_ids,
+                                                     execution_date_gte=execution_date_gte)
+        }
+
+        # executions whose run was not found are finished as well, otherwise they would be requested on every poll
+        finished_docker = []
+        for dag_id, executions in docker_by_dag.items():
+            finished_docker.extend(
+                self._finish_executions(executions, dag_id, dag_runs, end_attr="end", finish_missing=True)
+            )
+        finished_local = self._finish_executions(local_executions, LOCAL_TRAIN_DAG, dag_runs, end_attr="finish",
+                                                 finish_missing=True)
+        self._update_docker_trains(db, finished_docker)
+        self._update_local_trains(db, finished_local)
+        db.commit()
+
+        updated = len(finished_docker) + len(finished_local)
+        if updated:
+            logger.info(f"Reconciled {updated} finished train executions")
+        return updated
+
+    def finish_run(self, db: Session, dag_run: dict) -> int:
+        """
+        Update the executions of a single finished run, e.g. when notified by the dag.
+        Args:
+            db: database session
+            dag_run: dag run in the format returned by airflow
+
+        Returns:
+            number of updated executions
+        """
+        key = (dag_run["dag_id"], dag_run["dag_run_id"])
+        if dag_run["dag_id"] in DOCKER_TRAIN_DAGS.values():
+            executions = db.query(dtm.DockerTrainExecution).filter(
+                dtm.DockerTrainExecution.airflow_dag_run == dag_run["dag_run_id"],
+                dtm.DockerTrainExecution.end.is_(None),
+            ).all()
+            finished = self._finish_executions(executions, dag_run["dag_id"], {key: dag_run}, end_attr="end")
+            self._update_docker_trains(db, finished)
+        elif dag_run["dag_id"] == LOCAL_TRAIN_DAG:
+            executions = db.query(ltm.LocalTrainExecution).filter(
+                ltm.LocalTrainExecution.airflow_dag_run == dag_run["dag_run_id"],
+                ltm.LocalTrainExecution.finish.is_(None),
+            ).all()
+            finished = self._finish_executions(executions, LOCAL_TRAIN_DAG, {key: dag_run}, end_attr="finish")
+            self._update_local_trains(db, finished)
+        else:
+            return 0
+        db.commit()
+        return len(finished)
+
+    @staticmethod
+    def _finish_executions(executions: list, dag_id: str, dag_runs: Dict[tuple, dict], end_attr: str,
+                           finish_missing: bool = False) -> list:
+        finished = []
+        for execution in executions:
+            dag_run = dag_runs.get((dag_id, execution.airflow_dag_run))
+            if not dag_run:
+                if finish_missing:
+                    logger.warning(f"Dag run {execution.airflow_dag_run} of {dag_id} not found in airflow")
+                    execution.status = MISSING_RUN_STATE
+                    setattr(execution, end_attr, datetime.now())
+                    finished.append(execution)
+                continue
+            execution.status = dag_run["state"]
+            if dag_run["state"] not in TERMINAL_RUN_STATES:
+                continue
+            start = _parse_airflow_date(dag_run.get("start_date"))
+            end = _parse_airflow_date(dag_run.get("end_date")) or datetime.now()
+            setattr(execution, end_attr, end)
+            execution.duration = (end - start).total_seconds() if start else None
+            finished.append(execution)
+        return finished
+
+    @staticmethod
+    def _update_docker_trains(db: Session, finished: List[dtm.DockerTrainExecution]):
+        if not finished:
+            return
+        db.flush()
+        train_ids = {e.train_id for e in finished}
+        still_running = {
+            train_id for train_id, in db.query(dtm.DockerTrainExecution.train_id).filter(
+                dtm.DockerTrainExecution.train_id.in_(train_ids),
+                dtm.DockerTrainExecution.end.is_(None),
+            )
+        }
+        # the last finished execution of a train determines its status
+        last_finished = {e.train_id: e for e in sorted(finished, key=lambda e: e.end)}
+        trains = db.query(dtm.DockerTrain).filter(dtm.DockerTrain.id.in_(train_ids - still_running)).all()
+        for train in trains:
+            train.is_active = False
+            if train.state:
+                train.state.status = _train_status(last_finished[train.id].status)
+
+    @staticmethod
+    def _update_local_trains(db: Session, finished: List[ltm.LocalTrainExecution]):
+        if not finished:
+            return
+        last_finished = {e.train_id: e for e in sorted(finished, key=lambda e: e.finish)}
+        states = db.query(ltm.LocalTrainState).filter(ltm.LocalTrainState.train_id.in_(last_finished.keys())).all()
+        for state in states:
+            execution = last_finished.get(state.train_id) or last_finished.get(str(state.train_id))
+            if execution:
+                state.status = _train_status(execution.status)
+
+    def _reconcile_loop(self):
+        from station.app.db.session import SessionLocal
+
+        while not self._stop_event.wait(self.interval):
+            db = SessionLocal()
+            try:
+                self.reconcile(db)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error reconciling train executions: {e}")
+            finally:
+                db.close()
+
+
+execution_reconciler = ExecutionReconciler()
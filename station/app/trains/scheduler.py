@@ -0,0 +1,360 @@
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from station.app.config import settings
+from station.app.models import docker_trains as dtm
+from station.app.models import local_trains as ltm
+from station.app.models.train_queue import TrainRunRequest
+from station.app.schemas import train_queue as tqs
+from station.app.settings import SchedulerSettings
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def requested_resources(db_config: Optional[dtm.DockerTrainConfig]) -> tqs.Resources:
+    """
+    Resources requested by a train config. The cpu requirements are given as {"cpus": 2, "memory": 4} with the memory
+    in GB and the gpu requirements as {"count": 1}. Runs without requirements request a single cpu.
+    """
+    cpu_requirements = (db_config.cpu_requirements if db_config else None) or {}
+    gpu_requirements = (db_config.gpu_requirements if db_config else None) or {}
+    return tqs.Resources(
+        cpus=float(cpu_requirements.get("cpus", 1.0)),
+        memory=float(cpu_requirements.get("memory", 0.0)),
+        gpus=int(gpu_requirements.get("count", 0)),
+    )
+
+
+def queued_response(request: TrainRunRequest) -> JSONResponse:
+    """
+    Response of a run endpoint for a run request that is waiting in the queue.
+    """
+    return JSONResponse(status_code=202, content=jsonable_encoder(tqs.TrainRunRequest.from_orm(request)))
+
+
+class ExecutionScheduler:
+    """
+    Admission control for train runs. Run requests are queued in the station database and the DAG of a request is
+    only triggered when the resources it requests are available on the host, requests with a higher priority are
+    admitted first and requests of the same priority in the order they were submitted. The resources of a run are
+    reserved until its execution has finished.
+    """
+
+    def __init__(self, interval: int = None):
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def config(self) -> SchedulerSettings:
+        if settings.is_initialized and settings.config.scheduler:
+            return settings.config.scheduler
+        return SchedulerSettings()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config.enabled)
+
+    @property
+    def interval(self) -> int:
+        return self._interval or self.config.interval
+
+    def start(self):
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._schedule_loop, name="execution-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Started train execution scheduler, interval: {self.interval}s")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def submit(self, db: Session, train_type: str, train_id: str, config_id: Any = None, dataset_id: Any = None,
+               priority: int = 0) -> Tuple[TrainRunRequest, Optional[Any]]:
+        """
+        Queue a train run and start it right away if its resources are available.
+        Args:
+            db: database session
+            train_type: docker or local
+            train_id: id of the train
+            config_id: id of the train config used for the run
+            dataset_id: id of the dataset used for the run
+            priority: requests with a higher priority are started first
+
+        Returns:
+            the run request and the execution if the run was started
+        """
+        db_config = None
+        if config_id not in (None, "default"):
+            try:
+                config_id = int(config_id)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail=f"Invalid config id '{config_id}'.")
+            db_config = db.query(dtm.DockerTrainConfig).filter(dtm.DockerTrainConfig.id == config_id).first()
+            if not db_config:
+                raise HTTPException(status_code=404, detail=f"Config with id '{config_id}' not found.")
+        resources = requested_resources(db_config)
+        request = TrainRunRequest(
+            train_type=train_type,
+            train_id=str(train_id),
+            config_id=str(config_id) if config_id is not None else None,
+            dataset_id=str(dataset_id) if dataset_id is not None else None,
+            priority=priority or 0,
+            cpus=resources.cpus,
+            memory=resources.memory,
+            gpus=resources.gpus,
+            status="queued",
+        )
+        db.add(request)
+        db.commit()
+        executions = self.schedule(db)
+        db.refresh(request)
+        return request, executions.get(request.id)
+
+    def submit_docker_trains(self, db: Session, runs: List[Any]) -> List[Any]:
+        """
+        Queue multiple docker train runs, runs without a config use the config assigned to the train.
+        Args:
+            db: database session
+            runs: trains to run with their optional config and dataset
+
+        Returns:
+            the result of each run in the order of the given runs with the run request and the execution if the run
+            was started
+        """
+        from station.app.schemas.docker_trains import DockerTrainRunResult
+
+        train_ids = {run.train_id for run in runs}
+        db_trains = {
+            t.train_id: t for t in db.query(dtm.DockerTrain).filter(dtm.DockerTrain.train_id.in_(train_ids)).all()
+        }
+        results = []
+        for run in runs:
+            db_train = db_trains.get(run.train_id)
+            if not db_train:
+                results.append(DockerTrainRunResult(train_id=run.train_id, success=False,
+                                                    error=f"Train with id '{run.train_id}' not found."))
+                continue
+            config_id = run.config_id if run.config_id is not None else (db_train.config_id or "default")
+            try:
+                request, execution = self.submit(db, "docker", run.train_id, config_id=config_id,
+                                                 dataset_id=run.dataset_id)
+            except HTTPException as e:
+                results.append(DockerTrainRunResult(train_id=run.train_id, success=False, error=e.detail))
+                continue
+            results.append(DockerTrainRunResult(
+                train_id=run.train_id,
+                success=request.status != "failed",
+                execution=execution,
+                request=tqs.TrainRunRequest.from_orm(request),
+                error=request.error,
+            ))
+        return results
+
+    def schedule(self, db: Session) -> Dict[int, Any]:
+        """
+        Release the resources of finished runs and start queued runs in the order of their priority as long as their
+        resources are available. A request that does not fit blocks the requests behind it, so large runs are not
+        starved by smaller ones.
+        Args:
+            db: database session
+
+        Returns:
+            the executions of the started runs by request id
+        """
+        with self._lock:
+            self._release_finished(db)
+            running = db.query(TrainRunRequest).filter(TrainRunRequest.status == "running").all()
+            queued = db.query(TrainRunRequest).filter(TrainRunRequest.status == "queued").order_by(
+                TrainRunRequest.priority.desc(), TrainRunRequest.created_at, TrainRunRequest.id
+            ).with_for_update(skip_locked=True).all()
+
+            available = self._available(running)
+            admitted = []
+            num_running = len(running)
+            for request in queued:
+                if self.config.max_concurrent and num_running >= self.config.max_concurrent:
+                    break
+                if not self._fits(request, available, num_running):
+                    break
+                request.status = "running"
+                request.started_at = datetime.now()
+                admitted.append(request)
+                num_running += 1
+                available.cpus -= request.cpus
+                available.memory -= request.memory
+                available.gpus -= request.gpus
+            # admitted requests are marked as running before their DAGs are triggered, triggering commits the session
+            # and releases the row locks, the requests must not be picked up again by another scheduler
+            db.commit()
+
+            started = {}
+            for request in admitted:
+                execution = self._start(db, request)
+                if execution is not None:
+                    started[request.id] = execution
+                db.commit()
+            return started
+
+    def cancel(self, db: Session, request_id: int) -> Optional[TrainRunRequest]:
+        request = db.query(TrainRunRequest).filter(TrainRunRequest.id == request_id).first()
+        if not request:
+            return None
+        if request.status == "queued":
+            request.status = "cancelled"
+            request.finished_at = datetime.now()
+            db.commit()
+        return request
+
+    def get_requests(self, db: Session, statuses: List[str] = ACTIVE_STATUSES) -> List[TrainRunRequest]:
+        return db.query(TrainRunRequest).filter(TrainRunRequest.status.in_(statuses)).order_by(
+            TrainRunRequest.priority.desc(), TrainRunRequest.created_at, TrainRunRequest.id
+        ).all()
+
+    def queue_status(self, db: Session) -> tqs.TrainQueueStatus:
+        """
+        Depth of the queue, waiting times and the resources reserved by running trains.
+        """
+        now = datetime.now()
+        requests = self.get_requests(db)
+        queued = [r for r in requests if r.status == "queued"]
+        running = [r for r in requests if r.status == "running"]
+        started_recently = db.query(TrainRunRequest).filter(
+            TrainRunRequest.started_at >= now - timedelta(hours=1)
+        ).all()
+        waits = [(r.started_at - r.created_at).total_seconds() for r in started_recently]
+
+        return tqs.TrainQueueStatus(
+            enabled=self.enabled,
+            queued=len(queued),
+            running=len(running),
+            queued_by_priority=dict(Counter(r.priority for r in queued)),
+            oldest_wait=max(((now - r.created_at).total_seconds() for r in queued), default=None),
+            average_wait=sum(waits) / len(waits) if waits else None,
+            capacity=self._capacity(),
+            reserved=self._reserved(running),
+            available=self._available(running),
+        )
+
+    def _capacity(self) -> tqs.Resources:
+        memory = psutil.virtual_memory().total / 1024 ** 3
+        return tqs.Resources(
+            cpus=float(psutil.cpu_count()),
+            memory=memory * (1 - self.config.memory_reserve),
+            gpus=self.config.gpus or 0,
+        )
+
+    @staticmethod
+    def _reserved(running: List[TrainRunRequest]) -> tqs.Resources:
+        return tqs.Resources(
+            cpus=sum(r.cpus for r in running),
+            memory=sum(r.memory for r in running),
+            gpus=sum(r.gpus for r in running),
+        )
+
+    def _available(self, running: List[TrainRunRequest]) -> tqs.Resources:
+        capacity = self._capacity()
+        reserved = self._reserved(running)
+        # memory used by other processes on the host is not available to trains either
+        free_memory = psutil.virtual_memory().available / 1024 ** 3 + reserved.memory
+        return tqs.Resources(
+            cpus=capacity.cpus - reserved.cpus,
+            memory=min(capacity.memory, free_memory) - reserved.memory,
+            gpus=capacity.gpus - reserved.gpus,
+        )
+
+    @staticmethod
+    def _fits(request: TrainRunRequest, available: tqs.Resources, num_running: int) -> bool:
+        # a single run is always admitted on an idle host, even if it requests more than the host has
+        if num_running == 0:
+            return True
+        return request.cpus <= available.cpus and request.memory <= available.memory and \
+            request.gpus <= available.gpus
+
+    def _start(self, db: Session, request: TrainRunRequest):
+        """
+        Trigger the DAG of an admitted request, requests that can not be started are marked as failed.
+        """
+        from station.app.trains.docker.airflow import run_train
+        from station.app.schemas.docker_trains import DockerTrainExecution
+        from station.trains.local.airflow import run_local_train
+
+        try:
+            if request.train_type == "docker":
+                execution = run_train(db, request.train_id, DockerTrainExecution(
+                    config_id=int(request.config_id) if request.config_id not in (None, "default") else "default",
+                    dataset_id=request.dataset_id,
+                ))
+            else:
+                execution = run_local_train(
+                    db,
+                    train_id=request.train_id,
+                    dataset_id=request.dataset_id,
+                    config_id=int(request.config_id) if request.config_id not in (None, "default") else None,
+                )
+        except Exception as e:
+            logger.error(f"Unable to start queued {request.train_type} train {request.train_id}: {e}")
+            request.status = "failed"
+            request.error = str(getattr(e, "detail", e))
+            request.finished_at = datetime.now()
+            return None
+
+        request.airflow_dag_run = execution.airflow_dag_run
+        logger.info(f"Started queued {request.train_type} train {request.train_id} after "
+                    f"{(request.started_at - request.created_at).total_seconds():.1f}s")
+        return execution
+
+    @staticmethod
+    def _release_finished(db: Session):
+        running = db.query(TrainRunRequest).filter(TrainRunRequest.status == "running").all()
+        run_ids = [r.airflow_dag_run for r in running if r.airflow_dag_run]
+        if not run_ids:
+            return
+        finished = {
+            run_id: end for run_id, end in db.query(dtm.DockerTrainExecution.airflow_dag_run,
+                                                   dtm.DockerTrainExecution.end).filter(
+                dtm.DockerTrainExecution.airflow_dag_run.in_(run_ids),
+                dtm.DockerTrainExecution.end.isnot(None),
+            )
+        }
+        finished.update({
+            run_id: end for run_id, end in db.query(ltm.LocalTrainExecution.airflow_dag_run,
+                                                   ltm.LocalTrainExecution.finish).filter(
+                ltm.LocalTrainExecution.airflow_dag_run.in_(run_ids),
+                ltm.LocalTrainExecution.finish.isnot(None),
+            )
+        })
+        for request in running:
+            if request.airflow_dag_run in finished:
+                request.status = "finished"
+                request.finished_at = finished[request.airflow_dag_run]
+
+    def _schedule_loop(self):
+        from station.app.db.session import SessionLocal
+
+        while not self._stop_event.wait(self.interval):
+            db = SessionLocal()
+            try:
+                self.schedule(db)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error scheduling train runs: {e}")
+            finally:
+                db.close()
+
+
+execution_scheduler = ExecutionScheduler()
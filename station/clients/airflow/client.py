@@ -1,10 +1,18 @@
 import requests
 import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
 from dotenv import find_dotenv, load_dotenv
 from requests.auth import HTTPBasicAuth
 from loguru import logger
 
 from station.app.schemas.station_status import HealthStatus
+from station.clients.instrumentation import InstrumentedSession, upstream_operation
+
+# task instance states after which the try number and log of a task no longer change
+TERMINAL_TASK_STATES = {"success", "failed", "skipped", "upstream_failed", "removed"}
 
 
 class AirflowClient:
@@ -14,7 +22,16 @@ class AirflowClient:
         self.airflow_user = airflow_user if airflow_user else os.getenv("AIRFLOW_USER", "admin")
         self.airflow_pw = airflow_password if airflow_password else os.getenv("AIRFLOW_PW", "admin")
         self.auth = HTTPBasicAuth(self.airflow_user, self.airflow_pw)
+        self.session = InstrumentedSession("airflow")
+        # task instances by (dag_id, run_id, task_id) with the time until which they are considered fresh
+        self._task_instances = {}
+        self._task_instance_lock = threading.Lock()
+        self.task_instance_ttl = 10
+        # finished tasks only change when they are cleared and rerun
+        self.finished_task_instance_ttl = 300
+        self.task_instance_cache_size = 256
 
+    @upstream_operation("trigger_dag")
     def trigger_dag(self, dag_id: str, config: dict = None) -> str:
         """
         Execute a dag with the given configuration
@@ -32,7 +49,7 @@ class AirflowClient:
             config_msg["conf"] = config
 
         url = self.airflow_url + f"dags/{dag_id}/dagRuns"
-        r = requests.post(url=url, auth=self.auth, json=config_msg)
+        r = self.session.post(url=url, auth=self.auth, json=config_msg)
         try:
             r.raise_for_status()
 
@@ -45,32 +62,76 @@ class AirflowClient:
     def get_dag_run(self, dag_id: str):
         pass
 
+    @upstream_operation("get_all_dag_runs")
     def get_all_dag_runs(self, dag_id: str):
         url = self.airflow_url + f"dags/{dag_id}/dagRuns"
-        r = requests.get(url=url, auth=self.auth)
+        r = self.session.get(url=url, auth=self.auth)
         r.raise_for_status()
         return r.json()
 
+    @upstream_operation("list_dag_runs")
+    def list_dag_runs(self, dag_ids: List[str], run_ids: List[str] = None, execution_date_gte: datetime = None,
+                      page_limit: int = 100) -> List[dict]:
+        """
+        Get the runs of multiple dags with the batch endpoint, newest runs first.
+
+        :param dag_ids: ids of the dags whose runs are listed
+        :param run_ids: optional ids of the runs to find, stops paging once all of them have been found
+        :param execution_date_gte: only list runs executed at or after this time, naive datetimes are local time
+        :param page_limit: number of runs requested per page
+        :return: list of dag runs
+        """
+        url = self.airflow_url + "dags/~/dagRuns/list"
+        remaining = set(run_ids) if run_ids else None
+        dag_runs = []
+        offset = 0
+        while True:
+            body = {
+                "dag_ids": dag_ids,
+                "order_by": "-execution_date",
+                "page_offset": offset,
+                "page_limit": page_limit,
+            }
+            if execution_date_gte:
+                body["execution_date_gte"] = execution_date_gte.astimezone().isoformat()
+            r = self.session.post(url=url, auth=self.auth, json=body)
+            r.raise_for_status()
+            page = r.json()
+            for dag_run in page["dag_runs"]:
+                if remaining is None:
+                    dag_runs.append(dag_run)
+                elif dag_run["dag_run_id"] in remaining:
+                    dag_runs.append(dag_run)
+                    remaining.discard(dag_run["dag_run_id"])
+            offset += len(page["dag_runs"])
+            if not page["dag_runs"] or offset >= page["total_entries"] or remaining == set():
+                break
+        return dag_runs
+
+    @upstream_operation("get_dags")
     def get_dags(self):
         url = self.airflow_url + "dags"
-        r = requests.get(url=url, auth=self.auth)
+        r = self.session.get(url=url, auth=self.auth)
         r.raise_for_status()
 
         return r.json()
 
     # TODO create arguments for individual connection options
+    @upstream_operation("create_connection")
     def create_connection(self, connection_dict: dict):
         url = self.airflow_url + "connections"
-        r = requests.post(url=url, json=connection_dict)
+        r = self.session.post(url=url, json=connection_dict)
         r.raise_for_status()
 
-    def health_check(self) -> HealthStatus:
+    @upstream_operation("health_check")
+    def health_check(self, timeout: float = None) -> HealthStatus:
         """
 
+        @param timeout: optional timeout of the request in seconds
         @return: dict: Airflow Status
         """
         url = self.airflow_url + "/health"
-        r = requests.get(url=url)
+        r = self.session.get(url=url, timeout=timeout)
         try:
             r.raise_for_status()
             return HealthStatus.healthy
@@ -78,6 +139,7 @@ class AirflowClient:
             logger.error(f"Error checking airflow health: \n{e}")
             return HealthStatus.error
 
+    @upstream_operation("get_run_information")
     def get_run_information(self, dag_id: str, run_id: str) -> dict:
         """
         requests the information about a dag run state from airflow.
@@ -86,16 +148,63 @@ class AirflowClient:
         @return: dict: information about the run
         """
         url = self.airflow_url + f"dags/{dag_id}/dagRuns/{run_id}/taskInstances"
-        task_list = requests.get(url=url, auth=self.auth)
+        task_list = self.session.get(url=url, auth=self.auth)
         task_list.raise_for_status()
         task_list = task_list.json()
         url = self.airflow_url + f"dags/{dag_id}/dagRuns/{run_id}"
-        information = requests.get(url=url, auth=self.auth)
+        information = self.session.get(url=url, auth=self.auth)
         information.raise_for_status()
         information = information.json()
         information["tasklist"] = task_list
         return information
 
+    @upstream_operation("get_task_instance")
+    def get_task_instance(self, dag_id: str, run_id: str, task_id: str) -> Optional[dict]:
+        """
+        Get a single task instance of a dag run. Task instances are cached for a short time while the task is running
+        and longer once it has finished, to avoid repeated lookups when polling logs.
+        @param dag_id: dag under which the task is run
+        @param run_id: id for specific run
+        @param task_id: id of the task
+        @return: the task instance or None if the task does not exist
+        """
+        key = (dag_id, run_id, task_id)
+        with self._task_instance_lock:
+            cached = self._task_instances.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        url = self.airflow_url + f"dags/{dag_id}/dagRuns/{run_id}/taskInstances/{task_id}"
+        r = self.session.get(url=url, auth=self.auth)
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        task_instance = r.json()
+
+        ttl = self.finished_task_instance_ttl if task_instance.get("state") in TERMINAL_TASK_STATES else \
+            self.task_instance_ttl
+        expires = time.monotonic() + ttl
+        with self._task_instance_lock:
+            if len(self._task_instances) >= self.task_instance_cache_size:
+                self._task_instances.pop(next(iter(self._task_instances)))
+            self._task_instances[key] = (expires, task_instance)
+        return task_instance
+
+    def resolve_try_number(self, dag_id: str, run_id: str, task_id: str,
+                           task_try_number: int = None) -> Tuple[Optional[int], Optional[dict]]:
+        """
+        Resolve the try number of a task, the requested one if it exists otherwise the last one.
+        @return: the try number and the task instance or None, None if the task does not exist
+        """
+        task_instance = self.get_task_instance(dag_id, run_id, task_id)
+        if not task_instance:
+            return None, None
+        last_task_try_number = max(task_instance["try_number"], 1)
+        if task_try_number and task_try_number <= last_task_try_number:
+            return task_try_number, task_instance
+        return last_task_try_number, task_instance
+
+    @upstream_operation("get_task_log")
     def get_task_log(self, dag_id: str, run_id: str, task_id: str, task_try_number: int = None) -> str:
         """
         get the log of a task for a specific run
@@ -105,25 +214,76 @@ class AirflowClient:
         @param task_try_number: specific try number of the task, default is the last try
         @return: logs of the task run
         """
+        try_number, _ = self.resolve_try_number(dag_id, run_id, task_id, task_try_number)
+        if not try_number:
+            return ""
+        url = self.airflow_url + f"dags/{dag_id}/dagRuns/{run_id}/taskInstances/{task_id}/logs/{try_number}"
+        log = self.session.get(url=url, auth=self.auth)
+        log.raise_for_status()
+        return log.content.decode("utf-8")
+
+    @upstream_operation("tail_task_log")
+    def tail_task_log(self, dag_id: str, run_id: str, task_id: str, task_try_number: int = None,
+                      continuation_token: str = None) -> Optional[dict]:
+        """
+        get the part of a task log written since the previous call
+        @param dag_id: dag under which the task is run
+        @param run_id: id for specific run
+        @param task_id: task for which the logs are requested
+        @param task_try_number: specific try number of the task, default is the last try
+        @param continuation_token: token returned by the previous call, the log is read from the start if not given
+        @return: dict with the new log content, the token for the next call, the try number and the task state or
+            None if the task does not exist
+        """
+        try_number, task_instance = self.resolve_try_number(dag_id, run_id, task_id, task_try_number)
+        if not try_number:
+            return None
+        url = self.airflow_url + f"dags/{dag_id}/dagRuns/{run_id}/taskInstances/{task_id}/logs/{try_number}"
+        params = {"full_content": "false"}
+        if continuation_token:
+            params["token"] = continuation_token
+        r = self.session.get(url=url, auth=self.auth, params=params, headers={"Accept": "application/json"})
+        r.raise_for_status()
+        log = r.json()
+        return {
+            "content": log.get("content") or "",
+            "continuation_token": log.get("continuation_token") or continuation_token,
+            "try_number": try_number,
+            "state": task_instance.get("state"),
+        }
+
+
+class TaskLogTail:
+    """
+    Follows the log of a task, keeping the continuation token between reads so that every read only transfers the
+    log written since the previous one.
+    """
 
-        task_number_list = []
-        task_known = False
-        for task in self.get_run_information(dag_id, run_id)["tasklist"]["task_instances"]:
-            if task["task_id"] == task_id:
-                task_known = True
-                task_number_list.append(task["try_number"])
-        if task_known:
-            last_task_try_number = max(task_number_list)
-            if task_try_number and task_try_number <= last_task_try_number:
-                try_number = task_try_number
-            else:
-                try_number = last_task_try_number
-            url = self.airflow_url + f"dags/{dag_id}/dagRuns/{run_id}/taskInstances/{task_id}/logs/{try_number}"
-            log = requests.get(url=url, auth=self.auth)
-            log.raise_for_status()
-            return log.content.decode("utf-8")
-        else:
+    def __init__(self, client: AirflowClient, dag_id: str, run_id: str, task_id: str, task_try_number: int = None):
+        self.client = client
+        self.dag_id = dag_id
+        self.run_id = run_id
+        self.task_id = task_id
+        self.task_try_number = task_try_number
+        self.continuation_token = None
+        self.state = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in TERMINAL_TASK_STATES
+
+    def read(self) -> str:
+        """
+        Read the new log content since the last read.
+        """
+        log = self.client.tail_task_log(self.dag_id, self.run_id, self.task_id, self.task_try_number,
+                                        continuation_token=self.continuation_token)
+        if not log:
             return ""
+        self.task_try_number = log["try_number"]
+        self.continuation_token = log["continuation_token"]
+        self.state = log["state"]
+        return log["content"]
 
 
 airflow_client = AirflowClient()
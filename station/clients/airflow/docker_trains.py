@@ -15,6 +15,8 @@ from loguru import logger
 
 from station.app.settings import settings
 from station.app.config import clients
+from station.trains.docker.resources import train_resources
+from station.app.trains.docker.airflow import train_dag_id
 
 
 def run_train(db: Session, train_id: Any, execution_params: dts.DockerTrainExecution) -> dts.DockerTrainSavedExecution:
@@ -46,8 +48,10 @@ def run_train(db: Session, train_id: Any, execution_params: dts.DockerTrainExecu
 
     # Execute the train using the airflow rest api
     try:
-        run_id = clients.airflow.trigger_dag("run_pht_train", config=config_dict)
-        db_train = update_train_after_run(db, db_train, run_id, config_id, dataset_id=execution_params.dataset_id)
+        execution_mode = config_dict.get("execution_mode", "default")
+        run_id = clients.airflow.trigger_dag(train_dag_id(execution_mode), config=config_dict)
+        db_train = update_train_after_run(db, db_train, run_id, config_id, dataset_id=execution_params.dataset_id,
+                                          execution_mode=execution_mode)
         last_execution = db_train.executions[-1]
         return last_execution
     except Exception as e:
@@ -119,7 +123,8 @@ def update_train_after_run(db: Session,
                            db_train: dtm.DockerTrain,
                            run_id: str,
                            config_id: int,
-                           dataset_id: int = None) -> dts.DockerTrain:
+                           dataset_id: int = None,
+                           execution_mode: str = "default") -> dts.DockerTrain:
     """
     Update train in the database and create a new execution object that stores the run configuration.
 
@@ -129,6 +134,7 @@ def update_train_after_run(db: Session,
         run_id: run id of the airflow DAG run
         config_id: id of the config used for the run
         dataset_id: id of the dataset used for the run
+        execution_mode: dag used to execute the train, either default or fast
 
     Returns:
         updated train object
@@ -143,9 +149,11 @@ def update_train_after_run(db: Session,
     # Create an execution
     execution = dtm.DockerTrainExecution(
         train_id=db_train.id,
+        start=run_time,
         airflow_dag_run=run_id,
         config=config_id,
-        dataset=dataset_id
+        dataset=dataset_id,
+        execution_mode=execution_mode
     )
     db.add(execution)
     db.commit()
@@ -163,6 +171,11 @@ def process_db_config(config_dict: dict, db_config: dtm.DockerTrainConfig) -> di
     :param db_config: db_config object
     :return:
     """
+    resources = train_resources(db_config.cpu_requirements, db_config.gpu_requirements)
+    if resources:
+        config_dict["resources"] = resources
+    if db_config.execution_mode:
+        config_dict["execution_mode"] = db_config.execution_mode
 
     if db_config.airflow_config:
         db_config = dts.DockerTrainConfig.from_orm(db_config)
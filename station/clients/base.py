@@ -4,6 +4,8 @@ import pendulum
 import requests
 from pydantic import SecretStr
 
+from station.clients.instrumentation import InstrumentedSession, upstream_operation
+
 
 class BaseClient:
     def __init__(self,
@@ -14,6 +16,7 @@ class BaseClient:
                  robot_id: str = None,
                  robot_secret: str = None,
                  headers: dict = None,
+                 upstream: str = "station",
                  ):
         self.base_url = base_url
         self.auth_url = auth_url
@@ -25,6 +28,7 @@ class BaseClient:
         self.refresh_token = None
         self.token_expiration = None
         self._headers = headers
+        self.session = InstrumentedSession(upstream)
 
         if not self.auth_url:
             self.auth_url = f"{self.base_url}/auth/token"
@@ -42,14 +46,15 @@ class BaseClient:
     def setup(self):
         self._get_token()
 
+    @upstream_operation("token")
     def _get_token(self) -> str:
         if not self.token or self.token_expiration < pendulum.now():
             if self.username and self.password:
-                r = requests.post(self.auth_url, data={"username": self.username, "password": self.password})
+                r = self.session.post(self.auth_url, data={"username": self.username, "password": self.password})
             elif self.robot_id and self.robot_secret:
                 if isinstance(self.robot_secret, SecretStr):
                     self.robot_secret = self.robot_secret.get_secret_value()
-                r = requests.post(self.auth_url, data={"id": self.robot_id, "secret": self.robot_secret})
+                r = self.session.post(self.auth_url, data={"id": self.robot_id, "secret": self.robot_secret})
             else:
                 raise Exception("No credentials provided")
 
@@ -1,10 +1,10 @@
 from typing import Any
 import urllib.parse
 
-import requests
 import pendulum
 
 from station.clients.base import BaseClient
+from station.clients.instrumentation import upstream_operation
 
 
 class CentralApiClient(BaseClient):
@@ -15,34 +15,38 @@ class CentralApiClient(BaseClient):
             base_url=api_url,
             robot_id=robot_id,
             robot_secret=robot_secret,
-            auth_url=f"{api_url}/token"
+            auth_url=f"{api_url}/token",
+            upstream="central",
         )
 
         self.api_url = api_url
 
+    @upstream_operation("get_trains")
     def get_trains(self, station_id: Any) -> dict:
         url = self.api_url + "/train-stations?"
         filters = f"filter[station_id]={station_id}&include=train"
         safe_filters = self._make_url_safe(filters)
         url = url + safe_filters
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         response.raise_for_status()
         return response.json()
 
+    @upstream_operation("get_registry_credentials")
     def get_registry_credentials(self, station_id: Any) -> dict:
         url = self.api_url + f"/stations/{station_id}?"
         filters = "fields[station]=+secure_id,+registry_project_account_name,+registry_project_account_token,+public_key"
         safe_filters = self._make_url_safe(filters)
         url = url + safe_filters
-        r = requests.get(url, headers=self.headers)
+        r = self.session.get(url, headers=self.headers)
         r.raise_for_status()
         return r.json()
 
+    @upstream_operation("update_public_key")
     def update_public_key(self, station_id: Any, public_key: str) -> dict:
         url = self.api_url + f"/stations/{station_id}"
         payload = {
             "public_key": public_key
         }
-        r = requests.post(url, headers=self.headers, json=payload)
+        r = self.session.post(url, headers=self.headers, json=payload)
         r.raise_for_status()
         return r.json()
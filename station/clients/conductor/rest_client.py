@@ -1,9 +1,10 @@
 from typing import Any, Dict
 
-import requests
 from sqlalchemy.orm import Session
 import os
 
+from station.clients.instrumentation import InstrumentedSession, upstream_operation
+
 
 class ConductorRESTClient:
 
@@ -14,6 +15,9 @@ class ConductorRESTClient:
         assert self.conductor_url
         assert self.station_id
 
+        self.session = InstrumentedSession("conductor")
+
+    @upstream_operation("get_model_for_train")
     def get_model_for_train(self, train_id: Any, db: Session):
         """
         Obtain the model definition for the train given by the id from the conductor
@@ -24,7 +28,7 @@ class ConductorRESTClient:
         """
 
         url = self.conductor_url + f"/api/trains/{train_id}/model"
-        r = requests.get(url=url)
+        r = self.session.get(url=url)
         return r.json()
 
     def upload_model_parameters(self, train_id: Any):
@@ -33,15 +37,17 @@ class ConductorRESTClient:
     def get_aggregated_model(self, train_id: Any):
         pass
 
+    @upstream_operation("get_available_trains")
     def get_available_trains(self):
         url = self.conductor_url + f"/api/stations/{self.station_id}/trains"
-        r = requests.get(url)
+        r = self.session.get(url)
         r.raise_for_status()
         return r.json()
 
+    @upstream_operation("post_discovery_results")
     def post_discovery_results(self, train_id: Any, discovery_results: Dict):
         url = self.conductor_url + f"/api/trains/{train_id}/discovery"
-        r = requests.post(url, json=discovery_results)
+        r = self.session.post(url, json=discovery_results)
         print(r.request.body)
         r.raise_for_status()
         return r.json()
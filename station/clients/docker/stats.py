@@ -0,0 +1,215 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+import docker
+from loguru import logger
+
+# label attached to the containers executing trains, used to select the containers whose resources are tracked
+TRAIN_CONTAINER_LABEL = "pht.train"
+TRAIN_ID_LABEL = "pht.train.id"
+TRAIN_RUN_LABEL = "pht.train.run"
+
+
+class ContainerResourceUsage:
+    """
+    Resource usage of a single container computed incrementally from consecutive samples of the docker stats stream.
+    """
+
+    def __init__(self, container_id: str, name: str = None, train_id: str = None):
+        self.container_id = container_id
+        self.name = name
+        self.train_id = train_id
+        self.cpu_percent = 0.0
+        self.memory_usage = 0
+        self.memory_limit = 0
+        self.memory_percent = 0.0
+        self.block_read_rate = 0.0
+        self.block_write_rate = 0.0
+        self.net_rx_rate = 0.0
+        self.net_tx_rate = 0.0
+        self.updated_at: Optional[float] = None
+        self._previous: Optional[dict] = None
+
+    def update(self, stats: dict, timestamp: float = None):
+        """
+        Update the usage with the next sample of the stats stream.
+        Args:
+            stats: decoded stats sample as returned by the docker api
+            timestamp: time the sample was taken, defaults to now
+        """
+        timestamp = timestamp if timestamp is not None else time.time()
+        if stats.get("name"):
+            self.name = stats["name"].lstrip("/")
+
+        memory = stats.get("memory_stats") or {}
+        self.memory_usage = memory.get("usage", 0)
+        self.memory_limit = memory.get("limit", 0)
+        self.memory_percent = 100 * self.memory_usage / self.memory_limit if self.memory_limit else 0.0
+
+        counters = {
+            "cpu": stats.get("cpu_stats", {}).get("cpu_usage", {}).get("total_usage", 0),
+            "system_cpu": stats.get("cpu_stats", {}).get("system_cpu_usage", 0),
+            "block_read": _block_io_bytes(stats, "read"),
+            "block_write": _block_io_bytes(stats, "write"),
+            "net_rx": sum(n.get("rx_bytes", 0) for n in (stats.get("networks") or {}).values()),
+            "net_tx": sum(n.get("tx_bytes", 0) for n in (stats.get("networks") or {}).values()),
+            "timestamp": timestamp,
+        }
+        online_cpus = stats.get("cpu_stats", {}).get("online_cpus") or \
+            len(stats.get("cpu_stats", {}).get("cpu_usage", {}).get("percpu_usage") or []) or 1
+
+        previous = self._previous
+        if previous:
+            cpu_delta = counters["cpu"] - previous["cpu"]
+            system_delta = counters["system_cpu"] - previous["system_cpu"]
+            self.cpu_percent = 100 * online_cpus * cpu_delta / system_delta if system_delta > 0 else 0.0
+            elapsed = counters["timestamp"] - previous["timestamp"]
+            if elapsed > 0:
+                self.block_read_rate = max(counters["block_read"] - previous["block_read"], 0) / elapsed
+                self.block_write_rate = max(counters["block_write"] - previous["block_write"], 0) / elapsed
+                self.net_rx_rate = max(counters["net_rx"] - previous["net_rx"], 0) / elapsed
+                self.net_tx_rate = max(counters["net_tx"] - previous["net_tx"], 0) / elapsed
+        self._previous = counters
+        self.updated_at = timestamp
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.container_id,
+            "name": self.name,
+            "train_id": self.train_id,
+            "cpu_percent": self.cpu_percent,
+            "memory_usage": self.memory_usage,
+            "memory_limit": self.memory_limit,
+            "memory_percent": self.memory_percent,
+            "block_read_rate": self.block_read_rate,
+            "block_write_rate": self.block_write_rate,
+            "net_rx_rate": self.net_rx_rate,
+            "net_tx_rate": self.net_tx_rate,
+            "updated_at": self.updated_at,
+        }
+
+
+def _block_io_bytes(stats: dict, op: str) -> int:
+    entries = (stats.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []
+    return sum(entry.get("value", 0) for entry in entries if entry.get("op", "").lower() == op)
+
+
+class ContainerStatsCollector:
+    """
+    Keeps a streaming stats subscription for every running train container. Containers are tracked from the
+    docker start and die events, so snapshots of the resource usage are served without querying the docker daemon.
+    """
+
+    def __init__(self, label: str = TRAIN_CONTAINER_LABEL, base_url: str = "unix://var/run/docker.sock"):
+        self.label = label
+        self.base_url = base_url
+        self._client: Optional[docker.APIClient] = None
+        self._lock = threading.Lock()
+        self._usage: Dict[str, ContainerResourceUsage] = {}
+        self._streams: Dict[str, threading.Thread] = {}
+        self._events = None
+        self._event_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def client(self) -> docker.APIClient:
+        if self._client is None:
+            self._client = docker.APIClient(base_url=self.base_url)
+        return self._client
+
+    def start(self):
+        """
+        Subscribe to the stats of the running train containers and start listening for container events.
+        """
+        if self._event_thread and self._event_thread.is_alive():
+            return
+        self._stop_event.clear()
+        try:
+            # subscribe to the events before listing the containers to not miss containers started in between
+            self._events = self.client.events(
+                decode=True, filters={"type": "container", "event": ["start", "die"], "label": self.label}
+            )
+            for container in self.client.containers(filters={"label": self.label}):
+                self._subscribe(container["Id"], container.get("Labels"))
+        except docker.errors.DockerException as e:
+            logger.warning(f"Unable to connect to docker, container resource usage is not collected: {e}")
+            return
+        self._event_thread = threading.Thread(target=self._event_loop, name="container-events", daemon=True)
+        self._event_thread.start()
+        logger.info(f"Started container stats collector for containers labeled {self.label}")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._events is not None:
+            self._events.close()
+            self._events = None
+        with self._lock:
+            self._usage = {}
+            self._streams = {}
+
+    def snapshot(self) -> List[dict]:
+        """
+        Get the latest resource usage of all tracked containers.
+        """
+        with self._lock:
+            return [usage.to_dict() for usage in self._usage.values()]
+
+    def snapshot_container(self, container_id: str) -> Optional[dict]:
+        """
+        Get the latest resource usage of a single container by its (short) id or name.
+        """
+        with self._lock:
+            for usage in self._usage.values():
+                if usage.container_id.startswith(container_id) or usage.name == container_id:
+                    return usage.to_dict()
+        return None
+
+    def _event_loop(self):
+        try:
+            for event in self._events:
+                if self._stop_event.is_set():
+                    break
+                container_id = event.get("id")
+                if event.get("status") == "start":
+                    self._subscribe(container_id, event.get("Actor", {}).get("Attributes"))
+                elif event.get("status") == "die":
+                    self._unsubscribe(container_id)
+        except Exception as e:
+            if not self._stop_event.is_set():
+                logger.error(f"Container event stream closed unexpectedly: {e}")
+
+    def _subscribe(self, container_id: str, labels: dict = None):
+        with self._lock:
+            if container_id in self._streams:
+                return
+            labels = labels or {}
+            self._usage[container_id] = ContainerResourceUsage(container_id, train_id=labels.get(TRAIN_ID_LABEL))
+            thread = threading.Thread(target=self._stream_stats, args=(container_id,),
+                                      name=f"container-stats-{container_id[:12]}", daemon=True)
+            self._streams[container_id] = thread
+        thread.start()
+
+    def _unsubscribe(self, container_id: str):
+        with self._lock:
+            self._usage.pop(container_id, None)
+            self._streams.pop(container_id, None)
+
+    def _stream_stats(self, container_id: str):
+        try:
+            # the stream ends when the container stops
+            for stats in self.client.stats(container_id, stream=True, decode=True):
+                if self._stop_event.is_set():
+                    break
+                with self._lock:
+                    usage = self._usage.get(container_id)
+                    if usage is None:
+                        break
+                    usage.update(stats)
+        except docker.errors.DockerException as e:
+            logger.debug(f"Stats stream of container {container_id[:12]} closed: {e}")
+        finally:
+            self._unsubscribe(container_id)
+
+
+container_stats = ContainerStatsCollector()
@@ -5,6 +5,8 @@ import os
 from train_lib.clients.fhir import build_query_string
 from train_lib.clients.fhir.fhir_client import BearerAuth
 
+from station.clients.instrumentation import InstrumentedSession, upstream_operation
+
 
 class FhirClient:
     def __init__(self, server_url: str = None, username: str = None, password: str = None, token: str = None,
@@ -33,6 +35,9 @@ class FhirClient:
         if not self.server_url:
             raise ValueError("No FHIR server address available")
 
+        self.session = InstrumentedSession("fhir")
+
+    @upstream_operation("health_check")
     def health_check(self):
         api_url = self._generate_api_url() + "/metadata"
         auth = self._generate_auth()
@@ -42,7 +47,7 @@ class FhirClient:
                     "name": None}
         try:
             # TODO remove verify false only for thesting becouse of verificaion problems with the ibm fhir server
-            r = requests.get(api_url, auth=auth, verify=False)
+            r = self.session.get(api_url, auth=auth, verify=False)
             r.raise_for_status()
             r_json = r.json()
 
@@ -58,10 +63,11 @@ class FhirClient:
             pass
         return response
 
+    @upstream_operation("get_number_of_resource")
     def get_number_of_resource(self):
         api_url = self._generate_api_url() + "/Resource?_count=0"
         auth = self._generate_auth()
-        r = requests.get(api_url, auth=auth, verify=False).json()
+        r = self.session.get(api_url, auth=auth, verify=False).json()
         return r["total"]
 
     def _generate_url(self, query: dict = None, query_string: str = None, return_format="json", limit=1000):
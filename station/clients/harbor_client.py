@@ -1,12 +1,14 @@
 import requests
 import os
-from typing import Union, List
+import urllib.parse
+from typing import Union, List, Optional
 
 from dotenv import load_dotenv, find_dotenv
 
 from station.app.schemas.local_trains import LocalTrainMasterImageBase
 from station.app.schemas.station_status import HealthStatus
 from station.app.settings import settings
+from station.clients.instrumentation import InstrumentedSession, upstream_operation
 
 
 class HarborClient:
@@ -29,6 +31,9 @@ class HarborClient:
         self.password = password if password else os.getenv("HARBOR_PW")
         assert self.password
 
+        self.session = InstrumentedSession("harbor")
+
+    @upstream_operation("get_artifacts_for_station")
     def get_artifacts_for_station(self, station_id: Union[str, int] = None) -> List[dict]:
         # TODO chache no replys
         if not station_id:
@@ -36,7 +41,7 @@ class HarborClient:
         assert station_id
 
         endpoint = f"/projects/station_{station_id}/repositories/"
-        r = requests.get(self.api_url + endpoint, auth=(self.username, self.password))
+        r = self.session.get(self.api_url + endpoint, auth=(self.username, self.password))
         results = r.json()
         print(results)
 
@@ -47,7 +52,7 @@ class HarborClient:
                     print("Getting repositories on next page.")
                     url = r.links["next"]["url"]
                     new_endpoint = url[9:]
-                    r = requests.get(self.api_url + new_endpoint, auth=(self.username, self.password))
+                    r = self.session.get(self.api_url + new_endpoint, auth=(self.username, self.password))
                     new_results = r.json()
                     results.extend(new_results)
                 else:
@@ -59,12 +64,13 @@ class HarborClient:
 
         return results
 
+    @upstream_operation("get_master_images")
     def get_master_images(self) -> List[LocalTrainMasterImageBase]:
         """
         returns names of master images form harbor
         """
         endpoint = "/projects/master/repositories"
-        r = requests.get(self.api_url + endpoint, auth=(self.username, self.password))
+        r = self.session.get(self.api_url + endpoint, auth=(self.username, self.password))
         master_images = []
         for repo in r.json():
             project, group, artifact = repo["name"].split("/")
@@ -80,19 +86,39 @@ class HarborClient:
 
         return master_images
 
-    def health_check(self) -> HealthStatus:
+    @upstream_operation("get_artifact_digest")
+    def get_artifact_digest(self, project: str, repository: str, reference: str) -> Optional[str]:
+        """
+        Get the manifest digest of an artifact in the registry.
+        @param project: harbor project of the repository
+        @param repository: name of the repository inside the project
+        @param reference: tag or digest of the artifact
+        @return: the digest of the artifact or None if it does not exist
+        """
+        # harbor requires slashes in repository names to be encoded twice
+        repository = urllib.parse.quote(urllib.parse.quote(repository, safe=""), safe="")
+        url = self.api_url + f"/projects/{project}/repositories/{repository}/artifacts/{reference}"
+        r = self.session.get(url, auth=(self.username, self.password))
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        return r.json().get("digest")
+
+    @upstream_operation("health_check")
+    def health_check(self, timeout: float = None) -> HealthStatus:
         """
         requests the central service
+        @param timeout: optional timeout of the request in seconds
         @return: dict: status of central harbor instance
         """
         url = self.api_url + "/health"
         try:
-            r = requests.get(url=url, auth=(self.username, self.password))
+            r = self.session.get(url=url, auth=(self.username, self.password), timeout=timeout)
             if r and r.status_code == 200:
                 return HealthStatus.healthy
             else:
                 return HealthStatus.error
-        except requests.exceptions.ConnectionError as e:
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
             print(e)
         return HealthStatus.error
 
@@ -0,0 +1,357 @@
+"""
+Instrumentation of the calls the station makes to its upstream services (airflow, harbor, minio, central, auth, ...).
+
+Every call is recorded per upstream and operation in a latency histogram together with error counts and payload
+sizes. HTTP based clients use an :class:`InstrumentedSession` (or :class:`InstrumentedPoolManager` for minio), other
+clients can be wrapped with the :func:`instrumented` decorator. Additional consumers (e.g. an exporter) can subscribe
+to the recorded calls via :meth:`UpstreamMetrics.add_listener`.
+"""
+import asyncio
+import bisect
+import contextvars
+import functools
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+import urllib3
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+# upper bounds of the latency buckets in seconds
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# name of the operation currently executed by a client, set by the upstream_operation decorator
+_current_operation: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("upstream_operation",
+                                                                                     default=None)
+# calls recorded during the currently processed api request, set by track_upstream_calls
+_request_calls: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("upstream_request_calls",
+                                                                                  default=None)
+
+_ID_SEGMENT = re.compile(r"^([0-9]+|[0-9a-fA-F-]{32,36}|manual__.*|scheduled__.*|.{40,})$")
+
+
+class UpstreamCall:
+    """
+    A single call to an upstream service.
+    """
+    __slots__ = ("upstream", "operation", "duration", "status_code", "error", "request_size", "response_size")
+
+    def __init__(self, upstream: str, operation: str, duration: float, status_code: int = None, error: bool = False,
+                 request_size: int = 0, response_size: int = 0):
+        self.upstream = upstream
+        self.operation = operation
+        self.duration = duration
+        self.status_code = status_code
+        self.error = error
+        self.request_size = request_size
+        self.response_size = response_size
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(upstream={self.upstream}, operation={self.operation}, " \
+               f"duration={self.duration:.4f}, status_code={self.status_code}, error={self.error})"
+
+
+class LatencyHistogram:
+    """
+    Fixed bucket histogram of call latencies.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = buckets
+        # the last bucket counts all values larger than the largest bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile as the upper bound of the bucket containing it.
+        Args:
+            q: quantile between 0 and 1
+
+        Returns:
+            the estimated quantile or None if no values have been observed
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+
+class UpstreamOperationStats:
+    """
+    Aggregated statistics of the calls to one operation of an upstream service.
+    """
+
+    def __init__(self, upstream: str, operation: str):
+        self.upstream = upstream
+        self.operation = operation
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.last_status_code = None
+
+    def add(self, call: UpstreamCall):
+        self.latency.observe(call.duration)
+        if call.error:
+            self.errors += 1
+        self.request_bytes += call.request_size
+        self.response_bytes += call.response_size
+        self.last_status_code = call.status_code
+
+    def to_dict(self) -> dict:
+        return {
+            "upstream": self.upstream,
+            "operation": self.operation,
+            "count": self.latency.count,
+            "errors": self.errors,
+            "latency_mean": self.latency.mean,
+            "latency_p50": self.latency.quantile(0.5),
+            "latency_p95": self.latency.quantile(0.95),
+            "latency_max": self.latency.max,
+            "latency_buckets": dict(zip([str(b) for b in self.latency.buckets] + ["+Inf"], self.latency.counts)),
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "last_status_code": self.last_status_code,
+        }
+
+
+class UpstreamMetrics:
+    """
+    Thread safe registry of the calls made to upstream services.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], UpstreamOperationStats] = {}
+        self._listeners: List[Callable[[UpstreamCall], None]] = []
+
+    def record(self, call: UpstreamCall):
+        with self._lock:
+            key = (call.upstream, call.operation)
+            stats = self._stats.get(key)
+            if not stats:
+                stats = UpstreamOperationStats(call.upstream, call.operation)
+                self._stats[key] = stats
+            stats.add(call)
+
+        request_calls = _request_calls.get()
+        if request_calls is not None:
+            request_calls.append(call)
+
+        for listener in self._listeners:
+            try:
+                listener(call)
+            except Exception as e:
+                logger.error(f"Error in upstream metrics listener {listener}: {e}")
+
+    def add_listener(self, listener: Callable[[UpstreamCall], None]):
+        """
+        Register a callable that is called with every recorded call.
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def snapshot(self, upstream: str = None) -> List[dict]:
+        with self._lock:
+            stats = [s.to_dict() for s in self._stats.values() if not upstream or s.upstream == upstream]
+        return sorted(stats, key=lambda s: (s["upstream"], s["operation"]))
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+
+upstream_metrics = UpstreamMetrics()
+
+
+def upstream_operation(name: str):
+    """
+    Decorator naming the upstream operation performed by a client method. Calls made by instrumented sessions during
+    the execution of the method are recorded under this name.
+    """
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                token = _current_operation.set(name)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _current_operation.reset(token)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _current_operation.set(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _current_operation.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
+def instrumented(upstream: str, operation: str = None):
+    """
+    Decorator recording the latency and errors of a client method that does not use an instrumented session, e.g.
+    calls to the docker daemon.
+    """
+
+    def decorator(func):
+        op_name = operation if operation else func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            error = False
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                upstream_metrics.record(UpstreamCall(upstream, op_name, time.perf_counter() - start, error=error))
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def track_upstream_calls():
+    """
+    Collect all upstream calls made in the current context, used to attribute the time spent waiting on upstream
+    services to the api request causing them.
+    """
+    calls = []
+    token = _request_calls.set(calls)
+    try:
+        yield calls
+    finally:
+        _request_calls.reset(token)
+
+
+def summarize_calls(calls: List[UpstreamCall]) -> Dict[str, dict]:
+    """
+    Aggregate the given calls per upstream service.
+    """
+    summary = {}
+    for call in calls:
+        upstream = summary.setdefault(call.upstream, {"calls": 0, "errors": 0, "duration": 0.0, "bytes": 0})
+        upstream["calls"] += 1
+        upstream["errors"] += int(call.error)
+        upstream["duration"] += call.duration
+        upstream["bytes"] += call.response_size
+    return summary
+
+
+def operation_from_url(method: str, url: str) -> str:
+    """
+    Derive an operation name from the request method and url, replacing identifiers in the path with placeholders to
+    keep the number of distinct operations bounded.
+    """
+    path = urllib3.util.parse_url(url).path or "/"
+    segments = ["{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.strip("/").split("/")]
+    return f"{method.upper()} /{'/'.join(segments)}"
+
+
+def _body_size(body) -> int:
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    return 0
+
+
+class InstrumentedSession(requests.Session):
+    """
+    Requests session recording every request made through it as a call to the given upstream service. Connections
+    are pooled across requests.
+    """
+
+    def __init__(self, upstream: str, pool_maxsize: int = 10):
+        super().__init__()
+        self.upstream = upstream
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        operation = _current_operation.get() or operation_from_url(method, url)
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            upstream_metrics.record(UpstreamCall(self.upstream, operation, time.perf_counter() - start, error=True))
+            raise
+
+        # do not consume streamed responses to determine their size
+        if kwargs.get("stream"):
+            response_size = int(response.headers.get("Content-Length", 0))
+        else:
+            response_size = len(response.content)
+        call = UpstreamCall(
+            upstream=self.upstream,
+            operation=operation,
+            duration=time.perf_counter() - start,
+            status_code=response.status_code,
+            error=response.status_code >= 400,
+            request_size=_body_size(response.request.body),
+            response_size=response_size,
+        )
+        upstream_metrics.record(call)
+        return response
+
+
+class InstrumentedPoolManager(urllib3.PoolManager):
+    """
+    urllib3 pool manager recording the requests made through it, used for clients built on urllib3 such as minio.
+    """
+
+    def __init__(self, upstream: str, **kwargs):
+        super().__init__(**kwargs)
+        self.upstream = upstream
+
+    def urlopen(self, method, url, redirect=True, **kw):
+        operation = _current_operation.get() or operation_from_url(method, url)
+        start = time.perf_counter()
+        try:
+            response = super().urlopen(method, url, redirect=redirect, **kw)
+        except urllib3.exceptions.HTTPError:
+            upstream_metrics.record(UpstreamCall(self.upstream, operation, time.perf_counter() - start, error=True))
+            raise
+        call = UpstreamCall(
+            upstream=self.upstream,
+            operation=operation,
+            duration=time.perf_counter() - start,
+            status_code=response.status,
+            error=response.status >= 400,
+            request_size=_body_size(kw.get("body")),
+            response_size=int(response.headers.get("Content-Length", 0) or 0),
+        )
+        upstream_metrics.record(call)
+        return response
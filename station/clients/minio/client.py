@@ -8,10 +8,11 @@ from zipfile import ZipFile
 
 import pendulum
 import starlette
+import urllib3
 from minio import Minio
 from minio.error import S3Error
 from fastapi import File, UploadFile
-from typing import List, Union, Dict
+from typing import Iterator, List, Union, Dict
 from loguru import logger
 from pydantic import SecretStr
 
@@ -19,6 +20,10 @@ from station.app.settings import settings
 from station.app.schemas.datasets import MinioFile
 from station.app.schemas.station_status import HealthStatus
 from station.ctl.constants import DataDirectories
+from station.clients.instrumentation import InstrumentedPoolManager, upstream_operation
+
+# size of the chunks read from minio when streaming archives
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
 
 
 class MinioClient:
@@ -51,14 +56,38 @@ class MinioClient:
         assert self.access_key
         assert self.secret_key
 
-        # Initialize minio client
+        # Initialize minio client, requests are recorded by the instrumented pool manager
+        http_client = InstrumentedPoolManager(
+            "minio",
+            timeout=urllib3.Timeout(connect=30, read=300),
+            maxsize=10,
+            retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+        )
         self.client = Minio(
             self.minio_server,
             access_key=self.access_key,
             secret_key=self.secret_key,
-            secure=False
+            secure=False,
+            http_client=http_client,
         )
 
+    def _health_check_client(self, timeout: float) -> Minio:
+        # separate client without retries, a hanging server must not block the health check for minutes
+        http_client = InstrumentedPoolManager(
+            "minio",
+            timeout=urllib3.Timeout(connect=timeout, read=timeout),
+            maxsize=1,
+            retries=False,
+        )
+        return Minio(
+            self.minio_server,
+            access_key=self.access_key,
+            secret_key=self.secret_key,
+            secure=False,
+            http_client=http_client,
+        )
+
+    @upstream_operation("store_model_file")
     async def store_model_file(self, id: str, model_file: Union[File, UploadFile]):
         model_data = await model_file.read()
         file = BytesIO(model_data)
@@ -69,6 +98,7 @@ class MinioClient:
             length=len(file.getbuffer()))
         return res
 
+    @upstream_operation("get_model_file")
     def get_model_file(self, model_id: str) -> bytes:
         try:
             response = self.client.get_object(bucket_name=DataDirectories.MODELS.value, object_name=model_id)
@@ -79,6 +109,7 @@ class MinioClient:
 
         return data
 
+    @upstream_operation("store_files")
     async def store_files(self, bucket: str, name: str, file: Union[File, UploadFile]):
         """
         store files into minio
@@ -103,6 +134,7 @@ class MinioClient:
         res = self.client.put_object(bucket, object_name=name, data=file, length=len(file.getbuffer()))
         return res
 
+    @upstream_operation("save_dataset_files")
     async def save_dataset_files(self, dataset_id: str, files: List[Union[File, UploadFile]]):
         """
         store files into minio
@@ -125,6 +157,7 @@ class MinioClient:
 
         return resp
 
+    @upstream_operation("save_local_train_files")
     async def save_local_train_files(self, train_id: str, files: List[Union[File, UploadFile]]) -> List[MinioFile]:
         """
         store files of local train in minio
@@ -151,14 +184,16 @@ class MinioClient:
             )
         return resp
 
-    def get_local_train_archive(self, train_id: str):
-        print(DataDirectories.LOCAL_TRAINS.value)
+    @upstream_operation("get_local_train_archive")
+    def get_local_train_archive(self, train_id: str) -> Iterator[bytes]:
+        """
+        Tar archive of the files of a local train, the archive is generated while the files are read from minio.
+        Only listing the files is recorded under this operation, the files are requested once the archive is consumed.
+        """
         items = self.get_minio_dir_items(bucket=DataDirectories.LOCAL_TRAINS.value, directory=train_id)
+        return self.iter_download_archive(DataDirectories.LOCAL_TRAINS.value, items=items)
 
-        archive = self.make_download_archive(DataDirectories.LOCAL_TRAINS.value, items=items)
-
-        return archive
-
+    @upstream_operation("get_file")
     def get_file(self, bucket: str, name: str) -> bytes:
         response = self.client.get_object(bucket_name=bucket, object_name=name)
         data = response.read()
@@ -167,32 +202,44 @@ class MinioClient:
 
         return data
 
+    @upstream_operation("put_file")
+    def put_file(self, bucket: str, name: str, data: bytes, content_type: str = "application/octet-stream"):
+        return self.client.put_object(bucket, object_name=name, data=BytesIO(data), length=len(data),
+                                      content_type=content_type)
+
+    @upstream_operation("delete_file")
     def delete_file(self, bucket: str, name: str):
         self.client.remove_object(bucket_name=bucket, object_name=name)
 
+    @upstream_operation("delete_folder")
     def delete_folder(self, bucket: str, directory: str):
         delete_objects = self.client.list_objects(bucket_name=bucket, prefix=directory, recursive=True)
         for obj in delete_objects:
             self.client.remove_object(bucket_name=bucket, object_name=obj.object_name)
 
+    @upstream_operation("get_file_names")
     def get_file_names(self, bucket: str, prefix: str = "") -> [str]:
         response = self.client.list_objects(bucket, prefix=prefix)
         data = list(response)
         return data
 
+    @upstream_operation("add_bucket")
     def add_bucket(self, bucket_name: str):
         found = self.client.bucket_exists(bucket_name)
         if not found:
             self.client.make_bucket(bucket_name)
 
+    @upstream_operation("list_data_sets")
     def list_data_sets(self):
         data_sets = self.client.list_objects("datasets")
         return [ds.object_name for ds in list(data_sets)]
 
+    @upstream_operation("list_buckets")
     def list_buckets(self):
         buckets = self.client.list_buckets()
         return buckets
 
+    @upstream_operation("list_elements_in_bucket")
     def list_elements_in_bucket(self, bucket):
         elements = self.client.list_objects(bucket)
         return [ds.object_name for ds in list(elements)]
@@ -200,6 +247,7 @@ class MinioClient:
     def load_data_set(self):
         pass
 
+    @upstream_operation("get_minio_dir_items")
     def get_minio_dir_items(self, bucket: Union[str, DataDirectories], directory: str) -> List[MinioFile]:
         """
         Get all objects in the data set specified by data_set_id and return them as a generator
@@ -230,6 +278,7 @@ class MinioClient:
             print(e)
             return []
 
+    @upstream_operation("make_dataset_archive")
     def make_dataset_archive(self,
                              data_set_id: str,
                              items: List[MinioFile] = None,
@@ -251,6 +300,49 @@ class MinioClient:
 
         return archive
 
+    def iter_download_archive(self, bucket: str, items: List[MinioFile],
+                              chunk_size: int = ARCHIVE_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Generate a tar archive of the given objects chunk by chunk. Each object is streamed from minio into the
+        archive, so only a single chunk is held in memory at a time.
+        Args:
+            bucket: bucket of the objects
+            items: objects to include in the archive, their size has to be known
+            chunk_size: size of the chunks read from minio
+
+        Returns:
+            iterator over the chunks of the archive
+        """
+        mtime = int(time.time())
+        for item in items:
+            info = tarfile.TarInfo(name=item.full_path)
+            info.size = item.size or 0
+            info.mtime = mtime
+            yield info.tobuf(format=tarfile.DEFAULT_FORMAT)
+
+            response = self._get_archive_object(bucket, item.full_path)
+            written = 0
+            try:
+                for chunk in response.stream(chunk_size):
+                    written += len(chunk)
+                    yield chunk
+            finally:
+                response.close()
+                response.release_conn()
+            if written != info.size:
+                raise ValueError(f"Size of {item.full_path} changed while creating the archive")
+            # the content of each member is padded to a multiple of the block size
+            remainder = written % tarfile.BLOCKSIZE
+            if remainder:
+                yield tarfile.NUL * (tarfile.BLOCKSIZE - remainder)
+        # end of archive marker
+        yield tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+
+    @upstream_operation("get_archive_object")
+    def _get_archive_object(self, bucket: str, name: str):
+        # the archive is generated lazily, so each object request is instrumented on its own
+        return self.client.get_object(bucket_name=bucket, object_name=name)
+
     def make_download_archive(self, bucket: str, items: List[MinioFile], archive_type: str = "tar") -> BytesIO:
         archive = BytesIO()
 
@@ -275,6 +367,7 @@ class MinioClient:
 
         raise ValueError(f"Unknown archive type {archive_type}")
 
+    @upstream_operation("get_classes_by_folders")
     def get_classes_by_folders(self, data_set_id: str) -> List[str]:
         """
         Gets the subdirectories of a dataset directory in minio. The folder names correspond the classes defined for
@@ -290,6 +383,7 @@ class MinioClient:
             classes.append(folder.object_name.split("/")[-2])
         return classes
 
+    @upstream_operation("get_class_distributions")
     def get_class_distributions(self, data_set_id: str, classes: List[str]) -> List[Dict[str, Union[int, str]]]:
 
         class_distribution = []
@@ -305,18 +399,23 @@ class MinioClient:
 
         return class_distribution
 
-    def health_check(self) -> HealthStatus:
+    @upstream_operation("health_check")
+    def health_check(self, timeout: float = None) -> HealthStatus:
         """
         Get health of minio
+        Args:
+            timeout: connect and read timeout of the request in seconds, the request is not retried
         """
         try:
-            self.client.list_buckets()
+            client = self._health_check_client(timeout) if timeout else self.client
+            client.list_buckets()
 
             return HealthStatus.healthy
         except Exception as e:
             logger.error(f"Error while checking minio health: {e}")
             return HealthStatus.error
 
+    @upstream_operation("setup_buckets")
     def setup_buckets(self):
         for d in DataDirectories:
             try:
@@ -32,7 +32,7 @@ class ResourceClient(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
         if isinstance(data, dict):
             data = self.model(**data)
-        response = requests.post(
+        response = self._client.session.post(
             f"{self.base_url}/{self.resource_name}",
             json=data.dict(),
             headers=self._client.headers
@@ -45,23 +45,25 @@ class ResourceClient(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return self.model(**response.json())
 
     def get(self, resource_id) -> ModelType:
-        response = requests.get(f"{self.base_url}/{self.resource_name}/{resource_id}", headers=self._client.headers)
+        response = self._client.session.get(f"{self.base_url}/{self.resource_name}/{resource_id}",
+                                            headers=self._client.headers)
         response.raise_for_status()
         return self.model(**response.json())
 
     def get_multi(self, skip: int = 0, limit: int = 100) -> List[ModelType]:
-        response = requests.get(f"{self.base_url}/{self.resource_name}",
-                                params={"skip": skip, "limit": limit}, headers=self._client.headers)
+        response = self._client.session.get(f"{self.base_url}/{self.resource_name}",
+                                            params={"skip": skip, "limit": limit}, headers=self._client.headers)
         response.raise_for_status()
         return [self.model(**item) for item in response.json()]
 
     def update(self, resource_id: Any, data: UpdateSchemaType) -> ModelType:
-        response = requests.put(f"{self.base_url}/{self.resource_name}/{resource_id}", json=data,
-                                headers=self._client.headers)
+        response = self._client.session.put(f"{self.base_url}/{self.resource_name}/{resource_id}", json=data,
+                                            headers=self._client.headers)
         response.raise_for_status()
         return self.model(**response.json())
 
     def delete(self, resource_id) -> ModelType:
-        response = requests.delete(f"{self.base_url}/{self.resource_name}/{resource_id}", headers=self._client.headers)
+        response = self._client.session.delete(f"{self.base_url}/{self.resource_name}/{resource_id}",
+                                               headers=self._client.headers)
         response.raise_for_status()
         return self.model(**response.json())
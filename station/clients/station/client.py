@@ -10,8 +10,12 @@ from station.app.schemas.trains import Train
 from station.app.schemas.datasets import DataSet
 from station.clients.base import BaseClient
 from station.clients.resource_client import ResourceClient
+from station.clients.instrumentation import upstream_operation
 from station.clients.station.local_trains import LocalTrainClient
 
+# seconds to wait for the station api when pushing a task event, events are pushed before and after every dag task
+TASK_EVENT_TIMEOUT = 5
+
 
 class StationAPIClient(BaseClient):
     local_trains: LocalTrainClient
@@ -37,6 +41,21 @@ class StationAPIClient(BaseClient):
         self.datasets = ResourceClient(base_url, "datasets", DataSet, client=self)
         self.trains = ResourceClient(base_url, "trains/docker", Train, client=self)
 
+    @upstream_operation("post_task_event")
+    def post_task_event(self, event: dict, timeout: float = TASK_EVENT_TIMEOUT) -> dict:
+        """
+        Push a task or run event of a train DAG to the station api.
+        Args:
+            event: event as defined by the TaskEventCreate schema
+            timeout: connect and read timeout of the request in seconds
+
+        Returns:
+            the stored event
+        """
+        r = self.session.post(f"{self.base_url}/airflow/events", headers=self.headers, json=event, timeout=timeout)
+        r.raise_for_status()
+        return r.json()
+
     @classmethod
     def from_env(cls):
 
@@ -1,24 +1,40 @@
-from io import BytesIO
-import tarfile
+import tempfile
+from typing import BinaryIO
 
 import requests
 
 from station.clients.resource_client import ResourceClient
+from station.clients.instrumentation import upstream_operation
 from station.app.schemas.local_trains import LocalTrain, LocalTrainCreate, LocalTrainUpdate
 
 
+# archives of local trains are kept in memory up to this size and spooled to disk above it
+ARCHIVE_SPOOL_SIZE = 32 * 1024 * 1024
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+
 class LocalTrainClient(ResourceClient[LocalTrain, LocalTrainCreate, LocalTrainUpdate]):
 
-    def download_train_archive(self, train_id: str) -> BytesIO:
+    @upstream_operation("download_train_archive")
+    def download_train_archive(self, train_id: str) -> BinaryIO:
+        """
+        Download the tar archive of the files of a local train. Large archives are written to a temporary file
+        instead of being held in memory, the returned file should be closed after use.
+        """
         url = f"{self.base_url}/{self.resource_name}/{train_id}/archive"
-        with requests.get(url, headers=self._client.headers, stream=True) as r:
-            r.raise_for_status()
-            file_obj = BytesIO()
-            for chunk in r.iter_content():
-                file_obj.write(chunk)
-            file_obj.seek(0)
+        file_obj = tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE)
+        try:
+            with self._client.session.get(url, headers=self._client.headers, stream=True) as r:
+                r.raise_for_status()
+                for chunk in r.iter_content(chunk_size=ARCHIVE_CHUNK_SIZE):
+                    file_obj.write(chunk)
+        except Exception:
+            file_obj.close()
+            raise
+        file_obj.seek(0)
         return file_obj
 
+    @upstream_operation("post_failure_notification")
     def post_failure_notification(
             self,
             train_id: str,
@@ -31,15 +47,16 @@ class LocalTrainClient(ResourceClient[LocalTrain, LocalTrainCreate, LocalTrainUp
             "topic": "local-trains",
             "title": f"Local Train {train_id} failed"
         }
-        with requests.post(url, headers=self._client.headers, json=payload) as r:
+        with self._client.session.post(url, headers=self._client.headers, json=payload) as r:
             r.raise_for_status()
 
+    @upstream_operation("update_train_status")
     def update_train_status(self, train_id: str, status: str):
         url = f"{self.base_url}/{self.resource_name}/{train_id}"
         payload = {
             "status": status
         }
-        with requests.put(url, headers=self._client.headers, json=payload) as r:
+        with self._client.session.put(url, headers=self._client.headers, json=payload) as r:
             try:
                 r.raise_for_status()
             except requests.exceptions.HTTPError as e:
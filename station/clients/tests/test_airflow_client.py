@@ -0,0 +1,59 @@
+import json
+
+import requests
+
+from station.clients.airflow.client import AirflowClient, TaskLogTail
+
+
+def _response(status_code: int, body: dict) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode()
+    return response
+
+
+def test_tail_task_log(monkeypatch):
+    client = AirflowClient("http://airflow/api/v1/", "admin", "admin")
+    requested = []
+    log_chunks = {None: ("first line\n", "token-1"), "token-1": ("second line\n", "token-2")}
+
+    def get(url, params=None, **kwargs):
+        requested.append(url)
+        if url.endswith("taskInstances/execute_container"):
+            return _response(200, {"task_id": "execute_container", "try_number": 2, "state": "running"})
+        assert url.endswith("taskInstances/execute_container/logs/2")
+        assert params["full_content"] == "false"
+        content, token = log_chunks[params.get("token")]
+        return _response(200, {"content": content, "continuation_token": token})
+
+    monkeypatch.setattr(client.session, "get", get)
+
+    tail = TaskLogTail(client, "run_pht_train", "manual__1", "execute_container")
+    assert tail.read() == "first line\n"
+    assert tail.read() == "second line\n"
+    assert tail.continuation_token == "token-2"
+    assert not tail.finished
+
+    # the task instance is looked up once and cached between polls
+    assert len([url for url in requested if "/logs/" not in url]) == 1
+
+
+def test_list_dag_runs_bounded_by_execution_date(monkeypatch):
+    from datetime import datetime, timezone
+
+    client = AirflowClient("http://airflow/api/v1/", "admin", "admin")
+    bodies = []
+
+    def post(url, json=None, **kwargs):
+        bodies.append(json)
+        return _response(200, {"dag_runs": [{"dag_id": "run_pht_train", "dag_run_id": "manual__1"}],
+                               "total_entries": 1})
+
+    monkeypatch.setattr(client.session, "post", post)
+
+    since = datetime(2022, 1, 1, 10, 0, tzinfo=timezone.utc)
+    runs = client.list_dag_runs(["run_pht_train"], run_ids=["manual__1", "manual__2"], execution_date_gte=since)
+
+    assert [run["dag_run_id"] for run in runs] == ["manual__1"]
+    assert len(bodies) == 1
+    assert datetime.fromisoformat(bodies[0]["execution_date_gte"]) == since
@@ -0,0 +1,32 @@
+import pytest
+
+from station.clients.docker.stats import ContainerResourceUsage
+
+
+def _sample(cpu, system_cpu, read, rx):
+    return {
+        "name": "/train",
+        "cpu_stats": {"cpu_usage": {"total_usage": cpu}, "system_cpu_usage": system_cpu, "online_cpus": 2},
+        "memory_stats": {"usage": 256, "limit": 1024},
+        "blkio_stats": {"io_service_bytes_recursive": [{"op": "Read", "value": read}, {"op": "Write", "value": 0}]},
+        "networks": {"eth0": {"rx_bytes": rx, "tx_bytes": 0}},
+    }
+
+
+def test_container_resource_usage_is_computed_incrementally():
+    usage = ContainerResourceUsage("abc", train_id="train-1")
+    usage.update(_sample(cpu=100, system_cpu=1000, read=0, rx=0), timestamp=10.0)
+
+    # no rates are available from a single sample
+    assert usage.cpu_percent == 0.0
+    assert usage.memory_percent == 25.0
+    assert usage.name == "train"
+
+    usage.update(_sample(cpu=300, system_cpu=2000, read=4096, rx=100), timestamp=12.0)
+    assert usage.cpu_percent == pytest.approx(40.0)
+    assert usage.block_read_rate == pytest.approx(2048)
+    assert usage.net_rx_rate == pytest.approx(50)
+
+    stats = usage.to_dict()
+    assert stats["id"] == "abc"
+    assert stats["train_id"] == "train-1"
@@ -0,0 +1,60 @@
+import pytest
+
+from station.clients.instrumentation import LatencyHistogram, UpstreamMetrics, UpstreamCall, instrumented, \
+    upstream_metrics, track_upstream_calls, summarize_calls, operation_from_url
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram(buckets=(0.1, 1.0))
+    assert histogram.quantile(0.5) is None
+
+    for value in [0.05, 0.05, 0.5, 5.0]:
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(1.0) == 5.0
+    assert histogram.mean == pytest.approx(1.4)
+
+
+def test_upstream_metrics():
+    metrics = UpstreamMetrics()
+    received = []
+    metrics.add_listener(received.append)
+
+    metrics.record(UpstreamCall("airflow", "trigger_dag", 0.2, status_code=200, response_size=10))
+    metrics.record(UpstreamCall("airflow", "trigger_dag", 0.4, status_code=500, error=True))
+    metrics.record(UpstreamCall("harbor", "health_check", 0.1, status_code=200))
+
+    assert len(received) == 3
+    snapshot = metrics.snapshot()
+    assert [(s["upstream"], s["operation"]) for s in snapshot] == [("airflow", "trigger_dag"),
+                                                                    ("harbor", "health_check")]
+    assert snapshot[0]["count"] == 2
+    assert snapshot[0]["errors"] == 1
+    assert snapshot[0]["response_bytes"] == 10
+    assert len(metrics.snapshot("harbor")) == 1
+
+
+def test_instrumented_and_request_tracking():
+    @instrumented("docker", "failing")
+    def failing():
+        raise ValueError("failed")
+
+    with track_upstream_calls() as calls:
+        with pytest.raises(ValueError):
+            failing()
+
+    assert len(calls) == 1
+    summary = summarize_calls(calls)
+    assert summary["docker"]["calls"] == 1
+    assert summary["docker"]["errors"] == 1
+    assert any(s["operation"] == "failing" for s in upstream_metrics.snapshot("docker"))
+
+
+def test_operation_from_url():
+    assert operation_from_url("get", "http://airflow:8080/api/v1/dags/run_pht_train/dagRuns/manual__2021-11-09") == \
+           "GET /api/v1/dags/run_pht_train/dagRuns/{id}"
+    assert operation_from_url("delete", "http://station/api/trains/docker/12?limit=1") == \
+           "DELETE /api/trains/docker/{id}"
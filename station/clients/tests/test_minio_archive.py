@@ -0,0 +1,54 @@
+import io
+import tarfile
+
+from station.app.schemas.datasets import MinioFile
+from station.clients.instrumentation import _current_operation
+from station.clients.minio.client import MinioClient
+
+
+class FakeResponse:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.closed = False
+
+    def stream(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i:i + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+    def release_conn(self):
+        pass
+
+
+class FakeMinio:
+    def __init__(self, objects: dict):
+        self.objects = objects
+        self.responses = []
+        self.operations = []
+
+    def get_object(self, bucket_name, object_name):
+        self.operations.append(_current_operation.get())
+        response = FakeResponse(self.objects[object_name])
+        self.responses.append(response)
+        return response
+
+
+def test_iter_download_archive():
+    objects = {"train/entrypoint.py": b"print('hello')\n" * 100, "train/data.csv": b"a,b\n1,2\n"}
+    client = MinioClient("minio:9000", "minio_admin", "minio_password")
+    client.client = FakeMinio(objects)
+    items = [MinioFile(file_name=name.split("/")[-1], full_path=name, size=len(data))
+             for name, data in objects.items()]
+
+    chunks = list(client.iter_download_archive("local-trains", items, chunk_size=64))
+    # objects are streamed in chunks instead of being read completely
+    assert max(len(chunk) for chunk in chunks) <= 1024
+    assert all(response.closed for response in client.client.responses)
+    assert client.client.operations == ["get_archive_object", "get_archive_object"]
+
+    with tarfile.open(fileobj=io.BytesIO(b"".join(chunks))) as tar:
+        assert sorted(tar.getnames()) == sorted(objects)
+        for name, data in objects.items():
+            assert tar.extractfile(name).read() == data
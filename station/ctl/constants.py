@@ -58,6 +58,7 @@ class DataDirectories(str, Enum):
     TRAINS = "trains"
     DATASETS = "datasets"
     LOCAL_TRAINS = "localtrains"
+    LOGS = "logs"
 
 
 class ServiceDirectories(Enum):
@@ -0,0 +1,87 @@
+"""
+Airflow callbacks pushing the start, finish and timing of the tasks of the train DAGs to the station api, so that the
+progress of a run is served from the station database instead of polling airflow.
+"""
+from typing import Optional
+
+from station.trains.context import cleanup_train_state
+from station.trains.services import station_api_client
+
+
+def _train_id(dag_run) -> Optional[str]:
+    conf = dag_run.conf or {}
+    if conf.get("train_id"):
+        return str(conf["train_id"])
+    # docker trains are identified by the repository of the train image
+    if conf.get("repository"):
+        return conf["repository"].split("/")[-1]
+    return None
+
+
+def _isoformat(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _post_event(event: dict):
+    # a failing notification must never fail the task or run itself
+    try:
+        station_api_client().post_task_event(event)
+    except Exception as e:
+        print(f"Unable to post {event['event']} event for run {event['run_id']}: {e}")
+
+
+def _task_event(context, event: str) -> dict:
+    task_instance = context["task_instance"]
+    dag_run = context["dag_run"]
+    return {
+        "dag_id": dag_run.dag_id,
+        "run_id": dag_run.run_id,
+        "train_id": _train_id(dag_run),
+        "task_id": task_instance.task_id,
+        "try_number": task_instance.try_number,
+        "event": event,
+        "start": _isoformat(task_instance.start_date),
+        "end": _isoformat(task_instance.end_date) if event != "started" else None,
+        "duration": task_instance.duration if event != "started" else None,
+        "message": str(context.get("exception")) if context.get("exception") else None,
+    }
+
+
+def task_started(context):
+    _post_event(_task_event(context, "started"))
+
+
+def task_succeeded(context):
+    _post_event(_task_event(context, "success"))
+
+
+def task_failed(context):
+    _post_event(_task_event(context, "failed"))
+
+
+def task_retry(context):
+    _post_event(_task_event(context, "retry"))
+
+
+def _run_event(context, event: str) -> dict:
+    dag_run = context["dag_run"]
+    return {
+        "dag_id": dag_run.dag_id,
+        "run_id": dag_run.run_id,
+        "train_id": _train_id(dag_run),
+        "event": event,
+        "start": _isoformat(dag_run.start_date),
+        "end": _isoformat(dag_run.end_date),
+        "message": context.get("reason"),
+    }
+
+
+def run_succeeded(context):
+    _post_event(_run_event(context, "run_success"))
+    cleanup_train_state(context["dag_run"], succeeded=True)
+
+
+def run_failed(context):
+    _post_event(_run_event(context, "run_failed"))
+    cleanup_train_state(context["dag_run"], succeeded=False)
+
@@ -0,0 +1,119 @@
+"""
+Train run contexts hold the state shared between the tasks of a train DAG run. The state is stored once in the
+station database and only the id of the context is passed between the tasks via XCom, instead of serializing the
+whole state (config, query, environment and volumes) into the airflow metadata database at every task. The context
+of a successful run is deleted when the run finishes, contexts of failed runs are kept for a retention period so
+their tasks can be cleared and executed again.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from loguru import logger
+
+from sqlalchemy.orm import Session
+
+from station.app.models.train_context import TrainRunContext
+from station.trains.services import station_session
+
+# days for which the contexts of runs that did not succeed are kept
+CONTEXT_RETENTION_DAYS = int(os.getenv("TRAIN_CONTEXT_RETENTION_DAYS", 7))
+
+
+def create_context(db: Session, dag_id: str, run_id: str, state: dict, train_id: str = None) -> str:
+    """
+    Persist the initial state of a dag run.
+    Args:
+        db: database session
+        dag_id: id of the dag
+        run_id: airflow id of the run
+        state: initial state of the run
+        train_id: id of the train executed in the run
+
+    Returns:
+        id of the created context
+    """
+    context = TrainRunContext(dag_id=dag_id, run_id=run_id, train_id=train_id, state=state)
+    db.add(context)
+    db.commit()
+    return context.id
+
+
+def load_context(db: Session, context_id: str) -> dict:
+    context = _get_context(db, context_id)
+    return dict(context.state or {})
+
+
+def update_context(db: Session, context_id: str, **fields) -> dict:
+    """
+    Update fields of the state of a context, fields that are not given are kept.
+    Args:
+        db: database session
+        context_id: id of the context
+        **fields: fields of the state to set
+
+    Returns:
+        the updated state
+    """
+    context = _get_context(db, context_id)
+    # assign a new dict so the change of the json column is detected
+    context.state = {**(context.state or {}), **fields}
+    db.commit()
+    return dict(context.state)
+
+
+def delete_run_contexts(db: Session, dag_id: str, run_id: str) -> int:
+    removed = db.query(TrainRunContext).filter(
+        TrainRunContext.dag_id == dag_id,
+        TrainRunContext.run_id == run_id,
+    ).delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+def delete_stale_contexts(db: Session, retention_days: int = CONTEXT_RETENTION_DAYS) -> int:
+    """
+    Delete the contexts created before the retention period.
+    """
+    removed = db.query(TrainRunContext).filter(
+        TrainRunContext.created_at < datetime.now() - timedelta(days=retention_days)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+def _get_context(db: Session, context_id: str) -> TrainRunContext:
+    context = db.query(TrainRunContext).filter(TrainRunContext.id == context_id).first()
+    if not context:
+        raise ValueError(f"Train run context {context_id} does not exist")
+    return context
+
+
+def create_train_state(dag_run, state: dict, train_id: Optional[str] = None) -> str:
+    with station_session() as db:
+        return create_context(db, dag_run.dag_id, dag_run.run_id, state, train_id=train_id)
+
+
+def load_train_state(context_id: str) -> dict:
+    with station_session() as db:
+        return load_context(db, context_id)
+
+
+def update_train_state(context_id: str, **fields) -> dict:
+    with station_session() as db:
+        return update_context(db, context_id, **fields)
+
+
+def cleanup_train_state(dag_run, succeeded: bool):
+    """
+    Delete the context of a finished run if it succeeded and the contexts older than the retention period. Errors are
+    only logged, the cleanup must not fail the run.
+    """
+    try:
+        with station_session() as db:
+            removed = delete_run_contexts(db, dag_run.dag_id, dag_run.run_id) if succeeded else 0
+            removed += delete_stale_contexts(db)
+        if removed:
+            logger.info(f"Deleted {removed} train run contexts")
+    except Exception as e:
+        logger.error(f"Unable to clean up train run contexts of run {dag_run.run_id}: {e}")
@@ -0,0 +1,121 @@
+import time
+from typing import Optional
+
+import docker
+from docker.errors import ImageNotFound
+from loguru import logger
+
+from station.clients.harbor_client import HarborClient
+
+
+class ImagePullResult:
+    """
+    Outcome of making sure an image is present locally.
+    """
+
+    def __init__(self, image: str, digest: Optional[str], pulled: bool, duration: float = 0.0,
+                 bytes_downloaded: int = 0):
+        self.image = image
+        self.digest = digest
+        self.pulled = pulled
+        self.duration = duration
+        self.bytes_downloaded = bytes_downloaded
+
+    def to_dict(self) -> dict:
+        return {
+            "image": self.image,
+            "digest": self.digest,
+            "pulled": self.pulled,
+            "duration": self.duration,
+            "bytes_downloaded": self.bytes_downloaded,
+        }
+
+
+def split_repository(repository: str):
+    """
+    Split an image repository into the registry address, the harbor project and the repository name.
+    e.g. harbor.example.org/station_1/train-id -> harbor.example.org, station_1, train-id
+    """
+    registry, path = repository.split("/", 1)
+    project, name = path.split("/", 1)
+    return registry, project, name
+
+
+def local_digest(client: docker.DockerClient, repository: str, tag: str) -> Optional[str]:
+    """
+    Get the registry digest of a local image, None if the image is not present locally.
+    """
+    try:
+        image = client.images.get(f"{repository}:{tag}")
+    except ImageNotFound:
+        return None
+    for repo_digest in image.attrs.get("RepoDigests") or []:
+        name, _, digest = repo_digest.partition("@")
+        if name == repository:
+            return digest
+    return None
+
+
+def remote_digest(harbor: HarborClient, repository: str, tag: str) -> Optional[str]:
+    """
+    Get the digest of the image in the registry, None if it can not be determined.
+    """
+    _, project, name = split_repository(repository)
+    try:
+        return harbor.get_artifact_digest(project, name, tag)
+    except Exception as e:
+        logger.warning(f"Unable to get the digest of {repository}:{tag} from harbor: {e}")
+        return None
+
+
+def pull_image(client: docker.DockerClient, repository: str, tag: str) -> ImagePullResult:
+    """
+    Pull an image, streaming the progress to measure the downloaded bytes.
+    """
+    start = time.perf_counter()
+    layer_sizes = {}
+    for progress in client.api.pull(repository, tag=tag, stream=True, decode=True):
+        if "error" in progress:
+            raise docker.errors.APIError(progress["error"])
+        total = (progress.get("progressDetail") or {}).get("total")
+        if progress.get("status") == "Downloading" and total:
+            layer_sizes[progress["id"]] = total
+    image = f"{repository}:{tag}"
+    return ImagePullResult(
+        image=image,
+        digest=local_digest(client, repository, tag),
+        pulled=True,
+        duration=time.perf_counter() - start,
+        bytes_downloaded=sum(layer_sizes.values()),
+    )
+
+
+def ensure_image(client: docker.DockerClient, harbor: HarborClient, repository: str, tag: str,
+                 login: callable = None) -> ImagePullResult:
+    """
+    Make sure the image is present locally with the same digest as in the registry. The pull is skipped if the local
+    image is up-to-date.
+    Args:
+        client: docker client
+        harbor: harbor client used to look up the digest of the image in the registry
+        repository: repository of the image including the registry address
+        tag: tag of the image
+        login: called before pulling, to only log in to the registry when an image has to be pulled
+
+    Returns:
+        the result of the pull
+    """
+    image = f"{repository}:{tag}"
+    remote = remote_digest(harbor, repository, tag)
+    local = local_digest(client, repository, tag)
+    if remote and local == remote:
+        logger.info(f"Image {image} is up-to-date ({remote}), skipping pull")
+        return ImagePullResult(image=image, digest=local, pulled=False)
+
+    if login:
+        login()
+    result = pull_image(client, repository, tag)
+    # verify the presence of the pulled image with a direct lookup
+    client.images.get(image)
+    logger.info(f"Pulled {image} ({result.digest}), {result.bytes_downloaded} bytes in {result.duration:.1f}s")
+    return result
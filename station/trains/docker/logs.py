@@ -0,0 +1,146 @@
+import gzip
+import json
+from collections import deque
+from typing import Iterable, Optional
+
+from loguru import logger
+from minio.error import S3Error
+
+from station.clients.minio import MinioClient
+from station.ctl.constants import DataDirectories
+
+# raw size of the log stored in a single compressed part
+DEFAULT_PART_SIZE = 1024 * 1024
+# maximum raw size of the stored log, output beyond it is dropped
+DEFAULT_MAX_LOG_SIZE = 256 * 1024 * 1024
+# maximum length of a single line kept in the tail
+MAX_TAIL_LINE_LENGTH = 64 * 1024
+
+
+def log_prefix(run_id: str) -> str:
+    return f"trains/{run_id}"
+
+
+class TrainLogWriter:
+    """
+    Stores the output of a train container in minio while it is produced. The log is split into gzip compressed
+    parts of a fixed raw size, so memory use is bounded by the part size and stored logs can be read page by page.
+    Output beyond the maximum size is dropped and the last lines are kept as a tail for the DAG log. Storing the log
+    is best effort, once an upload fails the remaining output is only kept in the tail and the train is not affected.
+    """
+
+    def __init__(self, minio: MinioClient, run_id: str, part_size: int = DEFAULT_PART_SIZE,
+                 max_size: int = DEFAULT_MAX_LOG_SIZE, tail_lines: int = 100):
+        self.minio = minio
+        self.run_id = run_id
+        self.part_size = part_size
+        self.max_size = max_size
+        self.tail = deque(maxlen=tail_lines)
+        self.parts = 0
+        self.size = 0
+        self.dropped = 0
+        self._buffer = bytearray()
+        self._partial_line = b""
+        self.error: Optional[str] = None
+
+    def write(self, chunk: bytes):
+        self._update_tail(chunk)
+        allowed = max(self.max_size - self.size, 0)
+        if len(chunk) > allowed:
+            self.dropped += len(chunk) - allowed
+            chunk = chunk[:allowed]
+        if not chunk or self.error:
+            return
+        self.size += len(chunk)
+        self._buffer.extend(chunk)
+        while len(self._buffer) >= self.part_size and not self.error:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        if self.error:
+            self._buffer = bytearray()
+
+    def close(self) -> dict:
+        """
+        Upload the remaining buffered output and the index of the stored log.
+
+        Returns:
+            the index describing the stored log
+        """
+        if self._buffer and not self.error:
+            self._upload_part(bytes(self._buffer))
+        self._buffer = bytearray()
+        index = {"parts": self.parts, "size": self.size, "dropped": self.dropped, "part_size": self.part_size}
+        if self.error:
+            index["error"] = self.error
+            return index
+        self._store(f"{log_prefix(self.run_id)}/index.json", json.dumps(index).encode("utf-8"), "application/json")
+        return index
+
+    def tail_text(self) -> str:
+        lines = list(self.tail)
+        if self._partial_line:
+            lines.append(self._partial_line)
+        return b"\n".join(lines).decode("utf-8", errors="replace")
+
+    def _update_tail(self, chunk: bytes):
+        lines = (self._partial_line + chunk).split(b"\n")
+        self._partial_line = lines.pop()[-MAX_TAIL_LINE_LENGTH:]
+        self.tail.extend(line[-MAX_TAIL_LINE_LENGTH:] for line in lines)
+
+    def _upload_part(self, data: bytes):
+        name = f"{log_prefix(self.run_id)}/part-{self.parts:05d}.log.gz"
+        if self._store(name, gzip.compress(data), "application/gzip"):
+            self.parts += 1
+
+    def _store(self, name: str, data: bytes, content_type: str) -> bool:
+        try:
+            self.minio.put_file(DataDirectories.LOGS.value, name, data, content_type=content_type)
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Unable to store the log of train run {self.run_id}, keeping only the tail: {e}")
+            return False
+        return True
+
+
+def capture_logs(log_stream: Iterable[bytes], writer: TrainLogWriter) -> dict:
+    """
+    Write a stream of log chunks to the writer until the stream ends and store the log index.
+    """
+    try:
+        for chunk in log_stream:
+            writer.write(chunk)
+    finally:
+        index = writer.close()
+    if writer.dropped:
+        logger.warning(f"Train log of run {writer.run_id} exceeded {writer.max_size} bytes, "
+                       f"dropped {writer.dropped} bytes")
+    return index
+
+
+def get_log_index(minio: MinioClient, run_id: str) -> Optional[dict]:
+    try:
+        return json.loads(minio.get_file(DataDirectories.LOGS.value, f"{log_prefix(run_id)}/index.json"))
+    except S3Error as e:
+        if e.code == "NoSuchKey":
+            return None
+        raise
+
+
+def read_log_page(minio: MinioClient, run_id: str, page: int) -> Optional[str]:
+    """
+    Read a single part of a stored train log.
+    Args:
+        minio: minio client
+        run_id: airflow run id of the train execution
+        page: index of the part
+
+    Returns:
+        the content of the part or None if it does not exist
+    """
+    try:
+        data = minio.get_file(DataDirectories.LOGS.value, f"{log_prefix(run_id)}/part-{page:05d}.log.gz")
+    except S3Error as e:
+        if e.code == "NoSuchKey":
+            return None
+        raise
+    return gzip.decompress(data).decode("utf-8", errors="replace")
@@ -0,0 +1,127 @@
+"""
+Extraction of the metadata files of a train image. All files are read from a single container of the image, each
+file with its own archive request for just that file, instead of creating a container per file. The archives are
+parsed as a stream and only the metadata files are kept in memory.
+"""
+import io
+import json
+import posixpath
+import tarfile
+from contextlib import closing
+from typing import Dict, Iterable, Iterator, Optional
+
+import docker
+from docker.errors import NotFound
+from loguru import logger
+from train_lib.security.train_config import TrainConfig
+
+TRAIN_CONFIG_FILE = "train_config.json"
+QUERY_FILE = "query.json"
+
+# metadata files of a train by name and their path in the image
+METADATA_FILES = {
+    TRAIN_CONFIG_FILE: "/opt/train_config.json",
+    QUERY_FILE: "/opt/pht_train/query.json",
+}
+
+
+class ChunkReader(io.RawIOBase):
+    """
+    File like object reading from an iterator over the chunks of a stream.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class TrainMetadata:
+    """
+    Metadata files extracted from a train image.
+    """
+
+    def __init__(self, files: Dict[str, bytes]):
+        self.files = files
+
+    @property
+    def config(self) -> TrainConfig:
+        if TRAIN_CONFIG_FILE not in self.files:
+            raise FileNotFoundError(f"No {TRAIN_CONFIG_FILE} found in the train image")
+        return TrainConfig.parse_raw(self.files[TRAIN_CONFIG_FILE])
+
+    @property
+    def query(self) -> Optional[dict]:
+        data = self.files.get(QUERY_FILE)
+        return json.loads(data) if data else None
+
+
+def extract_files(chunks: Iterable[bytes], root: str, files: Dict[str, str]) -> Dict[str, bytes]:
+    """
+    Read files from a tar stream returned by the docker archive api. The stream is read until the end of the archive.
+    Args:
+        chunks: chunks of the archive
+        root: path in the image the archive was created from
+        files: names of the files by their path in the image
+
+    Returns:
+        content of the files found in the archive by name
+    """
+    # members of the archive are named relative to the parent of the archived path
+    parent = posixpath.dirname(root.rstrip("/"))
+    wanted = {posixpath.relpath(path, parent): name for path, name in files.items()}
+    found = {}
+    with tarfile.open(fileobj=io.BufferedReader(ChunkReader(chunks)), mode="r|") as tar:
+        for member in tar:
+            name = wanted.get(posixpath.normpath(member.name))
+            if name is None or not member.isfile():
+                continue
+            found[name] = tar.extractfile(member).read()
+    return found
+
+
+def extract_train_metadata(client: docker.DockerClient, img: str,
+                           files: Dict[str, str] = None) -> TrainMetadata:
+    """
+    Extract the metadata files of a train image from a single container, requesting an archive of each file.
+    Args:
+        client: docker client
+        img: train image
+        files: paths of the files in the image by name, defaults to the train config and query
+
+    Returns:
+        the metadata files found in the image
+    """
+    files = files or METADATA_FILES
+    found = {}
+    container = client.containers.create(img)
+    try:
+        for name, path in files.items():
+            try:
+                stream, _ = container.get_archive(path)
+            except NotFound:
+                continue
+            with closing(stream):
+                found.update(extract_files(stream, path, {path: name}))
+                # consume the padding after the end of the archive so the response is released
+                for _ in stream:
+                    pass
+    finally:
+        container.remove(force=True)
+    missing = set(files) - set(found)
+    if missing:
+        logger.info(f"Metadata files {sorted(missing)} not found in image {img}")
+    return TrainMetadata(found)
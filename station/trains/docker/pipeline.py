@@ -0,0 +1,346 @@
+"""
+Steps of the execution of a PHT 1.0 docker train at the station. The steps are used as separate tasks by the
+run_pht_train DAG and fused into a single task by the run_pht_train_fast DAG, which shares the docker client, the
+registry login and the train state between the steps instead of passing them through airflow.
+"""
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict
+
+import docker
+from docker.errors import APIError, ImageNotFound
+from loguru import logger
+
+from train_lib.clients import PHTFhirClient
+from train_lib.security.protocol import SecurityProtocol
+from train_lib.security.train_config import TrainConfig
+
+from station.clients.docker.stats import TRAIN_CONTAINER_LABEL, TRAIN_ID_LABEL, TRAIN_RUN_LABEL
+from station.clients.harbor_client import HarborClient
+from station.clients.minio import MinioClient
+from station.trains.docker.images import ensure_image
+from station.trains.docker.logs import TrainLogWriter, capture_logs
+from station.trains.docker.metadata import extract_train_metadata
+from station.trains.docker.query import is_streaming_query, stream_query_results
+from station.trains.docker.query_cache import QueryResultCache, fhir_query_cache_key
+from station.trains.docker.rebase import rebase_image
+from station.trains.docker.resources import CpusetAllocator, ResourceProfile, gpu_device_requests, \
+    train_container_options
+from station.trains.docker.verification import VERIFIED_TAG, get_verification, image_digest, key_fingerprint, \
+    keep_verified_image, restore_verified_image, store_verification
+from station.trains.services import station_session
+
+
+def make_train_state(conf: dict) -> dict:
+    """
+    Initial state of a train run from the configuration of the dag run.
+    """
+    repository, tag, env, volumes, gpu, resources = [conf.get(_, None) for _ in
+                                                     ['repository', 'tag', 'env', 'volumes', 'gpus', 'resources']]
+    if not tag:
+        tag = "latest"
+
+    # check and process the volumes passed to the dag via the config
+    if volumes:
+        assert isinstance(volumes, dict)
+        for key, item in volumes.items():
+            # check if docker volume keys are present and raise an error if not
+            if isinstance(item, dict):
+                if not ("bind" in item and "mode" in item):
+                    raise ValueError("Incorrectly formatted docker volume, 'bind' and 'mode' keys are required")
+            # transform simple path:path volumes into correctly formatted docker read only volumes
+            elif isinstance(item, str):
+                volumes[key] = {
+                    "bind": item,
+                    "mode": "ro"
+                }
+
+    return {
+        "train_id": repository.split("/")[-1],
+        "repository": repository,
+        "tag": tag,
+        "img": f"{repository}:{tag}",
+        "env": env,
+        "volumes": volumes,
+        "gpus": gpu,
+        "resources": resources,
+    }
+
+
+class TrainPipeline:
+    """
+    Executes the steps of a train run on a train state. Every step updates the state and returns the fields it
+    changed, the docker and harbor clients are created once and the registry login is only performed once per
+    pipeline.
+    """
+
+    def __init__(self, state: dict, run_id: str, client: docker.DockerClient = None, harbor: HarborClient = None,
+                 db_session: Callable = None):
+        self.state = state
+        self.run_id = run_id
+        self._client = client
+        self._harbor = harbor
+        # context manager creating a session to the station database
+        self._db_session = db_session or station_session
+        self._logged_in = False
+        self.timings: Dict[str, float] = {}
+
+    @property
+    def client(self) -> docker.DockerClient:
+        if self._client is None:
+            self._client = docker.from_env(timeout=120)
+        return self._client
+
+    @property
+    def harbor(self) -> HarborClient:
+        if self._harbor is None:
+            self._harbor = HarborClient(api_url=os.getenv("HARBOR_URL"), username=os.getenv("HARBOR_USER"),
+                                        password=os.getenv("HARBOR_PW"))
+        return self._harbor
+
+    def login(self):
+        if self._logged_in:
+            return
+        registry_address = os.getenv("HARBOR_URL").split("//")[-1]
+        self.client.login(username=os.getenv("HARBOR_USER"), password=os.getenv("HARBOR_PW"),
+                          registry=registry_address)
+        self._logged_in = True
+
+    def run(self, steps: Dict[str, Callable[[], dict]] = None) -> Dict[str, float]:
+        """
+        Run all steps of the train execution in order and measure their duration.
+
+        Returns:
+            duration of each step and the total duration in seconds
+        """
+        steps = steps or {
+            "pull_docker_image": self.pull_images,
+            "extract_config_and_query": self.extract_config_and_query,
+            "pre_run_protocol": self.pre_run_protocol,
+            "execute_query": self.execute_query,
+            "execute_container": self.execute_container,
+            "post_run_protocol": self.post_run_protocol,
+            "rebase": self.rebase,
+            "push_train_image": self.push_image,
+        }
+        start = time.perf_counter()
+        for name, step in steps.items():
+            step_start = time.perf_counter()
+            step()
+            self.timings[name] = time.perf_counter() - step_start
+            logger.info(f"Step {name} finished in {self.timings[name]:.2f}s")
+        self.timings["total"] = time.perf_counter() - start
+        return self.timings
+
+    def pull_images(self) -> dict:
+        # only pull the train and base images if they changed in the registry
+        pull_results = [
+            ensure_image(self.client, self.harbor, self.state["repository"], self.state["tag"], login=self.login),
+            ensure_image(self.client, self.harbor, self.state["repository"], "base", login=self.login),
+        ]
+        for result in pull_results:
+            logger.info(f"Image {result.image}: pulled={result.pulled}, digest={result.digest}, "
+                        f"{result.bytes_downloaded} bytes in {result.duration:.1f}s")
+        return self._update(image_pulls=[result.to_dict() for result in pull_results])
+
+    def extract_config_and_query(self) -> dict:
+        # the config and the optional query are read from the image in a single archive request
+        metadata = extract_train_metadata(self.client, self.state["img"])
+        return self._update(config=metadata.config.dict(by_alias=True), query=metadata.query)
+
+    def pre_run_protocol(self) -> dict:
+        img = self.state["img"]
+        private_key_path = os.getenv("PRIVATE_KEY_PATH")
+        private_key_password = os.getenv("PRIVATE_KEY_PASSWORD", None)
+        use_cache = os.getenv("TRAIN_VERIFICATION_CACHE", "true").lower() not in ("0", "false")
+
+        # an image that was already verified with the current station key is not verified again
+        if use_cache:
+            digest = image_digest(self.client, img)
+            fingerprint = key_fingerprint(private_key_path, private_key_password)
+            with self._db_session() as db:
+                verification = get_verification(db, digest, fingerprint)
+                if verification and restore_verified_image(self.client, verification, img):
+                    verification.hits = (verification.hits or 0) + 1
+                    verification.last_used = datetime.now()
+                    db.commit()
+                    logger.info(f"Using cached verification of image {digest}")
+                    return self._update(verification={"cached": True, "image_digest": digest})
+
+        start = time.perf_counter()
+        config = TrainConfig(**self.state["config"])
+        sp = SecurityProtocol(os.getenv("STATION_ID"), config=config)
+        sp.pre_run_protocol(img, private_key_path, private_key_password=private_key_password)
+        duration = time.perf_counter() - start
+        if not use_cache:
+            return {}
+
+        verified_image = keep_verified_image(self.client, img)
+        with self._db_session() as db:
+            store_verification(db, digest, fingerprint, verified_image, train_id=self.state["train_id"],
+                               duration=duration)
+        return self._update(verification={"cached": False, "image_digest": digest, "duration": duration})
+
+    def execute_query(self) -> dict:
+        query = self.state.get("query", None)
+        if not query:
+            return {}
+        logger.info("Query found, setting up connection to FHIR server")
+
+        env_dict = self.state.get("env", None)
+        # Check that there is a FHIR server specified in the configuration dictionary
+        if env_dict and env_dict.get("FHIR_ADDRESS", None):
+            fhir_client = PHTFhirClient.from_dict(env_dict)
+        else:
+            fhir_client = PHTFhirClient.from_env()
+
+        output_file_name = query["data"]["filename"]
+
+        # Create the file path in which to store the FHIR query results
+        data_dir = os.getenv("AIRFLOW_DATA_DIR", "/opt/station_data")
+        train_data_dir = os.path.abspath(os.path.join(data_dir, self.state["train_id"]))
+        if not os.path.isdir(train_data_dir):
+            os.mkdir(train_data_dir)
+
+        # Results of the same query on unchanged data are shared between train runs
+        query_cache = QueryResultCache.from_env(data_dir)
+        cache_key = fhir_query_cache_key(fhir_client, query) if query_cache else None
+        cached_result = query_cache.get(cache_key) if cache_key else None
+
+        query_stats = None
+        if cached_result:
+            logger.info(f"Using cached query result {cache_key}")
+            train_data_path = cached_result.path
+        else:
+            if is_streaming_query(query):
+                # write the results page by page instead of loading the whole result into memory
+                stream_result = stream_query_results(fhir_client, query, storage_dir=train_data_dir)
+                train_data_path = stream_result.path
+                query_stats = stream_result.to_dict()
+            else:
+                query_result = fhir_client.execute_query(query=query)
+                train_data_path = fhir_client.store_query_results(query_result, storage_dir=train_data_dir,
+                                                                  filename=output_file_name)
+            if cache_key:
+                train_data_path = query_cache.put(cache_key, train_data_path).path
+        logger.info(f"Train data path: {train_data_path}")
+        host_data_path = os.path.join(os.getenv("STATION_DATA_DIR"),
+                                      os.path.relpath(train_data_path, os.path.abspath(data_dir)))
+
+        # Add the file containing the fhir query results to the volumes configuration
+        query_data_volume = {
+            host_data_path: {
+                "bind": f"/opt/train_data/{output_file_name}",
+                "mode": "ro"
+            }
+        }
+        data_dir_env = {
+            "TRAIN_DATA_PATH": f"/opt/train_data/{output_file_name}"
+        }
+        volumes = self.state.get("volumes")
+        volumes = {**query_data_volume, **volumes} if isinstance(volumes, dict) else query_data_volume
+        env = {**self.state["env"], **data_dir_env} if self.state.get("env") else data_dir_env
+        return self._update(env=env, volumes=volumes, query_results=query_stats)
+
+    def execute_container(self) -> dict:
+        environment = self.state.get("env") or {}
+        volumes = self.state.get("volumes") or {}
+        resources = self.state.get("resources") or {}
+        device_requests = gpu_device_requests(self.state.get("gpus") or resources.get("gpus"))
+
+        # limit the cpu, memory and io of the train and pin it to cpus if configured
+        cpuset_dir = os.path.join(os.getenv("AIRFLOW_DATA_DIR", "/opt/station_data"), "cpusets")
+        limits = train_container_options(self.client, self.run_id, resources, cpuset_dir,
+                                         profile=ResourceProfile.from_env())
+        logger.info(f"Running image {self.state['img']} with volumes {volumes}, resource limits {limits}")
+        # labels used by the station to track the resource usage of train containers
+        labels = {TRAIN_CONTAINER_LABEL: "true", TRAIN_ID_LABEL: self.state["train_id"],
+                  TRAIN_RUN_LABEL: self.run_id}
+        try:
+            try:
+                container = self.client.containers.run(
+                    self.state["img"],
+                    environment=environment,
+                    volumes=volumes,
+                    detach=True,
+                    network_disabled=True,
+                    stderr=True,
+                    stdout=True,
+                    labels=labels,
+                    device_requests=device_requests,
+                    **limits
+                )
+            # If the container is already in use remove it
+            except APIError as e:
+                logger.warning(e)
+                container = self.client.containers.run(self.state["img"], environment=environment, volumes=volumes,
+                                                       detach=True, network_disabled=True, stderr=True,
+                                                       stdout=True, labels=labels, **limits)
+            # Stream the logs generated from std out und err out during the container run to minio and keep the
+            # last lines for the task log
+            log_writer = TrainLogWriter(MinioClient(), self.run_id)
+            log_index = capture_logs(container.logs(stream=True, follow=True), log_writer)
+            container_output = container.wait()
+        finally:
+            if "cpuset_cpus" in limits:
+                CpusetAllocator(cpuset_dir).release(self.run_id)
+        logger.info(f"Stored {log_index['size']} bytes of train logs in {log_index['parts']} parts")
+        print(f"logs_container_start({log_writer.tail_text()})logs_end")
+
+        exit_code = container_output["StatusCode"]
+        if exit_code != 0:
+            logger.error(container_output)
+            raise ValueError(f"The train execution returned a non zero exit code: {exit_code}")
+
+        # Store the results in the train image, they are moved onto the base image once in the rebase step
+        container.commit(repository=self.state["repository"], tag=self.state["tag"])
+        container.remove(v=True, force=True)
+        return {}
+
+    def post_run_protocol(self) -> dict:
+        config = TrainConfig(**self.state["config"])
+        sp = SecurityProtocol(os.getenv("STATION_ID"), config=config)
+        sp.post_run_protocol(img=self.state["img"],
+                             private_key_path=os.getenv("PRIVATE_KEY_PATH"),
+                             private_key_password=os.getenv("PRIVATE_KEY_PASSWORD", None))
+        return {}
+
+    def rebase(self) -> dict:
+        base_image = ':'.join([self.state["repository"], 'base'])
+        # Stream the results and the train config from the executed train onto the base image and commit once
+        result = rebase_image(self.client, self.state["img"], base_image, self.state["repository"],
+                              self.state["tag"])
+        for transfer in result.transfers:
+            logger.info(f"Copied {transfer.path}: {transfer.size} bytes in {transfer.duration:.1f}s")
+        logger.info(f"Rebased train in {result.duration:.1f}s (commit {result.commit_duration:.1f}s)")
+        return self._update(rebase=result.to_dict())
+
+    def push_image(self) -> dict:
+        self.login()
+        response = self.client.images.push(
+            repository=self.state["repository"],
+            tag=self.state["tag"],
+            stream=False, decode=False
+        )
+        logger.info(response)
+        self.client.images.remove(f'{self.state["repository"]}:{self.state["tag"]}', noprune=False, force=True)
+        self.client.images.remove(f'{self.state["repository"]}:base', noprune=False, force=True)
+        # the pushed image contains the results of this station, its verification will not be used again
+        try:
+            self.client.images.remove(f'{self.state["repository"]}:{VERIFIED_TAG}', noprune=False, force=True)
+        except ImageNotFound:
+            pass
+        return {}
+
+    def _update(self, **fields) -> dict:
+        self.state.update(fields)
+        return fields
+
+
+def run_pipeline_step(state: dict, run_id: str, step: str) -> dict:
+    """
+    Run a single step on a train state, returns the changed fields of the state.
+    """
+    return getattr(TrainPipeline(state, run_id), step)()
+
@@ -0,0 +1,276 @@
+"""
+Streaming execution of the FHIR queries of trains. The pages of the search result are fetched by following the next
+links of the returned bundles and written to disk one page at a time, so memory use is bounded by the page size
+instead of the size of the whole result.
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+import requests
+from loguru import logger
+
+# output formats of the query data section that are always streamed
+STREAMING_FORMATS = {"ndjson", "parquet"}
+# seconds to wait for the FHIR server to accept the connection and to send each page
+QUERY_PAGE_TIMEOUT = float(os.getenv("FHIR_QUERY_PAGE_TIMEOUT", 120))
+
+
+class QueryStreamResult:
+    """
+    Outcome of streaming the results of a query to a file.
+    """
+
+    def __init__(self, path: str, output_format: str, pages: int = 0, resources: int = 0, size: int = 0,
+                 duration: float = 0.0):
+        self.path = path
+        self.output_format = output_format
+        self.pages = pages
+        self.resources = resources
+        self.size = size
+        self.duration = duration
+
+    def to_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "output_format": self.output_format,
+            "pages": self.pages,
+            "resources": self.resources,
+            "size": self.size,
+            "duration": self.duration,
+        }
+
+
+def is_streaming_query(query: dict) -> bool:
+    """
+    Whether the results of a query are streamed. Queries requesting ndjson or parquet output are always streamed, json
+    results are streamed when the data section of the query sets "stream": true.
+    """
+    data = query.get("data") or {}
+    if data.get("output_format") in STREAMING_FORMATS:
+        return True
+    return bool(data.get("stream")) and data.get("output_format") in ("json", "raw")
+
+
+def next_page_url(bundle: dict) -> Optional[str]:
+    for link in bundle.get("link") or []:
+        if link.get("relation") == "next":
+            return link.get("url")
+    return None
+
+
+def iter_bundles(session: requests.Session, url: str, auth: requests.auth.AuthBase = None,
+                 prefetch: bool = True, timeout: float = QUERY_PAGE_TIMEOUT) -> Iterator[dict]:
+    """
+    Iterate over the pages of a FHIR search result by following the next links.
+    Args:
+        session: session used for the requests
+        url: search url of the first page
+        auth: authentication for the FHIR server
+        prefetch: fetch the next page in the background while the current page is processed, at most two pages
+            are held in memory at the same time
+        timeout: connect and read timeout of each page request in seconds
+
+    Returns:
+        iterator over the bundles of the result
+    """
+
+    def fetch(page_url: str) -> dict:
+        r = session.get(page_url, auth=auth, timeout=timeout)
+        r.raise_for_status()
+        return r.json()
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    pending = None
+    try:
+        bundle = fetch(url)
+        while bundle is not None:
+            next_url = next_page_url(bundle)
+            if executor and next_url:
+                pending = executor.submit(fetch, next_url)
+            yield bundle
+            if pending:
+                bundle = pending.result()
+                pending = None
+            elif next_url:
+                bundle = fetch(next_url)
+            else:
+                bundle = None
+    finally:
+        if pending:
+            pending.cancel()
+        if executor:
+            executor.shutdown(wait=False)
+
+
+def flatten_resource(resource: dict, prefix: str = "", sep: str = ".") -> dict:
+    """
+    Flatten a FHIR resource into a single level dictionary. Nested objects are joined into dotted column names,
+    lists are stored as json strings.
+    """
+    flat = {}
+    for key, value in resource.items():
+        column = f"{prefix}{sep}{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten_resource(value, prefix=column, sep=sep))
+        elif isinstance(value, list):
+            flat[column] = json.dumps(value)
+        else:
+            flat[column] = value
+    return flat
+
+
+class BundleWriter:
+    """
+    Writes the entries of all pages into a single searchset bundle, in the same format as the results stored by the
+    train library.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "w")
+        self._file.write('{"resourceType": "Bundle", "type": "searchset", "entry": [')
+        self._first = True
+
+    def write_page(self, entries: List[dict]):
+        for entry in entries:
+            if not self._first:
+                self._file.write(",")
+            self._file.write("\n")
+            json.dump(entry, self._file)
+            self._first = False
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.write("\n]}\n")
+        self._file.close()
+
+
+class NdjsonWriter:
+    """
+    Writes one resource per line.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "w")
+
+    def write_page(self, entries: List[dict]):
+        for entry in entries:
+            self._file.write(json.dumps(entry.get("resource", entry)))
+            self._file.write("\n")
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """
+    Writes the flattened resources into a parquet file with one row group per page. The columns are fixed by the
+    selected variables of the query or by the first page, columns that are only present in later pages are dropped.
+    """
+
+    def __init__(self, path: str, variables: List[str] = None):
+        import pyarrow  # noqa: F401
+
+        self.path = path
+        self.variables = variables
+        self._schema = None
+        self._writer = None
+
+    def write_page(self, entries: List[dict]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = [flatten_resource(entry.get("resource", entry)) for entry in entries]
+        if self._writer is None:
+            table = pa.Table.from_pylist(rows)
+            columns = self.variables or table.column_names
+            # columns without values in the first page can hold any value later on
+            self._schema = pa.schema([
+                pa.field(c, table.schema.field(c).type if c in table.column_names and
+                         not pa.types.is_null(table.schema.field(c).type) else pa.string())
+                for c in columns
+            ])
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        rows = [{c: row.get(c) for c in self._schema.names} for row in rows]
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self._schema))
+
+    def close(self):
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+
+def _make_writer(output_format: str, path: str, variables: List[str] = None):
+    if output_format == "ndjson":
+        return NdjsonWriter(path)
+    if output_format == "parquet":
+        return ParquetWriter(path, variables=variables)
+    if output_format in ("json", "raw"):
+        return BundleWriter(path)
+    raise ValueError(f"Unsupported streaming output format: {output_format}")
+
+
+def stream_query_results(fhir_client, query: dict, storage_dir: str, prefetch: bool = True,
+                         session: requests.Session = None, timeout: float = QUERY_PAGE_TIMEOUT) -> QueryStreamResult:
+    """
+    Execute the query of a train and write the results to a file page by page.
+    Args:
+        fhir_client: configured fhir client of the train library, used for the search url and authentication
+        query: content of the query.json of the train
+        storage_dir: directory in which the result file is stored
+        prefetch: fetch the next page while the current one is written
+        session: session used for the requests to the FHIR server, a new session is created and closed if not given
+        timeout: connect and read timeout of each page request in seconds
+
+    Returns:
+        the result of streaming the query
+    """
+    data = query["data"]
+    output_format = data["output_format"]
+    path = os.path.join(storage_dir, data["filename"])
+    # the server always returns json bundles, the output format only determines how they are stored
+    fhir_client.output_format = "json"
+    url = fhir_client._generate_url(query["query"])
+    auth = fhir_client._generate_auth()
+
+    result = QueryStreamResult(path, output_format)
+    start = time.perf_counter()
+    owned_session = requests.Session() if session is None else None
+    writer = _make_writer(output_format, path, variables=data.get("variables"))
+    try:
+        try:
+            for bundle in iter_bundles(session or owned_session, url, auth=auth, prefetch=prefetch, timeout=timeout):
+                entries = bundle.get("entry") or []
+                writer.write_page(entries)
+                result.pages += 1
+                result.resources += len(entries)
+                logger.info(f"Query page {result.pages}: {len(entries)} resources, {result.resources} total "
+                            f"after {time.perf_counter() - start:.1f}s")
+        finally:
+            writer.close()
+            if owned_session:
+                owned_session.close()
+        _check_result_size(fhir_client, result.resources)
+    except Exception:
+        if os.path.isfile(path):
+            os.remove(path)
+        raise
+
+    result.size = os.path.getsize(path)
+    result.duration = time.perf_counter() - start
+    logger.info(f"Stored {result.resources} resources from {result.pages} pages in {path} ({result.size} bytes, "
+                f"{result.duration:.1f}s)")
+    return result
+
+
+def _check_result_size(fhir_client, resources: int):
+    if not resources:
+        raise ValueError("No results match the query.")
+    k_anon = getattr(fhir_client, "k_anon", 5)
+    if resources < k_anon and not getattr(fhir_client, "disable_k_anon", False):
+        raise ValueError("Too few results match the query. Response blocked by k-anonymity policy.")
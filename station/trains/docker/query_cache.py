@@ -0,0 +1,281 @@
+"""
+Cache of FHIR query results shared between train runs. Results are keyed by the FHIR server, the normalized query and
+the data version of the queried resources on the server, so repeated queries mount the stored result file instead of
+querying the server again. The cache is limited by a disk budget, the least recently used results are evicted first.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional
+
+import requests
+from loguru import logger
+
+RESULT_FILE = "result"
+METADATA_FILE = "metadata.json"
+
+
+class QueryCacheEntry:
+    """
+    A query result stored in the cache.
+    """
+
+    def __init__(self, key: str, path: str, size: int, created: float, last_access: float):
+        self.key = key
+        self.path = path
+        self.size = size
+        self.created = created
+        self.last_access = last_access
+
+    def to_dict(self) -> dict:
+        return {
+            "key": self.key,
+            "path": self.path,
+            "size": self.size,
+            "created": self.created,
+            "last_access": self.last_access,
+        }
+
+
+# lists whose order does not change the result, e.g. the order of the variables determines the order of the columns
+UNORDERED_LISTS = {"parameters", "has"}
+
+
+def _normalize(value, key: str = None):
+    # the order of query parameters and has clauses does not change the result
+    if isinstance(value, dict):
+        return {k: _normalize(v, key=k) for k, v in sorted(value.items())}
+    if isinstance(value, list):
+        items = [_normalize(v) for v in value]
+        if key in UNORDERED_LISTS:
+            return sorted(items, key=lambda v: json.dumps(v, sort_keys=True))
+        return items
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def query_resources(query: dict) -> List[str]:
+    """
+    Resource types whose data determines the result of a query.
+    """
+    definition = query["query"]
+    if isinstance(definition, str):
+        return [definition.split("?")[0].strip("/")]
+    resources = [definition["resource"]]
+    resources.extend(has["resource"] for has in definition.get("has") or [])
+    return sorted(set(resources))
+
+
+def query_cache_key(server_url: str, query: dict, data_version: str, identity: str = None) -> str:
+    """
+    Key of a query result. The filename of the result is not part of the key, as it only determines where the
+    result is mounted in the train container. Results are only shared between runs using the same identity on the
+    server, as different credentials can grant access to different data.
+    """
+    data = {k: v for k, v in (query.get("data") or {}).items() if k != "filename"}
+    content = {
+        "server": server_url.rstrip("/"),
+        "identity": identity,
+        "query": _normalize(query["query"]),
+        "data": _normalize(data),
+        "version": data_version,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def fhir_data_version(session: requests.Session, server_url: str, resources: List[str],
+                      auth: requests.auth.AuthBase = None) -> Optional[str]:
+    """
+    Version of the data of the given resources on a FHIR server, made up of the last update and the number of
+    resources of each type. None if the server does not support sorting by the last update. Strict handling is
+    requested, so servers reject the sort instead of ignoring it, and results whose self link shows that the sort was
+    not applied are not used either.
+    """
+    versions = []
+    for resource in resources:
+        url = f"{server_url.rstrip('/')}/{resource}"
+        try:
+            r = session.get(url, params={"_sort": "-_lastUpdated", "_count": 1, "_elements": "meta",
+                                         "_total": "accurate", "_format": "json"},
+                            headers={"Prefer": "handling=strict"}, auth=auth)
+            r.raise_for_status()
+            bundle = r.json()
+        except Exception as e:
+            logger.warning(f"Unable to determine the data version of {resource}: {e}")
+            return None
+        self_link = next((link.get("url") for link in bundle.get("link") or [] if link.get("relation") == "self"),
+                         None)
+        if self_link and "_sort" not in self_link:
+            logger.warning(f"Server ignored sorting {resource} by the last update, results are not cached")
+            return None
+        entries = bundle.get("entry") or []
+        last_updated = entries[0]["resource"].get("meta", {}).get("lastUpdated") if entries else None
+        if entries and not last_updated:
+            return None
+        versions.append(f"{resource}:{last_updated}:{bundle.get('total')}")
+    return ";".join(versions)
+
+
+class QueryResultCache:
+    """
+    Query results stored on disk in one directory per key. Lookups and changes are serialized between processes with
+    a lock file. Results used within the protection period are not evicted, as they might be mounted by a train that
+    has not started yet.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int, protect_seconds: int = 3600):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.protect_seconds = protect_seconds
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, data_dir: str) -> Optional["QueryResultCache"]:
+        """
+        Cache in the query_cache directory of the station data directory, the size is set in GB by
+        QUERY_CACHE_SIZE_GB. None if the size is 0.
+        """
+        size_gb = float(os.getenv("QUERY_CACHE_SIZE_GB", 10))
+        if size_gb <= 0:
+            return None
+        return cls(os.path.join(data_dir, "query_cache"), int(size_gb * 1024 ** 3))
+
+    def get(self, key: str) -> Optional[QueryCacheEntry]:
+        with self._lock():
+            entry = self._read_entry(key)
+            if not entry:
+                return None
+            entry.last_access = time.time()
+            self._write_metadata(entry)
+            return entry
+
+    def put(self, key: str, result_path: str) -> QueryCacheEntry:
+        """
+        Move a result file into the cache and evict old results to stay within the disk budget.
+        Args:
+            key: key of the result
+            result_path: path of the result file, it is moved into the cache
+
+        Returns:
+            the cache entry
+        """
+        size = os.path.getsize(result_path)
+        # move the file next to its final location first, so adding the entry is a rename within the cache
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        shutil.move(result_path, os.path.join(tmp_dir, RESULT_FILE))
+        with self._lock():
+            existing = self._read_entry(key)
+            if existing:
+                shutil.rmtree(tmp_dir)
+                return existing
+            self.evict(reserve=size, locked=True)
+            entry_dir = os.path.join(self.cache_dir, key)
+            now = time.time()
+            entry = QueryCacheEntry(key, os.path.join(entry_dir, RESULT_FILE), size, now, now)
+            os.rename(tmp_dir, entry_dir)
+            self._write_metadata(entry)
+        logger.info(f"Cached query result {key} ({size} bytes)")
+        return entry
+
+    def entries(self) -> List[QueryCacheEntry]:
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            if key.startswith("."):
+                continue
+            entry = self._read_entry(key)
+            if entry:
+                entries.append(entry)
+        return entries
+
+    def size(self) -> int:
+        return sum(entry.size for entry in self.entries())
+
+    def evict(self, reserve: int = 0, locked: bool = False) -> List[str]:
+        """
+        Remove the least recently used results until the cache and the reserved size fit into the disk budget.
+        Args:
+            reserve: size that is about to be added to the cache
+            locked: whether the caller already holds the cache lock
+
+        Returns:
+            keys of the evicted results
+        """
+        if not locked:
+            with self._lock():
+                return self.evict(reserve=reserve, locked=True)
+
+        entries = sorted(self.entries(), key=lambda e: e.last_access)
+        total = sum(e.size for e in entries) + reserve
+        evicted = []
+        now = time.time()
+        for entry in entries:
+            if total <= self.max_size:
+                break
+            if now - entry.last_access < self.protect_seconds:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir, entry.key), ignore_errors=True)
+            total -= entry.size
+            evicted.append(entry.key)
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} query results from the cache")
+        return evicted
+
+    def _read_entry(self, key: str) -> Optional[QueryCacheEntry]:
+        try:
+            with open(os.path.join(self.cache_dir, key, METADATA_FILE)) as f:
+                metadata = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return QueryCacheEntry(key, os.path.join(self.cache_dir, key, RESULT_FILE), metadata["size"],
+                               metadata["created"], metadata["last_access"])
+
+    def _write_metadata(self, entry: QueryCacheEntry):
+        path = os.path.join(self.cache_dir, entry.key, METADATA_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"size": entry.size, "created": entry.created, "last_access": entry.last_access}, f)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _lock(self):
+        with open(os.path.join(self.cache_dir, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def fhir_query_cache_key(fhir_client, query: dict, session: requests.Session = None) -> Optional[str]:
+    """
+    Cache key of a train query against the server of the given train library fhir client, None if the data version
+    of the server can not be determined and the result must not be cached.
+    """
+    version = fhir_data_version(session or requests.Session(), fhir_client.server_url, query_resources(query),
+                                auth=fhir_client._generate_auth())
+    if not version:
+        return None
+    return query_cache_key(fhir_client.server_url, query, version, identity=fhir_auth_identity(fhir_client))
+
+
+def fhir_auth_identity(fhir_client) -> str:
+    """
+    Hash of the identity a train library fhir client authenticates as, the user for basic auth, the client id for
+    oauth2 and the token itself for static tokens.
+    """
+    if getattr(fhir_client, "username", None):
+        identity = f"user:{fhir_client.username}"
+    elif getattr(fhir_client, "client_id", None):
+        identity = f"client:{fhir_client.client_id}"
+    elif getattr(fhir_client, "token", None):
+        identity = f"token:{fhir_client.token}"
+    else:
+        identity = "anonymous"
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
@@ -0,0 +1,110 @@
+import os
+import time
+from typing import Iterable, Iterator, List
+
+import docker
+from loguru import logger
+
+# paths copied from the executed train image onto the base image
+DEFAULT_REBASE_PATHS = ["/opt/pht_results", "/opt/train_config.json"]
+# size of the chunks read from the archive stream of the source container
+ARCHIVE_CHUNK_SIZE = 2 * 1024 * 1024
+
+
+class ArchiveTransfer:
+    """
+    Size and duration of copying a path between two containers.
+    """
+
+    def __init__(self, path: str, size: int = 0, duration: float = 0.0):
+        self.path = path
+        self.size = size
+        self.duration = duration
+
+    def to_dict(self) -> dict:
+        return {"path": self.path, "size": self.size, "duration": self.duration}
+
+
+class RebaseResult:
+    """
+    Outcome of rebasing a train image on its base image.
+    """
+
+    def __init__(self, image: str, transfers: List[ArchiveTransfer], commit_duration: float, duration: float):
+        self.image = image
+        self.transfers = transfers
+        self.commit_duration = commit_duration
+        self.duration = duration
+
+    @property
+    def size(self) -> int:
+        return sum(t.size for t in self.transfers)
+
+    def to_dict(self) -> dict:
+        return {
+            "image": self.image,
+            "transfers": [t.to_dict() for t in self.transfers],
+            "size": self.size,
+            "commit_duration": self.commit_duration,
+            "duration": self.duration,
+        }
+
+
+def _count_chunks(chunks: Iterable[bytes], transfer: ArchiveTransfer) -> Iterator[bytes]:
+    for chunk in chunks:
+        transfer.size += len(chunk)
+        yield chunk
+
+
+def stream_archive(from_container, to_container, path: str) -> ArchiveTransfer:
+    """
+    Copy a path from one container to another. The tar archive returned by docker is passed on chunk by chunk to
+    the target container, so the archive is never held in memory or written to disk.
+    Args:
+        from_container: container to copy from
+        to_container: container to copy to
+        path: path of the file or directory, it is placed at the same path in the target container
+
+    Returns:
+        size and duration of the transfer
+    """
+    transfer = ArchiveTransfer(path)
+    start = time.perf_counter()
+    chunks, _ = from_container.get_archive(path, chunk_size=ARCHIVE_CHUNK_SIZE)
+    to_container.put_archive(os.path.dirname(path), _count_chunks(chunks, transfer))
+    transfer.duration = time.perf_counter() - start
+    return transfer
+
+
+def rebase_image(client: docker.DockerClient, image: str, base_image: str, repository: str, tag: str,
+                 paths: List[str] = None) -> RebaseResult:
+    """
+    Rebase an executed train image on its base image. A single container is created for each image, the given paths
+    are streamed from the train container into the base container and the base container is committed once.
+    Args:
+        client: docker client
+        image: executed train image containing the results
+        base_image: base image of the train
+        repository: repository of the rebased image
+        tag: tag of the rebased image
+        paths: paths to copy onto the base image, defaults to the results and the train config
+
+    Returns:
+        the result of the rebase
+    """
+    start = time.perf_counter()
+    from_container = client.containers.create(image)
+    to_container = client.containers.create(base_image)
+    try:
+        transfers = [stream_archive(from_container, to_container, path) for path in paths or DEFAULT_REBASE_PATHS]
+        commit_start = time.perf_counter()
+        to_container.commit(repository=repository, tag=tag)
+        commit_duration = time.perf_counter() - commit_start
+    finally:
+        from_container.remove(v=True, force=True)
+        to_container.remove(v=True, force=True)
+
+    result = RebaseResult(f"{repository}:{tag}", transfers, commit_duration, time.perf_counter() - start)
+    logger.info(f"Rebased {image} on {base_image}, copied {result.size} bytes in {result.duration:.1f}s "
+                f"(commit {result.commit_duration:.1f}s)")
+    return result
@@ -0,0 +1,263 @@
+"""
+Resource limits of train containers. The cpu and gpu requirements of a train config are mapped onto the docker
+container options, values that are not given by the train config are taken from the station wide default profile.
+Trains can be pinned to a set of cpus, the cpus are allocated within a single NUMA node where possible and the
+allocations of concurrently running trains are shared between the airflow workers in a state file.
+"""
+import fcntl
+import glob
+import json
+import math
+import os
+import re
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Union
+
+import docker.types
+
+from station.clients.docker.stats import TRAIN_RUN_LABEL
+
+# keys of the cpu requirements of a train config that are passed on to the dag
+RESOURCE_KEYS = ("cpus", "memory", "blkio_weight", "device_read_bps", "device_write_bps", "pin_cpus")
+# seconds an allocation is kept without a running container of the run, cpus are allocated before the container starts
+ALLOCATION_GRACE_PERIOD = int(os.getenv("TRAIN_CPUSET_GRACE_PERIOD", 600))
+
+
+class ResourceProfile:
+    """
+    Default resource limits of train containers, configured with environment variables of the airflow workers.
+    Limits that are not set are not applied.
+    """
+
+    def __init__(self, cpus: float = None, memory: float = None, blkio_weight: int = None, pin_cpus: bool = False):
+        self.cpus = cpus
+        # memory limit in GB
+        self.memory = memory
+        self.blkio_weight = blkio_weight
+        self.pin_cpus = pin_cpus
+
+    @classmethod
+    def from_env(cls) -> "ResourceProfile":
+        cpus = os.getenv("TRAIN_DEFAULT_CPUS")
+        memory = os.getenv("TRAIN_DEFAULT_MEMORY_GB")
+        blkio_weight = os.getenv("TRAIN_DEFAULT_BLKIO_WEIGHT")
+        return cls(
+            cpus=float(cpus) if cpus else None,
+            memory=float(memory) if memory else None,
+            blkio_weight=int(blkio_weight) if blkio_weight else None,
+            pin_cpus=os.getenv("TRAIN_CPU_PINNING", "false").lower() in ("1", "true"),
+        )
+
+
+def train_resources(cpu_requirements: Optional[dict], gpu_requirements: Optional[dict]) -> dict:
+    """
+    Resource configuration passed to the train dags from the requirements of a train config. The cpu requirements
+    may contain cpus, memory (GB), blkio_weight, device_read_bps, device_write_bps and pin_cpus, the gpu requirements
+    either a count or a list of device_ids.
+    """
+    resources = {k: v for k, v in (cpu_requirements or {}).items() if k in RESOURCE_KEYS}
+    gpu_requirements = gpu_requirements or {}
+    if gpu_requirements.get("device_ids"):
+        resources["gpus"] = gpu_requirements["device_ids"]
+    elif gpu_requirements.get("count"):
+        resources["gpus"] = gpu_requirements["count"]
+    return resources
+
+
+def gpu_device_requests(gpu_config: Union[str, int, List[int], None]) -> List[docker.types.DeviceRequest]:
+    """
+    Device requests for the gpus of a train, either "all", a number of gpus or a list of gpu ids.
+    """
+    if not gpu_config:
+        return []
+    if isinstance(gpu_config, str) and gpu_config.lower() == "all":
+        return [docker.types.DeviceRequest(count=-1, capabilities=[['gpu']])]
+    if isinstance(gpu_config, int) and not isinstance(gpu_config, bool):
+        return [docker.types.DeviceRequest(count=gpu_config, capabilities=[['gpu']])]
+    if isinstance(gpu_config, list) and all(isinstance(gpu, int) for gpu in gpu_config):
+        return [docker.types.DeviceRequest(device_ids=[",".join(str(gpu) for gpu in gpu_config)],
+                                           capabilities=[['gpu']])]
+    raise ValueError(f"Invalid gpu configuration: {gpu_config}. Must be 'all', a number or a list of integers")
+
+
+def container_limits(resources: Optional[dict], profile: ResourceProfile = None) -> dict:
+    """
+    Docker container options limiting the resources of a train container.
+    Args:
+        resources: resource configuration of the train run
+        profile: default limits of the station
+
+    Returns:
+        keyword arguments for containers.run
+    """
+    resources = resources or {}
+    profile = profile or ResourceProfile()
+    limits = {}
+
+    cpus = resources.get("cpus") or profile.cpus
+    if cpus:
+        limits["nano_cpus"] = int(float(cpus) * 1e9)
+    memory = resources.get("memory") or profile.memory
+    if memory:
+        memory_mb = int(float(memory) * 1024)
+        limits["mem_limit"] = f"{memory_mb}m"
+        # the memory limit includes the swap, trains are not allowed to swap
+        limits["memswap_limit"] = f"{memory_mb}m"
+    blkio_weight = resources.get("blkio_weight") or profile.blkio_weight
+    if blkio_weight:
+        limits["blkio_weight"] = min(max(int(blkio_weight), 10), 1000)
+    for key in ("device_read_bps", "device_write_bps"):
+        if resources.get(key):
+            limits[key] = resources[key]
+    return limits
+
+
+def parse_cpu_list(cpu_list: str) -> List[int]:
+    """
+    Parse a cpu list in the kernel format, e.g. 0-3,8,10-11
+    """
+    cpus = []
+    for part in cpu_list.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def format_cpu_list(cpus: List[int]) -> str:
+    return ",".join(str(cpu) for cpu in sorted(cpus))
+
+
+def numa_nodes(sys_path: str = "/sys/devices/system/node") -> Dict[int, List[int]]:
+    """
+    Cpus of the NUMA nodes of the host, a single node with all usable cpus if the topology is not available.
+    """
+    nodes = {}
+    for path in glob.glob(os.path.join(sys_path, "node*", "cpulist")):
+        match = re.search(r"node(\d+)", path)
+        with open(path) as f:
+            nodes[int(match.group(1))] = parse_cpu_list(f.read())
+    if nodes:
+        return nodes
+    if hasattr(os, "sched_getaffinity"):
+        return {0: sorted(os.sched_getaffinity(0))}
+    return {0: list(range(os.cpu_count() or 1))}
+
+
+class CpusetAllocator:
+    """
+    Allocates cpus to concurrently running trains. The allocations are stored in a state file guarded by a lock file,
+    so all airflow workers on the host share them.
+    """
+
+    def __init__(self, state_dir: str, nodes: Dict[int, List[int]] = None,
+                 grace_period: int = ALLOCATION_GRACE_PERIOD):
+        self.state_dir = state_dir
+        self.nodes = nodes or numa_nodes()
+        self.grace_period = grace_period
+        os.makedirs(state_dir, exist_ok=True)
+        self._state_path = os.path.join(state_dir, "cpuset_allocations.json")
+
+    def allocate(self, run_id: str, cpus: float, active_runs: List[str] = None) -> Optional[str]:
+        """
+        Allocate cpus to a train run, preferring a single NUMA node with the most free cpus.
+        Args:
+            run_id: id of the train run
+            cpus: number of cpus, fractions are rounded up
+            active_runs: ids of the runs that are still running, allocations of other runs are released once they
+                are older than the grace period, so runs whose container has not been started yet keep their cpus
+
+        Returns:
+            the allocated cpus in the cpuset format or None if not enough cpus are free
+        """
+        count = max(math.ceil(cpus), 1)
+        with self._locked_state() as allocations:
+            now = time.time()
+            if active_runs is not None:
+                for stale in set(allocations) - set(active_runs):
+                    if now - allocations[stale]["allocated_at"] > self.grace_period:
+                        del allocations[stale]
+            if run_id in allocations:
+                return format_cpu_list(allocations[run_id]["cpus"])
+
+            used = {cpu for allocated in allocations.values() for cpu in allocated["cpus"]}
+            free = {node: [cpu for cpu in node_cpus if cpu not in used] for node, node_cpus in self.nodes.items()}
+            fitting = [node for node, node_free in free.items() if len(node_free) >= count]
+            if fitting:
+                node = max(fitting, key=lambda n: len(free[n]))
+                selected = free[node][:count]
+            else:
+                # span the nodes with the most free cpus first
+                selected = []
+                for node in sorted(free, key=lambda n: len(free[n]), reverse=True):
+                    selected.extend(free[node][:count - len(selected)])
+                if len(selected) < count:
+                    return None
+            allocations[run_id] = {"cpus": selected, "allocated_at": now}
+            return format_cpu_list(selected)
+
+    def release(self, run_id: str):
+        with self._locked_state() as allocations:
+            allocations.pop(run_id, None)
+
+    def allocations(self) -> Dict[str, List[int]]:
+        with self._locked_state() as allocations:
+            return {run_id: allocated["cpus"] for run_id, allocated in allocations.items()}
+
+    @contextmanager
+    def _locked_state(self):
+        with open(os.path.join(self.state_dir, ".cpuset.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self._state_path) as f:
+                        allocations = json.load(f)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    allocations = {}
+                # allocations of previous versions are lists of cpus without a timestamp
+                allocations = {
+                    run_id: allocated if isinstance(allocated, dict) else {"cpus": allocated, "allocated_at": 0}
+                    for run_id, allocated in allocations.items()
+                }
+                yield allocations
+                tmp_path = f"{self._state_path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(allocations, f)
+                os.replace(tmp_path, self._state_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def train_container_options(client: docker.DockerClient, run_id: str, resources: Optional[dict], state_dir: str,
+                            profile: ResourceProfile = None) -> dict:
+    """
+    Resource limits of a train container including the cpuset if the train is pinned to cpus. The cpus allocated to
+    other trains are released once their containers are no longer running and the grace period of the allocation has
+    passed.
+    Args:
+        client: docker client
+        run_id: id of the train run
+        resources: resource configuration of the train run
+        state_dir: directory holding the cpu allocations shared by the airflow workers
+        profile: default limits of the station
+
+    Returns:
+        keyword arguments for containers.run
+    """
+    resources = resources or {}
+    profile = profile or ResourceProfile()
+    limits = container_limits(resources, profile)
+    if not resources.get("pin_cpus", profile.pin_cpus):
+        return limits
+
+    active_runs = [c.labels.get(TRAIN_RUN_LABEL) for c in client.containers.list(filters={"label": TRAIN_RUN_LABEL})]
+    cpus = resources.get("cpus") or profile.cpus or 1
+    cpuset = CpusetAllocator(state_dir).allocate(run_id, float(cpus), active_runs=active_runs + [run_id])
+    if cpuset:
+        limits["cpuset_cpus"] = cpuset
+    return limits
@@ -0,0 +1,128 @@
+"""
+Cache of the results of the pre run security protocol. Verifying a train hashes and decrypts all of its files, so the
+result is stored in the station database keyed by the id of the train image and the fingerprint of the station key.
+When the same image is executed again with the same key, the verified image created by the first run is reused
+instead of running the protocol again. Entries of other keys are removed once a new key is used.
+"""
+import hashlib
+from datetime import datetime
+from typing import List, Optional
+
+import docker
+from docker.errors import ImageNotFound
+from cryptography.hazmat.primitives import serialization
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from station.app.models.train_verification import TrainVerification
+
+# tag of the verified image of a train, keeps the image from being pruned when the train image is replaced
+VERIFIED_TAG = "verified"
+
+
+def key_fingerprint(private_key_path: str, private_key_password: str = None) -> str:
+    """
+    Sha256 fingerprint of the public key belonging to the private key of the station.
+    """
+    with open(private_key_path, "rb") as f:
+        private_key = serialization.load_pem_private_key(
+            f.read(),
+            password=private_key_password.encode() if private_key_password else None,
+        )
+    public_key = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    return hashlib.sha256(public_key).hexdigest()
+
+
+def image_digest(client: docker.DockerClient, img: str) -> str:
+    """
+    Content addressed id of a local image.
+    """
+    return client.images.get(img).id
+
+
+def get_verification(db: Session, digest: str, fingerprint: str) -> Optional[TrainVerification]:
+    return db.query(TrainVerification).filter(
+        TrainVerification.image_digest == digest,
+        TrainVerification.key_fingerprint == fingerprint,
+    ).first()
+
+
+def store_verification(db: Session, digest: str, fingerprint: str, verified_image: str, train_id: str = None,
+                       duration: float = None) -> TrainVerification:
+    """
+    Store the result of a successful pre run protocol. Results verified with other keys are removed, as the station
+    key has been rotated.
+    """
+    invalidate_verifications(db, keep_fingerprint=fingerprint)
+    verification = get_verification(db, digest, fingerprint)
+    if not verification:
+        verification = TrainVerification(image_digest=digest, key_fingerprint=fingerprint)
+        db.add(verification)
+    verification.train_id = train_id
+    verification.verified_image = verified_image
+    verification.duration = duration
+    verification.created_at = datetime.now()
+    db.commit()
+    return verification
+
+
+def invalidate_verifications(db: Session, fingerprint: str = None, keep_fingerprint: str = None,
+                             train_id: str = None) -> int:
+    """
+    Remove cached verifications.
+    Args:
+        db: database session
+        fingerprint: only remove the verifications of this key
+        keep_fingerprint: remove the verifications of all other keys
+        train_id: only remove the verifications of this train
+
+    Returns:
+        number of removed verifications
+    """
+    query = db.query(TrainVerification)
+    if fingerprint:
+        query = query.filter(TrainVerification.key_fingerprint == fingerprint)
+    if keep_fingerprint:
+        query = query.filter(TrainVerification.key_fingerprint != keep_fingerprint)
+    if train_id:
+        query = query.filter(TrainVerification.train_id == train_id)
+    removed = query.delete(synchronize_session=False)
+    db.commit()
+    if removed:
+        logger.info(f"Invalidated {removed} cached train verifications")
+    return removed
+
+
+def list_verifications(db: Session, skip: int = 0, limit: int = 100) -> List[TrainVerification]:
+    return db.query(TrainVerification).order_by(TrainVerification.created_at.desc()).offset(skip).limit(limit).all()
+
+
+def restore_verified_image(client: docker.DockerClient, verification: TrainVerification, img: str) -> bool:
+    """
+    Tag the verified image of a cached verification as the train image.
+
+    Returns:
+        False if the verified image no longer exists and the protocol has to be executed again
+    """
+    try:
+        image = client.images.get(verification.verified_image)
+    except ImageNotFound:
+        return False
+    repository, tag = img.rsplit(":", 1)
+    image.tag(repository, tag)
+    return True
+
+
+def keep_verified_image(client: docker.DockerClient, img: str) -> str:
+    """
+    Tag the image created by the pre run protocol, so it is kept when the train image is replaced by the results.
+
+    Returns:
+        id of the verified image
+    """
+    image = client.images.get(img)
+    image.tag(img.rsplit(":", 1)[0], VERIFIED_TAG)
+    return image.id
@@ -10,6 +10,7 @@ from station.app.crud.crud_datasets import datasets
 from station.app.crud.crud_train_configs import docker_train_config
 
 from station.app.settings import settings
+from station.app.metrics import record_train_execution
 from station.clients.airflow.docker_trains import process_dataset, process_db_config
 from station.clients.airflow.client import airflow_client
 from station.app.schemas.local_trains import LocalTrainExecution
@@ -44,7 +45,12 @@ def run_local_train(db: Session, train_id: str, dataset_id: str = None, config_i
         raise ValueError(f"Train {train_id} not found")
     config = make_dag_config(db, db_train, train_id, dataset_id, config_id)
     print(config)
-    run_id = airflow_client.trigger_dag("run_local_train", config=config)
+    try:
+        run_id = airflow_client.trigger_dag("run_local_train", config=config)
+    except Exception:
+        record_train_execution("local", "failed")
+        raise
+    record_train_execution("local", "triggered")
     train_execution = local_train.create_run(
         db,
         train_id=train_id,
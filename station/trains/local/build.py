@@ -1,10 +1,12 @@
-import os
-from io import BytesIO
-from typing import Union, List
+import hashlib
+import json
+import tarfile
+import time
+from typing import BinaryIO, Optional, Union, List
 import docker
+from docker.errors import ImageNotFound
 from docker.models.images import Image
 from sqlalchemy.orm import Session
-from train_lib.docker_util.docker_ops import add_archive
 
 from station.trains.local.docker import make_docker_file
 from station.app.models.local_trains import LocalTrain, LocalTrainMasterImage
@@ -16,37 +18,113 @@ def build_train(
         db: Session,
         train_id: str,
         master_image_id: str = None,
-        files: BytesIO = None,
+        files: BinaryIO = None,
         custom_image: str = None,
+        docker_client: docker.DockerClient = None,
 ) -> str:
     if master_image_id and not files:
         raise ValueError("Must specify files with master image")
 
     local_crud = CRUDLocalTrain(LocalTrain)
     train = local_crud.get(db, train_id)
+    docker_client = docker_client or docker.from_env()
 
+    # the image of the last build is reused if the base image, the command and the files did not change
+    build_hash = train_build_hash(
+        docker_client,
+        master_image=master_image_id,
+        custom_image=custom_image,
+        entrypoint_file=train.entrypoint,
+        command=train.command,
+        command_args=train.command_args,
+        files=files,
+    )
+    tag = _train_image_tag(train_id)
+    if build_hash and train.build_hash == build_hash and _image_id(docker_client, tag) == train.image_digest:
+        logger.info(f"Using cached image {tag} ({train.image_digest}) for build {build_hash}")
+        return tag
+
+    start = time.perf_counter()
     image = _make_train_image(
         train_id=train_id,
         master_image=master_image_id,
         entrypoint_file=train.entrypoint,
         custom_image=custom_image,
         command=train.command,
-        command_args=train.command_args
+        command_args=train.command_args,
+        docker_client=docker_client,
     )
 
-    image = _add_train_files(files=files, image=image)
+    image = _add_train_files(files=files, image=image, docker_client=docker_client)
+    logger.info(f"Built train image {image} in {time.perf_counter() - start:.1f}s")
 
+    train.build_hash = build_hash
+    train.image_digest = _image_id(docker_client, image) if build_hash else None
+    db.commit()
     return image
 
 
+def train_build_hash(
+        docker_client: docker.DockerClient,
+        master_image: str = None,
+        custom_image: str = None,
+        entrypoint_file: str = None,
+        command: str = None,
+        command_args: Union[List[str], str] = None,
+        files: BinaryIO = None) -> Optional[str]:
+    """
+    Hash of the inputs of a train image build, None if the base image is not available locally and the build can not
+    be cached.
+    """
+    base_image = _image_id(docker_client, custom_image or master_image) if (custom_image or master_image) else None
+    if not base_image:
+        return None
+    content = {
+        "base_image": base_image,
+        "entrypoint": entrypoint_file,
+        "command": command,
+        "command_args": command_args,
+        "files": _archive_sha256(files) if files else None,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _archive_sha256(files: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+    # only the names and contents of the members are hashed, the archives are created with the current time as mtime
+    members = []
+    files.seek(0)
+    with tarfile.open(fileobj=files, mode="r|") as tar:
+        for member in tar:
+            sha = hashlib.sha256()
+            if member.isfile():
+                content = tar.extractfile(member)
+                for chunk in iter(lambda: content.read(chunk_size), b""):
+                    sha.update(chunk)
+            members.append((member.name, member.type.decode(), sha.hexdigest()))
+    files.seek(0)
+    return hashlib.sha256(json.dumps(sorted(members)).encode("utf-8")).hexdigest()
+
+
+def _image_id(docker_client: docker.DockerClient, image: str) -> Optional[str]:
+    try:
+        return docker_client.images.get(image).id
+    except ImageNotFound:
+        return None
+
+
+def _train_image_tag(train_id: str) -> str:
+    return f"pht-local/{train_id}:latest"
+
+
 def _make_train_image(
         train_id: str,
         master_image: str = None,
         entrypoint_file: str = None,
         custom_image: str = None,
         command: str = None,
-        command_args: Union[List[str], str] = None) -> Image:
-    docker_client = docker.from_env()
+        command_args: Union[List[str], str] = None,
+        docker_client: docker.DockerClient = None) -> Image:
+    docker_client = docker_client or docker.from_env()
     if not entrypoint_file and not custom_image:
         raise ValueError("Must specify an entrypoint file with master image or a custom image")
     if custom_image:
@@ -65,9 +143,18 @@ def _make_train_image(
     return image
 
 
-def _add_train_files(files: BytesIO, image: Image) -> str:
-    # add archive to container
+def _add_train_files(files: BinaryIO, image: Image, docker_client: docker.DockerClient = None,
+                     chunk_size: int = 1024 * 1024) -> str:
+    # stream the archive into a container of the image and commit it
+    docker_client = docker_client or docker.from_env()
     tag = image.tags[0]
-    add_archive(tag, files, path="/opt/train")
+    files.seek(0)
+    container = docker_client.containers.create(tag)
+    try:
+        container.put_archive("/opt/train", iter(lambda: files.read(chunk_size), b""))
+        repository, image_tag = tag.rsplit(":", 1)
+        container.commit(repository=repository, tag=image_tag)
+    finally:
+        container.remove(force=True)
 
     return tag
@@ -0,0 +1,208 @@
+"""
+Pool of warm containers for local trains. Containers of popular master images are created and started ahead of time
+with network access disabled and kept paused. A local train run claims a paused container of its master image by
+unpausing it, copies the train files into it and executes the train command in the running container, which skips
+building the train image and creating and starting a new container. Unpausing is atomic in the docker daemon, so a
+container is only ever handed out to a single run. Claimed containers are removed after the run, containers of runs
+whose worker crashed are removed by the pool once they exceed the maximum run time.
+"""
+import time
+from typing import Dict, Iterator, List, Optional, Union, BinaryIO
+
+import docker
+from docker.errors import APIError, DockerException, ImageNotFound, NotFound
+from docker.models.containers import Container
+from loguru import logger
+
+WARM_POOL_LABEL = "pht.warm_pool"
+WARM_POOL_IMAGE_LABEL = "pht.warm_pool.image"
+# claimed containers are renamed to record the claim time, the labels of a container can not be changed
+CLAIMED_NAME_PREFIX = "pht-warm-claimed"
+# keeps the container running without using cpu until the train command is executed
+IDLE_COMMAND = ["sh", "-c", "mkdir -p /opt/train /opt/results && while true; do sleep 3600; done"]
+
+
+def train_command(entrypoint_file: str, command: str, command_args: Union[List[str], str] = None) -> List[str]:
+    """
+    Command of a local train, the same as the CMD of the image built for the train.
+    """
+    if isinstance(command_args, str):
+        command_args = command_args.split(" ")
+    return [command, *(command_args or []), f"/opt/train/{entrypoint_file}"]
+
+
+def can_use_warm_container(run_config: dict, pin_cpus: bool = False) -> bool:
+    """
+    Whether a run can be executed in a warm container. Volumes, gpus and io limits can not be added to an existing
+    container, custom images are not pooled and cpu pinning relies on the labels of the train container.
+    """
+    resources = run_config.get("resources") or {}
+    if not run_config.get("master_image") or run_config.get("custom_image") or run_config.get("volumes"):
+        return False
+    if resources.get("gpus") or resources.get("device_read_bps") or resources.get("device_write_bps"):
+        return False
+    return not resources.get("pin_cpus", pin_cpus)
+
+
+class WarmPool:
+    """
+    Paused containers of master images, identified by their labels.
+    """
+
+    def __init__(self, client: docker.DockerClient):
+        self.client = client
+
+    def containers(self, image: str = None, status: str = "paused") -> List[Container]:
+        labels = [WARM_POOL_LABEL]
+        if image:
+            labels.append(f"{WARM_POOL_IMAGE_LABEL}={image}")
+        filters = {"label": labels}
+        if status:
+            filters["status"] = status
+        return self.client.containers.list(all=True, filters=filters)
+
+    def available(self, image: str) -> int:
+        return len(self.containers(image))
+
+    def claim(self, image: str) -> Optional[Container]:
+        """
+        Take a paused container of the image out of the pool.
+
+        Returns:
+            the running container or None if no container is available
+        """
+        for container in self.containers(image):
+            try:
+                container.unpause()
+            except (APIError, NotFound):
+                # unpaused by another run in the meantime
+                continue
+            try:
+                container.rename(f"{CLAIMED_NAME_PREFIX}-{int(time.time())}-{container.short_id}")
+            except (APIError, NotFound) as e:
+                logger.warning(f"Unable to record the claim of warm container {container.short_id}: {e}")
+            logger.info(f"Claimed warm container {container.short_id} of image {image}")
+            return container
+        return None
+
+    def fill(self, image: str, size: int) -> int:
+        """
+        Create paused containers of an image until the pool holds the given number of containers. Containers of
+        previous versions of the image are replaced.
+
+        Returns:
+            number of created containers
+        """
+        try:
+            image_id = self.client.images.get(image).id
+        except ImageNotFound:
+            logger.warning(f"Master image {image} is not available, unable to fill the warm pool")
+            return 0
+
+        paused = self.containers(image)
+        for container in paused:
+            if container.attrs.get("Image") != image_id:
+                self.remove(container)
+        available = len([c for c in paused if c.attrs.get("Image") == image_id])
+
+        created = 0
+        while available + created < size:
+            container = None
+            try:
+                container = self.client.containers.run(
+                    image,
+                    entrypoint=IDLE_COMMAND[:1],
+                    command=IDLE_COMMAND[1:],
+                    detach=True,
+                    network_disabled=True,
+                    labels={WARM_POOL_LABEL: "true", WARM_POOL_IMAGE_LABEL: image},
+                )
+                container.pause()
+            except DockerException as e:
+                logger.error(f"Unable to add a warm container of image {image}: {e}")
+                # a container that is not paused would never be claimed or pruned
+                if container is not None:
+                    self.remove(container)
+                break
+            created += 1
+        if created:
+            logger.info(f"Added {created} warm containers of image {image}")
+        return created
+
+    def prune(self, images: List[str], max_run_time: int = None):
+        """
+        Remove the paused containers of images that are no longer pooled, containers that are no longer running and
+        claimed containers whose run exceeded the maximum run time, e.g. because the worker running it crashed.
+        """
+        now = time.time()
+        for container in self.containers(status=None):
+            if container.status == "paused":
+                if container.labels.get(WARM_POOL_IMAGE_LABEL) not in images:
+                    self.remove(container)
+            elif container.status != "running":
+                self.remove(container)
+            elif max_run_time:
+                claimed_at = self._claimed_at(container)
+                # running containers that are not claimed yet are being added to the pool or claimed right now
+                if claimed_at and now - claimed_at > max_run_time:
+                    logger.warning(f"Removing warm container {container.short_id} after exceeding the maximum run "
+                                   f"time of {max_run_time}s")
+                    self.remove(container)
+
+    @staticmethod
+    def _claimed_at(container: Container) -> Optional[int]:
+        if not container.name or not container.name.startswith(CLAIMED_NAME_PREFIX):
+            return None
+        try:
+            return int(container.name[len(CLAIMED_NAME_PREFIX) + 1:].split("-")[0])
+        except ValueError:
+            return None
+
+    @staticmethod
+    def remove(container: Container):
+        try:
+            container.remove(force=True)
+        except NotFound:
+            pass
+
+
+def execute_in_container(client: docker.DockerClient, container: Container, files: BinaryIO, command: List[str],
+                         environment: Dict[str, str] = None, limits: dict = None,
+                         chunk_size: int = 1024 * 1024) -> (Iterator[bytes], str):
+    """
+    Copy the train files into a claimed container and start the train command.
+    Args:
+        client: docker client
+        container: running container claimed from the pool
+        files: tar archive of the train files
+        command: train command
+        environment: environment variables of the train
+        limits: resource limits of the train container
+        chunk_size: size of the chunks in which the archive is copied
+
+    Returns:
+        the output stream of the command and the id of the exec instance
+    """
+    start = time.perf_counter()
+    if limits:
+        container.update(**_update_limits(limits))
+    files.seek(0)
+    container.put_archive("/opt/train", iter(lambda: files.read(chunk_size), b""))
+    exec_id = client.api.exec_create(container.id, command, stdout=True, stderr=True,
+                                     environment=environment or {})["Id"]
+    output = client.api.exec_start(exec_id, stream=True)
+    logger.info(f"Started train in warm container {container.short_id} after {time.perf_counter() - start:.2f}s")
+    return output, exec_id
+
+
+def exec_exit_code(client: docker.DockerClient, exec_id: str) -> Optional[int]:
+    return client.api.exec_inspect(exec_id).get("ExitCode")
+
+
+def _update_limits(limits: dict) -> dict:
+    # limits of a running container are updated with a cpu quota instead of nano cpus
+    update = {k: v for k, v in limits.items() if k in ("mem_limit", "memswap_limit", "blkio_weight")}
+    if limits.get("nano_cpus"):
+        update["cpu_period"] = 100000
+        update["cpu_quota"] = int(limits["nano_cpus"] / 1e9 * 100000)
+    return update
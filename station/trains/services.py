@@ -0,0 +1,124 @@
+"""
+Connections to the station services used by the tasks of the train DAGs. The database engine and the station api
+client are created once per airflow worker process and reused by all tasks and callbacks running in it, instead of
+creating a new engine and authenticating a new api client in every task.
+"""
+import os
+from contextlib import contextmanager
+from functools import lru_cache
+
+from loguru import logger
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from station.clients.station import StationAPIClient
+
+STATION_DB_CONNECTION_ID = "pg_station"
+
+
+class PoolStats:
+    """
+    Number of connections opened and checked out from the pool of the station database engine.
+    """
+
+    def __init__(self):
+        self.opened = 0
+        self.checked_out = 0
+
+    def __str__(self) -> str:
+        return f"opened: {self.opened}, checked out: {self.checked_out}"
+
+
+pool_stats = PoolStats()
+
+
+def _station_db_url() -> str:
+    from airflow.hooks.base import BaseHook
+
+    connection = BaseHook.get_connection(STATION_DB_CONNECTION_ID)
+    return f"postgresql://{connection.login}:{connection.password}@{connection.host}:{connection.port}/" \
+           f"{connection.schema}"
+
+
+def _track_pool(engine: Engine):
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        connection_record.info["pid"] = os.getpid()
+        pool_stats.opened += 1
+        logger.info(f"Opened station db connection ({pool_stats})")
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        # connections inherited from the parent of a forked task process must not be shared with it
+        if connection_record.info["pid"] != os.getpid():
+            connection_record.dbapi_connection = connection_proxy.dbapi_connection = None
+            raise exc.DisconnectionError(
+                f"Connection belongs to process {connection_record.info['pid']}, reconnecting in {os.getpid()}"
+            )
+        pool_stats.checked_out += 1
+
+    @event.listens_for(engine, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        pool_stats.checked_out = max(pool_stats.checked_out - 1, 0)
+
+    @event.listens_for(engine, "close")
+    def close(dbapi_connection, connection_record):
+        pool_stats.opened = max(pool_stats.opened - 1, 0)
+
+
+@lru_cache()
+def station_engine() -> Engine:
+    """
+    Engine of the station database shared by the tasks of a worker process.
+    """
+    engine = create_engine(
+        _station_db_url(),
+        pool_size=int(os.getenv("STATION_DB_POOL_SIZE", 2)),
+        max_overflow=int(os.getenv("STATION_DB_MAX_OVERFLOW", 3)),
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
+    _track_pool(engine)
+    logger.info(f"Created station db engine in process {os.getpid()}")
+    return engine
+
+
+@lru_cache()
+def station_session_factory() -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=station_engine())
+
+
+@contextmanager
+def station_session() -> Session:
+    """
+    Session to the station database from inside an airflow task.
+    """
+    db = station_session_factory()()
+    try:
+        yield db
+    finally:
+        db.close()
+        logger.debug(f"Station db pool: {station_engine().pool.status()} ({pool_stats})")
+
+
+@lru_cache()
+def station_api_client() -> StationAPIClient:
+    """
+    Station api client shared by the tasks and callbacks of a worker process, the access token is reused until it
+    expires.
+    """
+    client = StationAPIClient.from_env()
+    logger.info(f"Created station api client for {client.base_url} in process {os.getpid()}")
+    return client
+
+
+def reset_services():
+    """
+    Drop the cached engine and clients, e.g. when the station configuration changed.
+    """
+    if station_engine.cache_info().currsize:
+        station_engine().dispose()
+    station_engine.cache_clear()
+    station_session_factory.cache_clear()
+    station_api_client.cache_clear()